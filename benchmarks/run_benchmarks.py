@@ -0,0 +1,165 @@
+"""
+数据流程基准：导入 → 划分 → 缩略图 → 训练一轮（CPU）
+
+在临时目录中生成合成的类别文件夹数据集，依次计时各阶段，结果以 JSON 输出，
+便于在版本之间对比性能回退。
+
+用法:
+    python benchmarks/run_benchmarks.py --classes 4 --per-class 250 --size 512 --output bench.json
+    python benchmarks/run_benchmarks.py --skip-train
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+from utils.path_manager import PathManager
+from utils.thumbnail import load_thumbnail
+from utils.thumbnail_cache import ThumbnailCache
+from utils.training_monitor import peak_rss_mb
+from synthetic import make_class_dataset
+
+def timed(func, *args, **kwargs):
+    """执行函数并返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def bench_ingest(path_manager: PathManager, source: Path, mode: str) -> dict:
+    report, first = timed(path_manager.sync_training_data, source, mode)
+    # 数据未变化时重新导入（增量路径）
+    _, again = timed(path_manager.sync_training_data, source, mode)
+    return {
+        'files': len(report['added']),
+        'first_s': round(first, 4),
+        'reingest_unchanged_s': round(again, 4),
+        'dest': report['dest']
+    }
+
+def bench_split(path_manager: PathManager, dataset_dir: Path, mode: str) -> dict:
+    split_dir, first = timed(path_manager.split_dataset, dataset_dir, (0.7, 0.2, 0.1), mode)
+    _, same = timed(path_manager.split_dataset, dataset_dir, (0.7, 0.2, 0.1), mode)
+    _, resplit = timed(path_manager.split_dataset, dataset_dir, (0.6, 0.2, 0.2), mode)
+    # 恢复默认比例，供训练阶段使用
+    path_manager.split_dataset(dataset_dir, (0.7, 0.2, 0.1), mode)
+    return {
+        'first_s': round(first, 4),
+        'unchanged_s': round(same, 4),
+        'new_ratios_s': round(resplit, 4),
+        'split_dir': split_dir
+    }
+
+def bench_thumbnails(dataset_dir: Path, cache_path: Path, thumb_size: int, limit: int) -> dict:
+    paths = sorted(dataset_dir.rglob('*.jpg'))[:limit]
+    _, uncached = timed(lambda: [load_thumbnail(p, thumb_size) for p in paths])
+    cache = ThumbnailCache(cache_path)
+    _, cold = timed(lambda: [load_thumbnail(p, thumb_size, cache) for p in paths])
+    _, warm = timed(lambda: [load_thumbnail(p, thumb_size, cache) for p in paths])
+    cache.close()
+    return {
+        'images': len(paths),
+        'uncached_s': round(uncached, 4),
+        'cache_cold_s': round(cold, 4),
+        'cache_warm_s': round(warm, 4),
+        'uncached_images_per_sec': round(len(paths) / uncached, 1) if uncached > 0 else None
+    }
+
+def bench_train(split_dir: Path, project: Path, img_size: int, batch_size: int, model_size: str) -> dict:
+    from utils.weight_store import WeightStore
+    from utils.yolo_trainer import YOLOTrainer
+
+    # 权重仓库和检查点也放在 project 下，默认位置在项目的 models 目录中
+    trainer = YOLOTrainer(weight_store=WeightStore(project / 'weights'))
+    trainer.device = 'cpu'
+    # 不使用预训练权重，避免基准依赖网络
+    if not trainer.init_model(model_size, pretrained=False):
+        return {'error': "模型初始化失败"}
+
+    epoch_stats = {}
+
+    def on_stats(event, stats):
+        if event == 'epoch_end':
+            epoch_stats.update(stats)
+
+    trainer.monitor.subscribe(on_stats)
+    params = {'img_size': img_size, 'batch_size': batch_size, 'epochs': 1, 'project': str(project),
+              'checkpoint_dir': str(project / 'checkpoints'), 'save_checkpoint': False}
+    success, seconds = timed(trainer.train, split_dir, params)
+    return {
+        'success': success,
+        'epoch_s': round(seconds, 4),
+        'images_per_sec': round(epoch_stats.get('images_per_sec', 0.0), 1),
+        'data_wait_ratio': round(epoch_stats.get('data_wait_ratio', 0.0), 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="数据流程基准")
+    parser.add_argument('--classes', type=int, default=4, help="类别数")
+    parser.add_argument('--per-class', type=int, default=250, help="每类图片数")
+    parser.add_argument('--size', type=int, default=512, help="图片边长(像素)")
+    parser.add_argument('--mode', default='auto', help="导入方式，见 utils.file_ops.INGEST_MODES")
+    parser.add_argument('--thumb', type=int, default=100, help="缩略图尺寸")
+    parser.add_argument('--thumb-limit', type=int, default=500, help="缩略图阶段最多处理的图片数")
+    parser.add_argument('--img-size', type=int, default=64, help="训练图像尺寸")
+    parser.add_argument('--batch-size', type=int, default=16, help="训练批次大小")
+    parser.add_argument('--model-size', default='nano', help="模型大小")
+    parser.add_argument('--skip-train', action='store_true', help="跳过训练阶段")
+    parser.add_argument('--output', type=Path, help="结果 JSON 文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    results = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'dataset': {'classes': args.classes, 'per_class': args.per_class, 'image_size': args.size},
+        'stages': {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _, generate = timed(make_class_dataset, tmp / 'survey', args.classes, args.per_class, args.size)
+        results['generate_s'] = round(generate, 4)
+
+        # 所有输出都写入临时目录，不影响项目数据
+        path_manager = PathManager()
+        path_manager.root_dir = tmp / 'project'
+
+        ingest = bench_ingest(path_manager, tmp / 'survey', args.mode)
+        dataset_dir = ingest.pop('dest')
+        results['stages']['ingest'] = ingest
+
+        split = bench_split(path_manager, dataset_dir, args.mode)
+        split_dir = split.pop('split_dir')
+        results['stages']['split'] = split
+
+        results['stages']['thumbnails'] = bench_thumbnails(
+            dataset_dir, tmp / 'thumbnails.db', args.thumb, args.thumb_limit)
+
+        if not args.skip_train:
+            results['stages']['train_epoch'] = bench_train(
+                split_dir, tmp / 'runs', args.img_size, args.batch_size, args.model_size)
+
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    output = json.dumps(results, indent=4, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output, encoding='utf-8')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""生成基准测试用的合成图片和类别文件夹数据集"""
+from pathlib import Path
+from typing import List
+
+import cv2
+import numpy as np
+
+def make_image(rng: np.random.Generator, size: int) -> np.ndarray:
+    """生成带平滑结构和少量噪声的图片（纯随机噪声不能代表真实图片的编解码开销）"""
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    channels = [np.sin(xx * (6 + k) + yy * (4 + k) + phase[k]) for k in range(3)]
+    img = ((np.stack(channels, axis=-1) + 1) * 127.5).astype(np.uint8)
+    img += rng.integers(0, 16, img.shape, dtype=np.uint8)
+    return img
+
+def make_images(folder: Path, count: int, size: int, seed: int = 0) -> List[Path]:
+    """在 folder 中生成 count 张 JPEG"""
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = folder / f"image_{i}.jpg"
+        cv2.imwrite(str(path), make_image(rng, size), [cv2.IMWRITE_JPEG_QUALITY, 92])
+        paths.append(path)
+    return paths
+
+def make_class_dataset(folder: Path, num_classes: int, per_class: int, size: int) -> Path:
+    """生成 <folder>/<类别>/<图片>.jpg 结构的数据集"""
+    for c in range(num_classes):
+        make_images(folder / f"class_{c}", per_class, size, seed=c)
+    return folder
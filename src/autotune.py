@@ -0,0 +1,45 @@
+import argparse
+import json
+from pathlib import Path
+from utils.auto_tune import AutoTuner, BATCH_SIZES
+from utils.config_manager import ConfigManager
+from utils.yolo_trainer import MODEL_SIZES
+
+def main():
+    parser = argparse.ArgumentParser(description="自动调优 CPU 训练的批次大小和数据加载进程数")
+    parser.add_argument('--data', type=Path, required=True, help="划分后的数据集目录（含 train/valid）")
+    parser.add_argument('--model-size', help="模型大小，默认使用 user_settings.json 中的设置")
+    parser.add_argument('--img-size', type=int, help="训练图像尺寸，默认使用 user_settings.json 中的设置")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BATCH_SIZES), help="尝试的批次大小")
+    parser.add_argument('--workers', type=int, nargs='+', help="尝试的数据加载进程数")
+    parser.add_argument('--memory-limit-mb', type=float, help="内存上限(MB)，默认为可用内存的 80%%")
+    parser.add_argument('--max-batches', type=int, default=8, help="每次试验计时的批次数")
+    parser.add_argument('--cache', choices=['packed', 'ram', 'disk', 'none'],
+                        help="图片缓存方式，默认使用 user_settings.json 中的设置")
+    parser.add_argument('--dry-run', action='store_true', help="只输出结果，不写回 user_settings.json")
+    args = parser.parse_args()
+
+    config_manager = ConfigManager()
+    config = config_manager.load_config()
+    params = config.setdefault('training_params', {})
+    model_size = args.model_size or params.get('model_size', 'nano')
+    img_size = args.img_size or params.get('img_size', 224)
+    cache = params.get('cache') if args.cache is None else (None if args.cache == 'none' else args.cache)
+
+    def on_progress(value, message):
+        print(f"[{value:3d}%] {message}")
+
+    tuner = AutoTuner(args.data, f"yolo11{MODEL_SIZES.get(model_size, model_size)}-cls", img_size,
+                      args.batch_sizes, args.workers, args.memory_limit_mb, args.max_batches,
+                      cache=cache)
+    result = tuner.tune(on_progress)
+    print(json.dumps(result, indent=4, ensure_ascii=False))
+
+    if result['batch_size'] and not args.dry_run:
+        params['batch_size'] = result['batch_size']
+        params['workers'] = result['workers']
+        config_manager.save_config(config)
+        print(f"已写入 {config_manager.config_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import sys
+from pathlib import Path
+from utils.dedup import dataset_duplicates, find_leaks
+from utils.path_manager import PathManager
+from utils.split_manifest import SplitManifest
+
+def main():
+    parser = argparse.ArgumentParser(description="用感知哈希查找近似重复的图片，并检查划分之间的泄漏")
+    parser.add_argument('dataset', type=Path, help="数据集目录（每个子目录为一个类别）")
+    parser.add_argument('--threshold', type=int, default=4, help="视为重复的最大汉明距离（位）")
+    parser.add_argument('--method', choices=['phash', 'dhash'], default='phash', help="感知哈希算法")
+    parser.add_argument('--workers', type=int, help="计算哈希的进程数，默认为 CPU 核数")
+    parser.add_argument('--split-dir', type=Path,
+                        help="划分后的数据集目录（含 split.json），列出跨划分的重复组")
+    args = parser.parse_args()
+
+    if not args.dataset.is_dir():
+        sys.exit(f"{args.dataset} 不是目录")
+    index = PathManager().get_dataset_index(args.dataset)
+    try:
+        groups = dataset_duplicates(
+            index, args.threshold, args.method, args.workers,
+            lambda done, total: print(f"已计算哈希 {done}/{total}", file=sys.stderr))
+    finally:
+        index.close()
+
+    if args.split_dir:
+        leaks = find_leaks(groups, SplitManifest(args.split_dir).load().assignments())
+        for placed in leaks:
+            print("\t".join(f"{rel}({split})" for rel, split in placed.items()))
+        print(f"{len(groups)} 组重复图片，其中 {len(leaks)} 组跨划分", file=sys.stderr)
+    else:
+        for group in groups:
+            print("\t".join(group))
+        print(f"{len(groups)} 组重复图片，共 {sum(len(g) for g in groups)} 张", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+import numpy as np
+from utils.decode_pool import preprocess_classify
+from utils.inference_engine import iter_image_paths
+from utils.model_export import (EXPORT_FORMATS, BACKEND_PRIORITY, compare_backends,
+                                export_model, trained_img_size)
+from utils.shard_archive import load_image
+
+def load_images(source: Path, count: int, img_size: int) -> np.ndarray:
+    """读取并预处理用于对比的图片"""
+    images = []
+    for path in islice(iter_image_paths(source), count * 2):
+        img = load_image(path, img_size, short_edge=True)
+        if img is not None:
+            images.append(preprocess_classify(img, img_size))
+        if len(images) >= count:
+            break
+    return np.stack(images) if images else np.empty((0, img_size, img_size, 3), np.uint8)
+
+def main():
+    parser = argparse.ArgumentParser(description="导出分类模型并对比各推理后端")
+    parser.add_argument('--weights', type=Path, required=True, help="训练好的 -cls 模型权重(.pt)")
+    parser.add_argument('--formats', nargs='*', default=['torchscript', 'onnx'],
+                        choices=EXPORT_FORMATS, help="导出格式，留空表示只做对比")
+    parser.add_argument('--int8', action='store_true', help="额外生成动态 INT8 量化的 ONNX 模型")
+    parser.add_argument('--compare', type=Path, help="用该目录（或文件列表）中的图片对比输出和速度")
+    parser.add_argument('--count', type=int, default=32, help="对比使用的图片数（即批次大小）")
+    parser.add_argument('--repeats', type=int, default=10, help="计时重复次数")
+    args = parser.parse_args()
+
+    if args.formats:
+        artifacts = export_model(args.weights, args.formats, int8=args.int8)
+        for fmt, path in artifacts.items():
+            print(f"{fmt}: {path}", file=sys.stderr)
+
+    if args.compare:
+        img_size = trained_img_size(args.weights) or 224
+        images = load_images(args.compare, args.count, img_size)
+        if not len(images):
+            sys.exit(f"{args.compare} 中没有可读取的图片")
+        report = compare_backends(args.weights, images, BACKEND_PRIORITY, args.int8, args.repeats)
+        print(json.dumps(report, indent=4, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
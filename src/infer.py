@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+from utils.config_manager import ConfigManager
+from utils.inference_engine import InferenceEngine
+
+def main():
+    parser = argparse.ArgumentParser(description="星系分类器批量推理（无界面）")
+    parser.add_argument('--weights', type=Path, required=True, help="训练好的 -cls 模型权重")
+    parser.add_argument('--source', type=Path, required=True, help="图片目录或文件列表（每行一个路径）")
+    parser.add_argument('--output', type=Path, required=True, help="结果文件（.csv 或 .parquet）")
+    parser.add_argument('--format', choices=['csv', 'parquet'], help="输出格式，默认根据扩展名判断")
+    parser.add_argument('--batch-size', type=int, default=64, help="每批推理的图片数")
+    parser.add_argument('--top-k', type=int, default=5, help="输出前 k 个类别")
+    parser.add_argument('--img-size', type=int, help="推理图像尺寸，默认使用训练面板保存的尺寸")
+    parser.add_argument('--device', help="推理设备，如 cpu、0")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="解码进程数，0 表示在推理进程中解码")
+    parser.add_argument('--backend', default='torch',
+                        choices=['auto', 'torch', 'torchscript', 'onnxruntime', 'openvino'],
+                        help="推理后端，使用 export.py 生成的导出文件，不可用时回退")
+    parser.add_argument('--int8', action='store_true', help="onnxruntime 后端使用 INT8 量化模型")
+    args = parser.parse_args()
+
+    engine = InferenceEngine(args.weights, args.batch_size, args.top_k, args.img_size,
+                             args.device, args.workers, args.backend, args.int8)
+    print(f"推理后端: {engine.backend}", file=sys.stderr)
+    if args.img_size is None:
+        # 与训练面板使用同一个图像尺寸，模型记录的训练尺寸不同时以模型为准
+        saved = ConfigManager().load_config().get('training_params', {}).get('img_size')
+        trained = engine.trained_img_size
+        if saved and trained and saved != trained:
+            print(f"警告：配置中的图像尺寸 {saved} 与模型训练尺寸 {trained} 不一致，使用 {trained}",
+                  file=sys.stderr)
+        engine.img_size = trained or saved
+
+    def on_progress(count, images_per_sec):
+        print(f"\r已处理 {count} 张图片，{images_per_sec:.1f} 张/秒", end='', file=sys.stderr)
+
+    summary = engine.run(args.source, args.output, args.format, on_progress)
+    print(file=sys.stderr)
+    print(f"完成：{summary['images']} 张图片（失败 {summary['failed']} 张），"
+          f"耗时 {summary['seconds']:.1f} 秒，{summary['images_per_sec']:.1f} 张/秒")
+
+if __name__ == "__main__":
+    main()
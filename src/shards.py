@@ -0,0 +1,39 @@
+import argparse
+import sys
+from pathlib import Path
+from utils.path_manager import IMAGE_SUFFIXES
+from utils.shard_archive import ShardArchive, is_archive, write_archive
+
+def main():
+    parser = argparse.ArgumentParser(description="把图片数据集打包为分片归档（tar 分片 + 索引）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    write_parser = subparsers.add_parser('write', help="把类别文件夹形式的数据集写成分片归档")
+    write_parser.add_argument('source', type=Path, help="数据集目录（每个子目录为一个类别）")
+    write_parser.add_argument('archive', type=Path, help="归档目录")
+    write_parser.add_argument('--shard-size-mb', type=float, default=512, help="每个分片的目标大小(MB)")
+    write_parser.add_argument('--workers', type=int, default=8, help="并行写分片的线程数")
+
+    info_parser = subparsers.add_parser('info', help="显示归档中的类别和图片数")
+    info_parser.add_argument('archive', type=Path)
+    args = parser.parse_args()
+
+    if args.command == 'write':
+        if not args.source.is_dir():
+            sys.exit(f"{args.source} 不是目录")
+        stats = write_archive(args.source, args.archive, args.shard_size_mb, args.workers,
+                              suffixes=IMAGE_SUFFIXES,
+                              progress_callback=lambda done, total: print(f"分片 {done}/{total}",
+                                                                          file=sys.stderr))
+        print(f"已写入 {stats['files']} 个文件（{stats['bytes'] / (1 << 20):.1f} MB），"
+              f"{stats['shards']} 个分片，用时 {stats['seconds']:.1f} 秒")
+    elif args.command == 'info':
+        if not is_archive(args.archive):
+            sys.exit(f"{args.archive} 不是分片归档")
+        archive = ShardArchive(args.archive)
+        for name, count in archive.class_counts().items():
+            print(f"{name or '(无类别)'}\t{count}")
+        print(f"共 {len(archive)} 个文件")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from utils.dataset_stats import compute_stats, suggest_img_size, upscale_ratio
+
+def main():
+    parser = argparse.ArgumentParser(description="统计划分后数据集的逐通道均值/标准差和图片尺寸分布")
+    parser.add_argument('split_dir', type=Path, help="划分后的数据集目录（含 split.json）")
+    parser.add_argument('--split', default='train', choices=['train', 'valid', 'test'], help="统计的划分")
+    parser.add_argument('--max-size', type=int, default=64, help="缩小解码的长边像素数")
+    parser.add_argument('--workers', type=int, help="统计进程数，默认为 CPU 核数")
+    parser.add_argument('--img-size', type=int, help="显示该训练尺寸下需要放大的图片比例")
+    parser.add_argument('--json', action='store_true', help="输出完整的 JSON 结果")
+    args = parser.parse_args()
+
+    stats = compute_stats(args.split_dir, args.split, args.max_size, args.workers,
+                          lambda done, total: print(f"已统计 {done}/{total}", file=sys.stderr))
+    if stats is None:
+        sys.exit(f"{args.split_dir} 没有划分清单或 {args.split} 为空")
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return
+    print(f"图片\t{stats['images']}（解码失败 {stats['failed']}）")
+    print("均值(RGB)\t" + "\t".join(f"{v:.4f}" for v in stats['mean']))
+    print("标准差(RGB)\t" + "\t".join(f"{v:.4f}" for v in stats['std']))
+    for name in ('width', 'height', 'short_edge'):
+        print(f"{name}\t" + "\t".join(f"{k}={v}" for k, v in stats['sizes'][name].items()))
+    for edge, count in stats['sizes']['short_edge_hist'].items():
+        if count:
+            print(f"短边>={edge}\t{count}")
+    print(f"建议尺寸\t{suggest_img_size(stats)}")
+    if args.img_size:
+        print(f"{args.img_size}px 需要放大\t{upscale_ratio(stats, args.img_size):.0%}")
+
+if __name__ == "__main__":
+    main()
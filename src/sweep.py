@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from utils.config_manager import ConfigManager
+from utils.model_manager import ModelManager
+from utils.path_manager import PathManager
+from utils.sweep import SWEEP_KEYS, SweepRunner, default_sweep_dir, generate_trials
+
+def parse_grid(items):
+    """解析 --grid 参数: key=v1,v2,...，取值按 JSON 解析，失败时作为字符串"""
+    space = {}
+    for item in items:
+        key, _, values = item.partition('=')
+        parsed = []
+        for value in values.split(','):
+            try:
+                parsed.append(json.loads(value))
+            except json.JSONDecodeError:
+                parsed.append(value)
+        space[key] = parsed
+    return space
+
+def main():
+    parser = argparse.ArgumentParser(description="超参数搜索：并行训练多组参数，提前停止落后的试验，输出排行榜")
+    parser.add_argument('--data', type=Path, required=True, help="划分后的数据集目录（含 train/valid）")
+    parser.add_argument('--spec', type=Path, help="搜索配置 JSON 文件，见 utils.sweep.generate_trials")
+    parser.add_argument('--grid', nargs='+', default=[], metavar='KEY=V1,V2',
+                        help=f"网格搜索的参数，可选: {', '.join(SWEEP_KEYS)}")
+    parser.add_argument('--cpu-budget', type=int, help="可使用的 CPU 核数，默认为全部")
+    parser.add_argument('--threads-per-trial', type=int, help="每个试验的线程数")
+    parser.add_argument('--metric', default='metrics/accuracy_top1', help="比较试验的验证指标")
+    parser.add_argument('--mode', choices=['max', 'min'], default='max', help="指标越大越好还是越小越好")
+    parser.add_argument('--grace-epochs', type=int, default=2, help="训练满多少轮后才允许提前停止")
+    parser.add_argument('--output', type=Path, help="搜索结果目录，默认 models/sweeps/<时间>")
+    parser.add_argument('--no-register', action='store_true', help="不把试验登记到训练记录")
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    elif args.grid:
+        spec = {'method': 'grid', 'params': parse_grid(args.grid)}
+    else:
+        sys.exit("需要 --spec 或 --grid")
+
+    path_manager = PathManager()
+    config = ConfigManager().load_config()
+    base_params = {'model_size': 'nano', 'img_size': 224, 'pretrained': True,
+                   **config.get('training_params', {})}
+    trials = generate_trials(spec, base_params)
+    model_manager = None if args.no_register else ModelManager(path_manager.get_model_dir())
+    output_dir = args.output or default_sweep_dir(path_manager.get_model_dir())
+
+    runner = SweepRunner(args.data, trials, output_dir, args.cpu_budget, args.threads_per_trial,
+                         args.metric, args.mode, args.grace_epochs, model_manager=model_manager)
+    print(f"{len(trials)} 个试验，并行 {runner.concurrency} 个，每个 {runner.threads_per_trial} 个线程",
+          file=sys.stderr)
+    leaderboard = runner.run(lambda value, message: print(f"[{value:3d}%] {message}", file=sys.stderr))
+
+    swept = list(spec.get('params', {}))
+    print("\t".join(['排名', '试验', '状态', args.metric, '轮次', '秒'] + swept))
+    for rank, row in enumerate(leaderboard, start=1):
+        score = f"{row['score']:.4f}" if row['score'] is not None else '-'
+        print("\t".join(str(v) for v in [rank, row['trial'], row['status'], score, row['epochs'],
+                                          row['seconds']] + [row['params'].get(k) for k in swept]))
+    print(f"排行榜已保存到 {output_dir / 'leaderboard.json'}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
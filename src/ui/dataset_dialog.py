@@ -6,9 +6,15 @@ from pathlib import Path
 from utils.dataset_config import DatasetConfig
 
 class DatasetConfigDialog(QDialog):
-    def __init__(self, project_path: Path, parent=None):
+    def __init__(self, project_path: Path, index=None, parent=None):
+        """
+        Args:
+            project_path: 数据集目录（含 data.yaml）
+            index: 源数据集的索引（utils.dataset_index.DatasetIndex），提供时可以从索引读取类别
+        """
         super().__init__(parent)
         self.dataset_config = DatasetConfig(project_path)
+        self.index = index
         self.setup_ui()
         self.load_config()
     
@@ -23,6 +29,14 @@ class DatasetConfigDialog(QDialog):
         self.class_list = QListWidget()
         layout.addWidget(self.class_list)
         
+        # 从数据集索引读取类别和图片数
+        self.info_label = QLabel()
+        layout.addWidget(self.info_label)
+        if self.index is not None:
+            read_btn = QPushButton("从数据集读取类别")
+            read_btn.clicked.connect(self.read_from_index)
+            layout.addWidget(read_btn)
+        
         # 添加类别
         add_layout = QHBoxLayout()
         self.class_input = QLineEdit()
@@ -58,6 +72,19 @@ class DatasetConfigDialog(QDialog):
         self.class_list.clear()
         self.class_list.addItems(config['names'])
     
+    def read_from_index(self):
+        """用数据集索引中的类别替换类别列表，并显示每个类别的图片数"""
+        counts = self.index.class_counts()
+        self.class_list.clear()
+        for name, count in counts.items():
+            self.class_list.addItem(name)
+            self.class_list.item(self.class_list.count() - 1).setToolTip(f"{count} 张图片")
+        summary = self.index.summary()
+        text = f"{len(counts)} 个类别，共 {sum(counts.values())} 张图片"
+        if summary['corrupt']:
+            text += f"（另有 {summary['corrupt']} 张损坏）"
+        self.info_label.setText(text)
+    
     def add_class(self):
         """添加新类别"""
         class_name = self.class_input.text().strip()
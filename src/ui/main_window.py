@@ -5,14 +5,19 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon
 from pathlib import Path
 from .training_panel import TrainingPanel
+from .training_worker import TrainingWorker, AutoTuneWorker, DatasetPrepareWorker
 from utils.path_manager import PathManager
 from utils.config_manager import ConfigManager
+from utils.thumbnail_cache import ThumbnailCache
+from utils.model_manager import ModelManager
+from utils.checkpoint import find_resumable
+from utils.shard_archive import is_archive
+from utils.image_validator import REASONS
 from .preview_panel import PreviewPanel
 import time
 from PyQt6.QtWidgets import QApplication
 from .help_panel import HelpDialog
 from .settings_dialog import SettingsDialog
-from PyQt6.QtGui import QFont
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -23,7 +28,15 @@ class MainWindow(QMainWindow):
         self.path_manager = PathManager()
         self.config_manager = ConfigManager()
         self.load_user_settings()
+        # 训练记录和已加载模型的缓存
+        self.model_manager = ModelManager(
+            self.path_manager.get_model_dir(),
+            self.config.get('model_settings', {}).get('model_cache_mb', 1024))
         self.help_panel = None  # 初始化为None
+        self.training_worker = None  # 后台训练线程
+        self.auto_tune_worker = None  # 后台自动调优线程
+        self.prepare_worker = None  # 后台数据准备线程（导入、检查、划分）
+        self.dataset_dir = None  # 划分后的数据集目录
         self.setup_ui()
         
 
@@ -40,6 +53,15 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """窗口关闭时保存设置"""
+        # 停止正在进行的训练，等待后台线程退出
+        if self.training_worker is not None and self.training_worker.isRunning():
+            self.training_worker.cancel()
+            self.training_worker.wait()
+        if self.auto_tune_worker is not None and self.auto_tune_worker.isRunning():
+            self.auto_tune_worker.wait()
+        if self.prepare_worker is not None and self.prepare_worker.isRunning():
+            self.prepare_worker.wait()
+        self.preview_panel.shutdown()
         self.save_user_settings(None)
         super().closeEvent(event)
     
@@ -75,14 +97,41 @@ class MainWindow(QMainWindow):
         self.train_btn.clicked.connect(self.start_training)
         control_layout.addWidget(self.train_btn)
         
+        # 添加继续上次训练按钮（有中断的训练时可用）
+        self.resume_btn = QPushButton("继续上次训练")
+        self.resume_btn.setToolTip("从最近一次中断训练的检查点继续，恢复优化器、学习率和随机数状态")
+        self.resume_btn.setEnabled(False)
+        self.resume_btn.clicked.connect(self.resume_training)
+        control_layout.addWidget(self.resume_btn)
+        
+        # 添加暂停/继续按钮
+        self.pause_btn = QPushButton("暂停训练")
+        self.pause_btn.setToolTip("暂停或继续当前训练")
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.clicked.connect(self.toggle_pause_training)
+        control_layout.addWidget(self.pause_btn)
+        
+        # 添加取消按钮
+        self.cancel_btn = QPushButton("取消训练")
+        self.cancel_btn.setToolTip("在当前批次结束后停止训练")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_training)
+        control_layout.addWidget(self.cancel_btn)
+        
         # 添加弹性空间
         control_layout.addStretch()
         
         # 中间训练参数面板
         self.training_panel = TrainingPanel()
+        self.training_panel.set_training_params(self.config.get('training_params', {}))
+        self.training_panel.auto_tune_btn.clicked.connect(self.start_auto_tune)
         
         # 右侧预览面板
         self.preview_panel = PreviewPanel()
+        cache_mb = self.config.get('data_settings', {}).get('thumbnail_cache_mb', 256)
+        self.thumbnail_cache = ThumbnailCache(
+            self.path_manager.get_cache_dir() / 'thumbnails.db', cache_mb)
+        self.preview_panel.set_thumbnail_cache(self.thumbnail_cache)
         
         # 将面板添加到主布局
         main_layout.addWidget(control_panel, 1)      # 比例1
@@ -97,7 +146,7 @@ class MainWindow(QMainWindow):
         # 添加工具栏
         toolbar = QToolBar("主工具栏")
         self.addToolBar(toolbar)
-        toolbar.addAction(QIcon("icons/open.png"), "打开", self.upload_data)
+        self.open_action = toolbar.addAction(QIcon("icons/open.png"), "打开", self.upload_data)
         toolbar.addAction(QIcon("icons/save.png"), "保存", self.save_user_settings)
         
         # 添加帮助按钮
@@ -106,11 +155,13 @@ class MainWindow(QMainWindow):
         help_action.triggered.connect(self.toggle_help_panel)
         
         # 添加设置按钮
-        settings_action = toolbar.addAction(QIcon("icons/settings.png"), "设置")
-        settings_action.setToolTip("打开设置")
-        settings_action.triggered.connect(self.open_settings)
+        self.settings_action = toolbar.addAction(QIcon("icons/settings.png"), "设置")
+        self.settings_action.setToolTip("打开设置")
+        self.settings_action.triggered.connect(self.open_settings)
     
     def upload_data(self):
+        if self.is_busy():
+            return
         folder_path = QFileDialog.getExistingDirectory(
             self,
             "选择训练数据文件夹",
@@ -119,61 +170,257 @@ class MainWindow(QMainWindow):
         )
         
         if folder_path:
-            try:
-                folder_path = Path(folder_path)
-                
-                # 直接保存数据，不做结构校验
-                saved_path = self.path_manager.save_training_data(folder_path)
-                self.status_label.setText(f"数据已保存到: {saved_path}")
-                
-                # 启用训练按钮
-                self.train_btn.setEnabled(True)
-                
-                # 保存上传路径
-                self.config['last_upload_path'] = str(folder_path)
-                self.save_user_settings(None)
-                
-                # 更新预览
-                self.preview_panel.load_images(folder_path)
-                
-            except Exception as e:
-                self.status_label.setText(f"保存数据时出错: {str(e)}")
-                self.train_btn.setEnabled(False)
-    
-    def start_training(self):
-        try:
-            # 禁用训练按钮，防止重复启动
+            # 导入、检查和划分在后台线程中进行，期间禁用会修改数据集或设置的操作
+            self.set_data_controls_enabled(False)
             self.train_btn.setEnabled(False)
-            self.upload_btn.setEnabled(False)
-            self.status_label.setText("准备训练数据...")
-            
-            data_dir = self.path_manager.get_data_dir()
-            
-            # 创建数据集配置
-            yaml_path = self.model_manager.create_dataset_yaml(data_dir)
-            
-            # 获取训练参数
-            params = self.training_panel.get_training_params()
+            self.resume_btn.setEnabled(False)
+            self.training_panel.auto_tune_btn.setEnabled(False)
+            self.status_label.setText("正在准备数据...")
             
-            # 开始训练
-            self.status_label.setText("开始训练...")
+            # 直接保存数据，不做结构校验
+            self.prepare_worker = DatasetPrepareWorker(
+                Path(folder_path), self.config.get('data_settings', {}),
+                self.get_split_ratios(), self.path_manager, self)
+            self.prepare_worker.progress.connect(
+                self.on_training_progress, Qt.ConnectionType.QueuedConnection)
+            self.prepare_worker.prepare_finished.connect(
+                self.on_prepare_finished, Qt.ConnectionType.QueuedConnection)
+            self.training_panel.progress_bar.setValue(0)
             self.training_panel.progress_bar.setVisible(True)
-            
-            results = self.model_manager.train(
-                yaml_path,
-                epochs=params['epochs'],
-                batch_size=params['batch_size']
-            )
-            
+            self.prepare_worker.start()
+    
+    def on_prepare_finished(self, result: dict):
+        """数据准备完成后显示结果和数据集统计，并更新预览"""
+        folder_path = self.prepare_worker.folder_path
+        self.prepare_worker = None
+        self.training_panel.progress_bar.setVisible(False)
+        self.set_data_controls_enabled(True)
+        
+        if 'error' in result:
+            self.status_label.setText(f"保存数据时出错: {result['error']}")
+            self.dataset_dir = None
+            self.training_panel.set_dataset_stats(None)
+            self.train_btn.setEnabled(False)
+            self.training_panel.auto_tune_btn.setEnabled(False)
+            self.update_resume_button()
+            return
+        
+        report = result['report']
+        self.status_label.setText(f"数据已保存到: {report['dest']}")
+        self.status_bar.showMessage(
+            f"新增 {len(report['added'])}，修改 {len(report['changed'])}，"
+            f"删除 {len(report['removed'])}，未变化 {report['unchanged']}")
+        if result['validation'] is not None:
+            self.show_validation_result(report['dest'], result['validation'])
+        self.dataset_dir = result['dataset_dir']
+        
+        # 训练集的通道均值/标准差和尺寸分布，在训练参数旁显示
+        self.training_panel.set_dataset_stats(result['stats'])
+        
+        # 启用训练按钮
+        self.train_btn.setEnabled(True)
+        self.training_panel.auto_tune_btn.setEnabled(True)
+        self.update_resume_button()
+        
+        # 保存上传路径
+        self.config['last_upload_path'] = str(folder_path)
+        self.save_user_settings(None)
+        
+        # 更新预览（类别文件夹从划分时更新过的数据集索引读取文件列表）
+        if is_archive(report['dest']):
+            self.preview_panel.load_images(folder_path)
+        else:
+            index = self.path_manager.get_dataset_index(report['dest'])
+            self.preview_panel.load_images(report['dest'], index)
+            index.close()
+    
+    def is_busy(self) -> bool:
+        """是否有正在运行的数据准备、训练或自动调优"""
+        return any(worker is not None and worker.isRunning()
+                   for worker in (self.prepare_worker, self.training_worker, self.auto_tune_worker))
+    
+    def set_data_controls_enabled(self, enabled: bool):
+        """启用/禁用上传数据和修改设置的入口"""
+        self.upload_btn.setEnabled(enabled)
+        self.open_action.setEnabled(enabled)
+        self.settings_action.setEnabled(enabled)
+    
+    def show_validation_result(self, dataset_dir: Path, result: dict):
+        """在状态栏显示图片检查结果（见 PathManager.validate_dataset）"""
+        quarantined = result['quarantined']
+        if quarantined:
+            reasons = {}
+            for reason in quarantined.values():
+                reasons[reason] = reasons.get(reason, 0) + 1
+            summary = "，".join(f"{REASONS[r]} {n}" for r, n in reasons.items())
+            message = (f"已隔离 {len(quarantined)} 张图片（{summary}），"
+                       f"见 {self.path_manager.get_quarantine_dir(dataset_dir)}")
+        else:
+            message = f"图片检查通过（检查 {result['checked']}，缓存 {result['cached']}）"
+        if result['restored']:
+            message += f"，{len(result['restored'])} 张之前隔离的图片已移回"
+        self.status_bar.showMessage(message)
+    
+    def get_split_ratios(self) -> tuple:
+        """从数据处理设置中读取 (训练集, 验证集, 测试集) 比例"""
+        data_settings = self.config.get('data_settings', {})
+        train = data_settings.get('train_split', 70) / 100
+        val = data_settings.get('val_split', 20) / 100
+        return (train, val, max(1.0 - train - val, 0.0))
+    
+    def find_resume_checkpoint(self):
+        """最近一次中断训练的检查点，没有时返回 None"""
+        model_path = self.config.get('save_settings', {}).get('model_path', '')
+        return find_resumable(self.path_manager.get_run_dir(model_path),
+                              self.path_manager.get_checkpoint_dir(model_path))
+    
+    def update_resume_button(self):
+        self.resume_btn.setEnabled(self.dataset_dir is not None
+                                   and self.find_resume_checkpoint() is not None)
+    
+    def resume_training(self):
+        """从最近一次中断训练的检查点继续训练"""
+        checkpoint = self.find_resume_checkpoint()
+        if checkpoint is None:
+            self.status_label.setText("没有可继续的训练")
+            self.resume_btn.setEnabled(False)
+            return
+        self.start_training(resume=checkpoint)
+    
+    def start_training(self, resume: Path = None):
+        if self.training_worker is not None and self.training_worker.isRunning():
+            return
+        
+        # 禁用训练按钮，防止重复启动
+        self.train_btn.setEnabled(False)
+        self.resume_btn.setEnabled(False)
+        self.upload_btn.setEnabled(False)
+        self.training_panel.auto_tune_btn.setEnabled(False)
+        self.status_label.setText("准备训练数据...")
+        
+        # 获取训练参数
+        params = self.training_panel.get_training_params()
+        model_settings = self.config.get('model_settings', {})
+        params['export_formats'] = model_settings.get('export_formats', [])
+        params['export_int8'] = model_settings.get('export_int8', False)
+        # 训练结果目录和检查点设置（保存设置页）
+        save_settings = self.config.get('save_settings', {})
+        model_path = save_settings.get('model_path', '')
+        params['project'] = str(self.path_manager.get_run_dir(model_path))
+        params['checkpoint_dir'] = str(self.path_manager.get_checkpoint_dir(model_path))
+        params['save_period'] = save_settings.get('save_period', 10)
+        params['save_checkpoint'] = save_settings.get('save_checkpoint', True)
+        params['keep_checkpoints'] = save_settings.get('keep_checkpoints', 3)
+        # 数据增强（数据处理设置中的旋转、翻转、缩放）
+        data_settings = self.config.get('data_settings', {})
+        params['augment'] = {key: data_settings[key] for key in
+                             ('random_rotate', 'random_flip', 'random_scale') if key in data_settings}
+        if resume:
+            params['resume'] = str(resume)
+        
+        # 在后台线程中训练，进度通过排队信号回到界面线程
+        self.training_worker = TrainingWorker(self.dataset_dir, params, self, self.model_manager)
+        self.training_worker.progress.connect(
+            self.on_training_progress, Qt.ConnectionType.QueuedConnection)
+        self.training_worker.stats.connect(
+            self.training_panel.update_stats, Qt.ConnectionType.QueuedConnection)
+        self.training_worker.training_finished.connect(
+            self.on_training_finished, Qt.ConnectionType.QueuedConnection)
+        
+        self.status_label.setText(f"从 {Path(resume).name} 继续训练..." if resume else "开始训练...")
+        self.training_panel.progress_bar.setValue(0)
+        self.training_panel.progress_bar.setVisible(True)
+        self.pause_btn.setText("暂停训练")
+        self.pause_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(True)
+        
+        self.training_worker.start()
+    
+    def start_auto_tune(self):
+        """试训练选择批次大小和数据加载进程数"""
+        if self.dataset_dir is None or (self.auto_tune_worker is not None
+                                        and self.auto_tune_worker.isRunning()):
+            return
+        
+        self.train_btn.setEnabled(False)
+        self.resume_btn.setEnabled(False)
+        self.upload_btn.setEnabled(False)
+        self.training_panel.auto_tune_btn.setEnabled(False)
+        self.status_label.setText("自动调优中...")
+        
+        self.auto_tune_worker = AutoTuneWorker(
+            self.dataset_dir, self.training_panel.get_training_params(), self)
+        self.auto_tune_worker.progress.connect(
+            self.on_training_progress, Qt.ConnectionType.QueuedConnection)
+        self.auto_tune_worker.tune_finished.connect(
+            self.on_auto_tune_finished, Qt.ConnectionType.QueuedConnection)
+        self.training_panel.progress_bar.setValue(0)
+        self.training_panel.progress_bar.setVisible(True)
+        self.auto_tune_worker.start()
+    
+    def on_auto_tune_finished(self, result: dict):
+        """应用调优结果并写回 user_settings.json"""
+        if result.get('batch_size'):
+            self.training_panel.set_training_params(
+                {'batch_size': result['batch_size'], 'workers': result['workers']})
+            self.save_user_settings(None)
+            self.status_label.setText("自动调优完成")
+            self.status_bar.showMessage(
+                f"批次大小 {result['batch_size']}，数据加载进程 {result['workers']}，"
+                f"{result['images_per_sec']:.1f} 张/秒，峰值内存 {result['peak_rss_mb']:.0f} MB")
+        else:
+            self.status_label.setText(result.get('error') or "没有满足内存上限的配置")
+        
+        self.train_btn.setEnabled(True)
+        self.update_resume_button()
+        self.upload_btn.setEnabled(True)
+        self.training_panel.auto_tune_btn.setEnabled(True)
+        self.training_panel.progress_bar.setVisible(False)
+        self.auto_tune_worker = None
+    
+    def on_training_progress(self, value: int, message: str):
+        """更新训练进度"""
+        self.training_panel.progress_bar.setValue(value)
+        self.status_bar.showMessage(message)
+    
+    def on_training_finished(self, success: bool, message: str):
+        """训练结束后恢复界面状态"""
+        if success:
             self.status_label.setText("训练完成！")
-            
-        except Exception as e:
-            self.status_label.setText(f"训练出错: {str(e)}")
-        finally:
-            # 恢复按钮状态
-            self.train_btn.setEnabled(True)
-            self.upload_btn.setEnabled(True)
-            self.training_panel.progress_bar.setVisible(False)
+        else:
+            self.status_label.setText(message or "训练出错")
+        
+        # 恢复按钮状态
+        self.train_btn.setEnabled(True)
+        self.update_resume_button()
+        self.upload_btn.setEnabled(True)
+        self.training_panel.auto_tune_btn.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
+        self.training_panel.progress_bar.setVisible(False)
+        self.training_worker = None
+    
+    def toggle_pause_training(self):
+        """暂停或继续训练"""
+        if self.training_worker is None:
+            return
+        if self.training_worker.is_paused:
+            self.training_worker.resume()
+            self.pause_btn.setText("暂停训练")
+            self.status_bar.showMessage("训练已继续")
+        else:
+            self.training_worker.pause()
+            self.pause_btn.setText("继续训练")
+            self.status_bar.showMessage("将在当前批次结束后暂停...")
+    
+    def cancel_training(self):
+        """取消训练"""
+        if self.training_worker is None:
+            return
+        self.training_worker.cancel()
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
+        self.status_bar.showMessage("正在取消训练...")
     
     def toggle_help_panel(self):
         """显示帮助对话框"""
@@ -182,21 +429,25 @@ class MainWindow(QMainWindow):
     
     def open_settings(self):
         """打开设置对话框"""
-        settings_dialog = SettingsDialog(self)
+        # 数据处理页的图像尺寸与训练参数中的图像尺寸是同一个设置
+        self.config.setdefault('data_settings', {})['img_size'] = self.training_panel.img_size_spin.value()
+        settings_dialog = SettingsDialog(self, self.config)
         if settings_dialog.exec():
             # 如果用户点击了确定，则保存设置
             self.apply_settings(settings_dialog)
     
     def apply_settings(self, dialog):
         """应用设置"""
-        # 应用字体大小
-        font_size = dialog.font_size_spin.value()
-        self.setFont(QFont("Arial", font_size))  # 设置字体
-        
-        # 应用窗口大小
-        width = dialog.width_spin.value()
-        height = dialog.height_spin.value()
-        self.resize(width, height)
-
-        # TODO: 保存其他设置到配置文件
+        # 合并各设置页的配置，保留未在对话框中出现的项
+        for section, values in dialog.get_settings().items():
+            self.config.setdefault(section, {}).update(values)
+        
+        # 同步图像尺寸到训练参数
+        img_size = self.config['data_settings'].get('img_size')
+        if img_size:
+            self.training_panel.img_size_spin.setValue(img_size)
+        
+        # 应用缩略图缓存预算
+        self.thumbnail_cache.set_max_mb(self.config['data_settings'].get('thumbnail_cache_mb', 256))
+        
         self.save_user_settings(dialog)
\ No newline at end of file
@@ -1,7 +1,6 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, 
-                           QScrollArea, QGridLayout)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QPixmap, QImage
+                           QListView, QAbstractItemView)
+from PyQt6.QtCore import Qt, QSize, QPoint
 from pathlib import Path
 try:
     import cv2
@@ -9,6 +8,10 @@ except ImportError:
     print("警告：无法导入cv2，尝试安装 opencv-python")
     # 可以添加一些降级处理逻辑
 import numpy as np
+from utils.dataset_manifest import iter_files
+from utils.path_manager import IMAGE_SUFFIXES
+from utils.thumbnail import resize_to_thumbnail
+from .thumbnail_model import ThumbnailModel, to_qimage
 
 class PreviewPanel(QWidget):
     def __init__(self, parent=None):
@@ -23,30 +26,57 @@ class PreviewPanel(QWidget):
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
         
-        # 创建滚动区域
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        layout.addWidget(scroll)
-        
-        # 创建网格容器
-        self.grid_widget = QWidget()
-        self.grid_layout = QGridLayout(self.grid_widget)
-        scroll.setWidget(self.grid_widget)
-        
         # 设置缩略图大小
         self.thumbnail_size = QSize(100, 100)
         
+        # 缩略图模型：只解码可见的缩略图，解码在线程池中进行
+        self.model = ThumbnailModel(self.thumbnail_size.width(), parent=self)
+        
+        # 创建列表视图（图标模式网格），只为可见条目创建绘制内容
+        self.view = QListView()
+        self.view.setViewMode(QListView.ViewMode.IconMode)
+        self.view.setMovement(QListView.Movement.Static)
+        self.view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.view.setBatchSize(500)
+        self.view.setIconSize(self.thumbnail_size)
+        self.view.setGridSize(QSize(self.thumbnail_size.width() + 10,
+                                    self.thumbnail_size.height() + 10))
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.setModel(self.model)
+        layout.addWidget(self.view)
+        
+        # 滚动或改变大小时更新可见范围，取消滚出范围的解码任务
+        self.view.verticalScrollBar().valueChanged.connect(self.update_visible_rows)
+        self.view.viewport().installEventFilter(self)
+        
         # 设置最小宽度
         self.setMinimumWidth(400)
-        
-        # 记录当前图片数量
-        self.image_count = 0
+    
+    def eventFilter(self, obj, event):
+        if obj is self.view.viewport() and event.type() == event.Type.Resize:
+            self.update_visible_rows()
+        return super().eventFilter(obj, event)
+    
+    def update_visible_rows(self):
+        """计算当前可见的行范围（前后各多预留一屏）"""
+        grid = self.view.gridSize()
+        viewport = self.view.viewport()
+        cols = max(viewport.width() // grid.width(), 1)
+        rows = viewport.height() // grid.height() + 2
+        first_index = self.view.indexAt(QPoint(grid.width() // 2, grid.height() // 2))
+        first = first_index.row() if first_index.isValid() else 0
+        screen = cols * rows
+        self.model.set_visible_rows(max(first - screen, 0), first + 2 * screen)
+    
+    def set_thumbnail_cache(self, cache):
+        """设置持久化缩略图缓存，重新预览同一数据集时不再解码原图"""
+        self.model.cache = cache
     
     def clear_images(self):
         """清除所有图片"""
-        for i in reversed(range(self.grid_layout.count())): 
-            self.grid_layout.itemAt(i).widget().setParent(None)
-        self.image_count = 0
+        self.model.clear()
     
     def add_image(self, image: np.ndarray, tooltip: str = ""):
         """
@@ -58,80 +88,58 @@ class PreviewPanel(QWidget):
         """
         try:
             # 创建缩略图
-            h, w = image.shape[:2]
-            aspect = w / h
-            if aspect > 1:
-                new_w = self.thumbnail_size.width()
-                new_h = int(new_w / aspect)
-            else:
-                new_h = self.thumbnail_size.height()
-                new_w = int(new_h * aspect)
-            
-            img = cv2.resize(image, (new_w, new_h))
-            
-            # 转换为QPixmap
-            height, width = img.shape[:2]
-            bytes_per_line = 3 * width
-            q_img = QImage(img.data, width, height, bytes_per_line,
-                            QImage.Format.Format_RGB888)
-            q_pixmap = QPixmap.fromImage(q_img)
-            
-            # 创建标签显示图片
-            label = QLabel()
-            label.setPixmap(q_pixmap)
-            label.setToolTip(tooltip)
-            
-            # 添加到网格
-            row = self.image_count // 4  # 每行4个图片
-            col = self.image_count % 4
-            self.grid_layout.addWidget(label, row, col)
-            
-            self.image_count += 1
+            img = np.ascontiguousarray(resize_to_thumbnail(image, self.thumbnail_size.width()))
+            self.model.add_image(to_qimage(img), tooltip)
             
         except Exception as e:
             print(f"无法加载图片: {e}")
     
-    def load_images(self, folder_path: Path):
-        """加载文件夹中的图片"""
-        self.clear_images()
+    def load_images(self, folder_path: Path, index=None):
+        """
+        加载文件夹中的图片（包括各类别子文件夹），缩略图在可见时后台解码
         
-        # 获取所有图片文件
-        image_files = list(folder_path.glob("*.jpg")) + list(folder_path.glob("*.png"))
+        Args:
+            folder_path: 图片文件夹
+            index: 该文件夹的数据集索引（utils.dataset_index.DatasetIndex），
+                   提供时从索引读取文件列表，不遍历文件夹，也不显示损坏的图片
+        """
+        folder_path = Path(folder_path)
+        
+        # 获取所有图片文件（只收集路径，不解码）
+        if index is not None:
+            image_files = index.paths(suffixes=IMAGE_SUFFIXES)
+        else:
+            image_files = sorted(folder_path / rel for rel, _ in iter_files(folder_path)
+                                 if rel.lower().endswith(IMAGE_SUFFIXES))
         
         # 调试信息
         print(f"找到 {len(image_files)} 张图片")
         
-        # 创建缩略图
-        for img_path in image_files:
-            try:
-                # 读取图片
-                img = cv2.imread(str(img_path))
-                if img is None:
-                    print(f"无法读取图片: {img_path}")
-                    continue
-                
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                self.add_image(img, img_path.name)
-                
-            except Exception as e:
-                print(f"无法加载图片 {img_path}: {e}") 
+        self.model.set_paths(image_files)
+        self.view.scrollToTop()
+        self.update_visible_rows()
     
     def show_inference_result(self, results):
         """显示推理结果"""
         self.clear_images()
         
-        # 显示原始图片
-        orig_img = results[0].orig_img
+        # 显示原始图片（ultralytics 返回 BGR 格式）
+        orig_img = cv2.cvtColor(results[0].orig_img, cv2.COLOR_BGR2RGB)
         self.add_image(orig_img, "原始图片")
         
         # 显示带预测结果的图片
-        plot_img = results[0].plot()
+        plot_img = cv2.cvtColor(results[0].plot(), cv2.COLOR_BGR2RGB)
         self.add_image(plot_img, "预测结果")
         
         # 添加类别概率
-        probs = results[0].probs.top5
+        probs = results[0].probs
         names = results[0].names
-        for i, prob in enumerate(probs):
-            label = QLabel(f"{names[i]}: {prob:.2%}")
-            self.grid_layout.addWidget(label, self.image_count // 4, self.image_count % 4)
-            self.image_count += 1 
\ No newline at end of file
+        for class_id, prob in zip(probs.top5, probs.top5conf.tolist()):
+            self.model.add_text(f"{names[class_id]}: {prob:.2%}")
+    
+    def shutdown(self):
+        """停止后台解码并关闭缩略图缓存（窗口关闭时调用）"""
+        self.model.shutdown()
+        if self.model.cache is not None:
+            self.model.cache.close()
+            self.model.cache = None
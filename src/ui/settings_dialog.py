@@ -4,11 +4,15 @@ from PyQt6.QtWidgets import (QDialog, QTabWidget, QWidget, QVBoxLayout,
                            QGroupBox, QSlider)
 from PyQt6.QtCore import Qt
 from pathlib import Path
+from utils.image_validator import LAYOUT_CHECKS
+from utils.model_export import EXPORT_FORMATS
 
 class SettingsDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, config: dict = None):
         super().__init__(parent)
         self.setup_ui()
+        if config:
+            self.set_settings(config)
         
     def setup_ui(self):
         self.setWindowTitle("设置")
@@ -22,9 +26,12 @@ class SettingsDialog(QDialog):
         layout.addWidget(tab_widget)
         
         # 添加各个设置页面
-        tab_widget.addTab(ModelSettingsTab(), "模型设置")
-        tab_widget.addTab(DataProcessingTab(), "数据处理")
-        tab_widget.addTab(SaveSettingsTab(), "保存设置")
+        self.model_tab = ModelSettingsTab()
+        self.data_tab = DataProcessingTab()
+        self.save_tab = SaveSettingsTab()
+        tab_widget.addTab(self.model_tab, "模型设置")
+        tab_widget.addTab(self.data_tab, "数据处理")
+        tab_widget.addTab(self.save_tab, "保存设置")
         
         # 添加确定和取消按钮
         button_layout = QHBoxLayout()
@@ -38,6 +45,20 @@ class SettingsDialog(QDialog):
         button_layout.addStretch()
         button_layout.addWidget(save_btn)
         button_layout.addWidget(cancel_btn)
+    
+    def get_settings(self) -> dict:
+        """获取设置"""
+        return {
+            'model_settings': self.model_tab.get_settings(),
+            'data_settings': self.data_tab.get_settings(),
+            'save_settings': self.save_tab.get_settings()
+        }
+    
+    def set_settings(self, config: dict):
+        """根据配置设置界面"""
+        self.model_tab.set_settings(config.get('model_settings', {}))
+        self.data_tab.set_settings(config.get('data_settings', {}))
+        self.save_tab.set_settings(config.get('save_settings', {}))
 
 class ModelSettingsTab(QWidget):
     def __init__(self):
@@ -73,7 +94,37 @@ class ModelSettingsTab(QWidget):
         model_layout.addLayout(model_path_layout)
         
         layout.addWidget(model_group)
+        
+        # 训练完成后导出的格式（见 utils.model_export）
+        export_group = QGroupBox("训练后导出")
+        export_layout = QVBoxLayout(export_group)
+        self.export_checks = {}
+        for fmt in EXPORT_FORMATS:
+            check = QCheckBox(fmt)
+            self.export_checks[fmt] = check
+            export_layout.addWidget(check)
+        self.int8_check = QCheckBox("额外生成 INT8 量化的 ONNX 模型")
+        self.int8_check.setToolTip("需要 onnxruntime，只在导出 ONNX 时生效")
+        self.export_checks['onnx'].toggled.connect(self.int8_check.setEnabled)
+        self.int8_check.setEnabled(False)
+        export_layout.addWidget(self.int8_check)
+        layout.addWidget(export_group)
         layout.addStretch()
+    
+    def get_settings(self) -> dict:
+        """获取模型设置"""
+        return {
+            'export_formats': [fmt for fmt, check in self.export_checks.items() if check.isChecked()],
+            'export_int8': self.int8_check.isChecked()
+        }
+    
+    def set_settings(self, settings: dict):
+        """设置模型选项"""
+        if 'export_formats' in settings:
+            for fmt, check in self.export_checks.items():
+                check.setChecked(fmt in settings['export_formats'])
+        if 'export_int8' in settings:
+            self.int8_check.setChecked(settings['export_int8'])
         
     def browse_model(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -86,6 +137,15 @@ class ModelSettingsTab(QWidget):
             self.path_edit.setText(file_path)
 
 class DataProcessingTab(QWidget):
+    # 导入方式选项（显示文字, 配置值）
+    INGEST_MODE_ITEMS = [
+        ("自动（reflink/硬链接/符号链接）", 'auto'),
+        ("reflink（写时复制）", 'reflink'),
+        ("硬链接", 'hardlink'),
+        ("符号链接", 'symlink'),
+        ("复制", 'copy')
+    ]
+    
     def __init__(self):
         super().__init__()
         self.setup_ui()
@@ -101,21 +161,71 @@ class DataProcessingTab(QWidget):
         size_layout = QHBoxLayout()
         size_label = QLabel("图像大小:")
         self.size_spin = QSpinBox()
-        self.size_spin.setRange(32, 512)
+        self.size_spin.setRange(32, 1280)
         self.size_spin.setValue(224)
+        self.size_spin.setSingleStep(32)
         self.size_spin.setSuffix(" px")
+        self.size_spin.setToolTip("训练和推理时的输入尺寸，与训练参数中的图像尺寸相同")
         size_layout.addWidget(size_label)
         size_layout.addWidget(self.size_spin)
         size_layout.addStretch()
         preprocess_layout.addLayout(size_layout)
         
+        # 数据导入方式
+        ingest_layout = QHBoxLayout()
+        ingest_label = QLabel("导入方式:")
+        self.ingest_combo = QComboBox()
+        for text, mode in self.INGEST_MODE_ITEMS:
+            self.ingest_combo.addItem(text, mode)
+        self.ingest_combo.setToolTip("除“复制”外均不复制图片数据，重新上传只需几秒")
+        ingest_layout.addWidget(ingest_label)
+        ingest_layout.addWidget(self.ingest_combo)
+        ingest_layout.addStretch()
+        preprocess_layout.addLayout(ingest_layout)
+        
+        # 缩略图缓存预算
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(QLabel("缩略图缓存:"))
+        self.thumb_cache_spin = QSpinBox()
+        self.thumb_cache_spin.setRange(16, 65536)
+        self.thumb_cache_spin.setValue(256)
+        self.thumb_cache_spin.setSuffix(" MB")
+        cache_layout.addWidget(self.thumb_cache_spin)
+        cache_layout.addStretch()
+        preprocess_layout.addLayout(cache_layout)
+        
+        # 导入后的图片检查
+        self.validate_check = QCheckBox("导入后检查图片（隔离损坏和不完整的图片）")
+        self.validate_check.setChecked(True)
+        self.full_decode_check = QCheckBox("完整解码检查（较慢）")
+        self.validate_check.toggled.connect(self.full_decode_check.setEnabled)
+        preprocess_layout.addWidget(self.validate_check)
+        preprocess_layout.addWidget(self.full_decode_check)
+        layout_check_layout = QHBoxLayout()
+        layout_check_layout.addWidget(QLabel("灰度/透明通道图片:"))
+        self.layout_check_combo = QComboBox()
+        for value, text in LAYOUT_CHECKS.items():
+            self.layout_check_combo.addItem(text, value)
+        self.layout_check_combo.setCurrentIndex(self.layout_check_combo.findData('minority'))
+        self.layout_check_combo.setToolTip("这类图片训练时会转换为 RGB；默认只隔离与多数图片格式不同的少数图片。"
+                                           "放宽后，之前隔离的图片在下次导入时移回")
+        self.validate_check.toggled.connect(self.layout_check_combo.setEnabled)
+        layout_check_layout.addWidget(self.layout_check_combo)
+        layout_check_layout.addStretch()
+        preprocess_layout.addLayout(layout_check_layout)
+        
         # 数据增强选项
         augment_group = QGroupBox("数据增强")
         augment_layout = QVBoxLayout(augment_group)
         
         self.rotate_check = QCheckBox("随机旋转")
+        self.rotate_check.setToolTip("任意角度旋转，在整理好的批次上整批完成")
         self.flip_check = QCheckBox("随机翻转")
+        self.flip_check.setToolTip("水平和竖直翻转，概率各 50%")
+        self.flip_check.setChecked(True)
         self.scale_check = QCheckBox("随机缩放")
+        self.scale_check.setToolTip("随机裁剪原图 50%-100% 的面积后缩放到图像尺寸")
+        self.scale_check.setChecked(True)
         
         augment_layout.addWidget(self.rotate_check)
         augment_layout.addWidget(self.flip_check)
@@ -144,16 +254,130 @@ class DataProcessingTab(QWidget):
         val_split_layout.addWidget(self.val_split)
         
         # 测试集比例会自动计算
-        test_split_label = QLabel("测试集: 自动计算剩余比例")
+        self.test_split_label = QLabel("测试集: 自动计算剩余比例")
+        self.train_split.valueChanged.connect(self.update_test_split)
+        self.val_split.valueChanged.connect(self.update_test_split)
+        
+        # 划分种子，相同种子总能得到相同划分
+        seed_layout = QHBoxLayout()
+        seed_layout.addWidget(QLabel("划分种子:"))
+        self.split_seed = QSpinBox()
+        self.split_seed.setRange(0, 999999)
+        self.split_seed.setValue(0)
+        seed_layout.addWidget(self.split_seed)
+        seed_layout.addStretch()
+        
+        # 分层划分
+        self.stratify_check = QCheckBox("按类别分层划分")
+        self.stratify_check.setChecked(True)
+        
+        # 每类最多使用的图片数
+        cap_layout = QHBoxLayout()
+        cap_layout.addWidget(QLabel("每类上限:"))
+        self.class_cap_spin = QSpinBox()
+        self.class_cap_spin.setRange(0, 10000000)
+        self.class_cap_spin.setValue(0)
+        self.class_cap_spin.setSpecialValueText("不限制")
+        cap_layout.addWidget(self.class_cap_spin)
+        cap_layout.addStretch()
+        
+        # 近似重复的图片（同一目标的多次截图）放在同一划分，避免测试集泄漏
+        self.dedup_check = QCheckBox("近似重复的图片放在同一划分")
+        self.dedup_check.setChecked(False)
+        self.dedup_check.setToolTip("需要为每张图片计算感知哈希（结果缓存在数据集索引中）；"
+                                    "开启或修改阈值后重复组整组移动，已有的划分会随之改变")
+        dedup_layout = QHBoxLayout()
+        dedup_layout.addWidget(QLabel("重复阈值:"))
+        self.dedup_spin = QSpinBox()
+        self.dedup_spin.setRange(0, 10)
+        self.dedup_spin.setValue(4)
+        self.dedup_spin.setSuffix(" 位")
+        self.dedup_spin.setToolTip("感知哈希（pHash）相差不超过该位数的图片视为重复，0 表示只合并几乎相同的图片")
+        self.dedup_spin.setEnabled(False)
+        self.dedup_check.toggled.connect(self.dedup_spin.setEnabled)
+        dedup_layout.addWidget(self.dedup_spin)
+        dedup_layout.addStretch()
         
         split_layout.addLayout(train_split_layout)
         split_layout.addLayout(val_split_layout)
-        split_layout.addWidget(test_split_label)
+        split_layout.addWidget(self.test_split_label)
+        split_layout.addLayout(seed_layout)
+        split_layout.addWidget(self.stratify_check)
+        split_layout.addLayout(cap_layout)
+        split_layout.addWidget(self.dedup_check)
+        split_layout.addLayout(dedup_layout)
+        self.update_test_split()
         
         layout.addWidget(preprocess_group)
         layout.addWidget(augment_group)
         layout.addWidget(split_group)
         layout.addStretch()
+    
+    def update_test_split(self):
+        """限制验证集比例并显示测试集比例"""
+        self.val_split.setMaximum(min(30, 100 - self.train_split.value()))
+        test = 100 - self.train_split.value() - self.val_split.value()
+        self.test_split_label.setText(f"测试集: {test}%（自动计算剩余比例）")
+    
+    def get_settings(self) -> dict:
+        """获取数据处理设置"""
+        return {
+            'img_size': self.size_spin.value(),
+            'ingest_mode': self.ingest_combo.currentData(),
+            'random_rotate': self.rotate_check.isChecked(),
+            'random_flip': self.flip_check.isChecked(),
+            'random_scale': self.scale_check.isChecked(),
+            'train_split': self.train_split.value(),
+            'val_split': self.val_split.value(),
+            'split_seed': self.split_seed.value(),
+            'stratify': self.stratify_check.isChecked(),
+            'max_per_class': self.class_cap_spin.value(),
+            'dedup_split': self.dedup_check.isChecked(),
+            'dedup_threshold': self.dedup_spin.value(),
+            'validate_images': self.validate_check.isChecked(),
+            'full_decode': self.full_decode_check.isChecked(),
+            'layout_check': self.layout_check_combo.currentData(),
+            'thumbnail_cache_mb': self.thumb_cache_spin.value()
+        }
+    
+    def set_settings(self, settings: dict):
+        """设置数据处理选项"""
+        if 'img_size' in settings:
+            self.size_spin.setValue(settings['img_size'])
+        if 'random_rotate' in settings:
+            self.rotate_check.setChecked(settings['random_rotate'])
+        if 'random_flip' in settings:
+            self.flip_check.setChecked(settings['random_flip'])
+        if 'random_scale' in settings:
+            self.scale_check.setChecked(settings['random_scale'])
+        if 'ingest_mode' in settings:
+            index = self.ingest_combo.findData(settings['ingest_mode'])
+            if index >= 0:
+                self.ingest_combo.setCurrentIndex(index)
+        if 'train_split' in settings:
+            self.train_split.setValue(settings['train_split'])
+        if 'val_split' in settings:
+            self.val_split.setValue(settings['val_split'])
+        if 'split_seed' in settings:
+            self.split_seed.setValue(settings['split_seed'])
+        if 'stratify' in settings:
+            self.stratify_check.setChecked(settings['stratify'])
+        if 'max_per_class' in settings:
+            self.class_cap_spin.setValue(settings['max_per_class'])
+        if 'dedup_split' in settings:
+            self.dedup_check.setChecked(settings['dedup_split'])
+        if 'dedup_threshold' in settings:
+            self.dedup_spin.setValue(settings['dedup_threshold'])
+        if 'validate_images' in settings:
+            self.validate_check.setChecked(settings['validate_images'])
+        if 'full_decode' in settings:
+            self.full_decode_check.setChecked(settings['full_decode'])
+        if 'layout_check' in settings:
+            index = self.layout_check_combo.findData(settings['layout_check'])
+            if index >= 0:
+                self.layout_check_combo.setCurrentIndex(index)
+        if 'thumbnail_cache_mb' in settings:
+            self.thumb_cache_spin.setValue(settings['thumbnail_cache_mb'])
 
 class SaveSettingsTab(QWidget):
     def __init__(self):
@@ -199,6 +423,21 @@ class SaveSettingsTab(QWidget):
         self.save_checkpoint.setChecked(True)
         auto_save_layout.addWidget(self.save_checkpoint)
         
+        # 保留的检查点个数
+        keep_layout = QHBoxLayout()
+        keep_label = QLabel("保留检查点:")
+        self.keep_spin = QSpinBox()
+        self.keep_spin.setRange(0, 100)
+        self.keep_spin.setValue(3)
+        self.keep_spin.setSpecialValueText("全部")
+        self.keep_spin.setToolTip("只保留最近的若干个检查点，更早的自动删除")
+        self.save_checkpoint.toggled.connect(self.freq_spin.setEnabled)
+        self.save_checkpoint.toggled.connect(self.keep_spin.setEnabled)
+        keep_layout.addWidget(keep_label)
+        keep_layout.addWidget(self.keep_spin)
+        keep_layout.addStretch()
+        auto_save_layout.addLayout(keep_layout)
+        
         layout.addWidget(path_group)
         layout.addWidget(auto_save_group)
         layout.addStretch()
@@ -210,4 +449,25 @@ class SaveSettingsTab(QWidget):
             str(Path.home())
         )
         if folder_path:
-            label_widget.setText(folder_path) 
\ No newline at end of file
+            label_widget.setText(folder_path) 
+    
+    def get_settings(self) -> dict:
+        """获取保存设置"""
+        model_path = self.model_path_edit.text()
+        return {
+            'model_path': '' if model_path == "未选择" else model_path,
+            'save_period': self.freq_spin.value(),
+            'save_checkpoint': self.save_checkpoint.isChecked(),
+            'keep_checkpoints': self.keep_spin.value()
+        }
+    
+    def set_settings(self, settings: dict):
+        """设置保存选项"""
+        if settings.get('model_path'):
+            self.model_path_edit.setText(settings['model_path'])
+        if 'save_period' in settings:
+            self.freq_spin.setValue(settings['save_period'])
+        if 'save_checkpoint' in settings:
+            self.save_checkpoint.setChecked(settings['save_checkpoint'])
+        if 'keep_checkpoints' in settings:
+            self.keep_spin.setValue(settings['keep_checkpoints'])
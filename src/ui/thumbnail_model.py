@@ -0,0 +1,177 @@
+from PyQt6.QtCore import (Qt, QAbstractListModel, QModelIndex, QObject,
+                          QRunnable, QThreadPool, QSize, pyqtSignal)
+from PyQt6.QtGui import QImage, QPixmap, QColor
+from collections import OrderedDict
+from pathlib import Path
+from typing import List
+import numpy as np
+from utils.thumbnail import load_thumbnail
+
+def to_qimage(image: np.ndarray) -> QImage:
+    """将 RGB 格式的 numpy 图片转换为 QImage（深拷贝，可跨线程传递）"""
+    height, width = image.shape[:2]
+    bytes_per_line = 3 * width
+    q_img = QImage(image.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
+    return q_img.copy()
+
+class ThumbnailSignals(QObject):
+    """后台解码任务的信号（QRunnable 本身不能发信号）"""
+    # 代号、行号、缩略图（读取失败时为空 QImage）
+    loaded = pyqtSignal(int, int, QImage)
+    # 代号、行号：任务已过期被跳过
+    skipped = pyqtSignal(int, int)
+
+class ThumbnailTask(QRunnable):
+    """在线程池中解码单张缩略图"""
+    def __init__(self, model: 'ThumbnailModel', generation: int, row: int, path: Path):
+        super().__init__()
+        self.model = model
+        self.generation = generation
+        self.row = row
+        self.path = path
+        self.signals = model.signals
+
+    def run(self):
+        # 切换文件夹或滚动离开后，排队中的旧任务直接跳过
+        if not self.model.is_wanted(self.generation, self.row):
+            self.signals.skipped.emit(self.generation, self.row)
+            return
+        try:
+            image = load_thumbnail(self.path, self.model.thumbnail_size, self.model.cache)
+            q_img = to_qimage(image) if image is not None else QImage()
+        except Exception as e:
+            print(f"无法加载图片 {self.path}: {e}")
+            q_img = QImage()
+        self.signals.loaded.emit(self.generation, self.row, q_img)
+
+class ThumbnailModel(QAbstractListModel):
+    """
+    缩略图列表模型
+
+    只有视图请求（即可见）的条目才会在线程池中解码，解码前显示占位图；
+    内存中最多保留 max_cached 张缩略图，切换文件夹或滚动时取消过期的解码任务。
+    """
+    def __init__(self, thumbnail_size: int = 100, max_cached: int = 2000, parent=None):
+        super().__init__(parent)
+        self.thumbnail_size = thumbnail_size
+        self.max_cached = max_cached
+        self.items: List[dict] = []
+        self.generation = 0
+        self.visible_rows = (0, -1)
+        # 可选的持久化缩略图缓存（ThumbnailCache）
+        self.cache = None
+        self._pixmaps: 'OrderedDict[int, QPixmap]' = OrderedDict()
+        self._pending = set()
+        self._failed = set()
+
+        self.pool = QThreadPool()
+        self.signals = ThumbnailSignals()
+        self.signals.loaded.connect(self._on_loaded, Qt.ConnectionType.QueuedConnection)
+        self.signals.skipped.connect(self._on_skipped, Qt.ConnectionType.QueuedConnection)
+
+        self.placeholder = QPixmap(thumbnail_size, thumbnail_size)
+        self.placeholder.fill(QColor(220, 220, 220))
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        item = self.items[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.get('text')
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return item.get('tooltip')
+        if role == Qt.ItemDataRole.DecorationRole:
+            if item.get('path') is None and item.get('image') is None:
+                return None
+            pixmap = self._pixmaps.get(row)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(row)
+                return pixmap
+            if item.get('image') is not None:
+                return self._cache_pixmap(row, QPixmap.fromImage(item['image']))
+            if row not in self._failed:
+                self._request(row)
+            return self.placeholder
+        if role == Qt.ItemDataRole.SizeHintRole:
+            return QSize(self.thumbnail_size + 10, self.thumbnail_size + 10)
+        return None
+
+    def set_paths(self, paths: List[Path]):
+        """显示一组图片文件（只记录路径，可见时才解码）"""
+        self.clear()
+        if not paths:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(paths) - 1)
+        self.items = [{'path': path, 'tooltip': path.name} for path in paths]
+        self.endInsertRows()
+
+    def add_image(self, image: QImage, tooltip: str = ""):
+        """添加一张已解码的图片"""
+        self._append({'image': image, 'tooltip': tooltip})
+
+    def add_text(self, text: str):
+        """添加一个文字条目"""
+        self._append({'text': text})
+
+    def clear(self):
+        """清空模型并取消尚未开始的解码任务"""
+        self.generation += 1
+        self.pool.clear()
+        self.beginResetModel()
+        self.items = []
+        self._pixmaps.clear()
+        self._pending.clear()
+        self._failed.clear()
+        self.endResetModel()
+
+    def set_visible_rows(self, first: int, last: int):
+        """记录当前可见范围，范围外尚未开始的解码任务会被跳过"""
+        self.visible_rows = (first, last)
+
+    def is_wanted(self, generation: int, row: int) -> bool:
+        """供后台线程判断任务是否仍然需要"""
+        first, last = self.visible_rows
+        return generation == self.generation and first <= row <= last
+
+    def _append(self, item: dict):
+        row = len(self.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.append(item)
+        self.endInsertRows()
+
+    def _request(self, row: int):
+        if row in self._pending:
+            return
+        self._pending.add(row)
+        self.pool.start(ThumbnailTask(self, self.generation, row, self.items[row]['path']))
+
+    def _cache_pixmap(self, row: int, pixmap: QPixmap) -> QPixmap:
+        self._pixmaps[row] = pixmap
+        while len(self._pixmaps) > self.max_cached:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def _on_loaded(self, generation: int, row: int, image: QImage):
+        if generation != self.generation:
+            return
+        self._pending.discard(row)
+        if image.isNull():
+            self._failed.add(row)
+            return
+        self._cache_pixmap(row, QPixmap.fromImage(image))
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def _on_skipped(self, generation: int, row: int):
+        if generation == self.generation:
+            self._pending.discard(row)
+
+    def shutdown(self):
+        """取消排队任务并等待正在运行的任务结束"""
+        self.generation += 1
+        self.pool.clear()
+        self.pool.waitForDone()
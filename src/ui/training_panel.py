@@ -1,8 +1,17 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QSpinBox, QDoubleSpinBox, 
                            QComboBox, QGroupBox, QProgressBar,
-                           QCheckBox)
+                           QCheckBox, QPushButton)
 from PyQt6.QtCore import Qt
+import os
+from utils.dataset_stats import suggest_img_size, upscale_ratio
+
+# 图片缓存选项（界面文字 -> 训练参数 cache，见 YOLOTrainer.train）
+CACHE_ITEMS = [("不缓存", False), ("预解码", 'packed'), ("内存", 'ram'), ("磁盘", 'disk')]
+
+# 优化器选项（界面文字 -> 训练参数 optimizer）。自动时由 ultralytics 选择优化器和学习率，
+# 只有指定优化器时才使用学习率设置
+OPTIMIZER_ITEMS = [("自动", 'auto'), ("SGD", 'SGD'), ("AdamW", 'AdamW'), ("Adam", 'Adam')]
 
 class TrainingPanel(QWidget):
     def __init__(self, parent=None):
@@ -48,13 +57,55 @@ class TrainingPanel(QWidget):
         batch_size_layout = QHBoxLayout()
         batch_size_layout.addWidget(QLabel("批次大小:"))
         self.batch_size_spin = QSpinBox()
-        self.batch_size_spin.setRange(1, 128)
+        self.batch_size_spin.setRange(1, 512)
         self.batch_size_spin.setValue(16)
         batch_size_layout.addWidget(self.batch_size_spin)
-        batch_size_layout.addWidget(QLabel("(1-128)"))
+        batch_size_layout.addWidget(QLabel("(1-512)"))
         batch_size_layout.addStretch()
         train_layout.addLayout(batch_size_layout)
         
+        # 数据加载进程数设置
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("数据加载进程:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, 64)
+        self.workers_spin.setValue(min(8, os.cpu_count() or 1))
+        workers_layout.addWidget(self.workers_spin)
+        workers_layout.addWidget(QLabel("(0-64)"))
+        workers_layout.addStretch()
+        train_layout.addLayout(workers_layout)
+        
+        # 图片缓存设置
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(QLabel("图片缓存:"))
+        self.cache_combo = QComboBox()
+        for text, value in CACHE_ITEMS:
+            self.cache_combo.addItem(text, value)
+        self.cache_combo.setToolTip("预解码：划分后把图片缩放、中心裁剪到图像尺寸并打包为内存映射文件，"
+                                    "每轮训练不再重复解码 JPEG；占用磁盘 图片数 x 尺寸² x 3 字节")
+        cache_layout.addWidget(self.cache_combo)
+        cache_layout.addStretch()
+        train_layout.addLayout(cache_layout)
+        
+        # 自动调优批次大小和数据加载进程数（由主窗口连接）
+        self.auto_tune_btn = QPushButton("自动调优")
+        self.auto_tune_btn.setToolTip("试训练若干批次，选择内存上限内最快的批次大小和数据加载进程数")
+        self.auto_tune_btn.setEnabled(False)
+        train_layout.addWidget(self.auto_tune_btn)
+        
+        # 优化器设置
+        optimizer_layout = QHBoxLayout()
+        optimizer_layout.addWidget(QLabel("优化器:"))
+        self.optimizer_combo = QComboBox()
+        for text, value in OPTIMIZER_ITEMS:
+            self.optimizer_combo.addItem(text, value)
+        self.optimizer_combo.setToolTip("自动：由 ultralytics 根据训练轮数选择优化器和学习率，"
+                                        "此时不使用下面的学习率")
+        self.optimizer_combo.currentIndexChanged.connect(self.update_lr_enabled)
+        optimizer_layout.addWidget(self.optimizer_combo)
+        optimizer_layout.addStretch()
+        train_layout.addLayout(optimizer_layout)
+        
         # 学习率设置
         lr_layout = QHBoxLayout()
         lr_layout.addWidget(QLabel("学习率:"))
@@ -66,6 +117,7 @@ class TrainingPanel(QWidget):
         lr_layout.addWidget(QLabel("(0.0001-0.1)"))
         lr_layout.addStretch()
         train_layout.addLayout(lr_layout)
+        self.update_lr_enabled()
         
         # 训练轮数设置
         epochs_layout = QHBoxLayout()
@@ -89,6 +141,23 @@ class TrainingPanel(QWidget):
         train_group.setLayout(train_layout)
         layout.addWidget(train_group)
         
+        # 数据集统计（上传数据后显示），用于选择图像尺寸
+        self.dataset_stats = None
+        self.stats_group = QGroupBox("数据集统计")
+        stats_layout = QVBoxLayout()
+        self.dataset_stats_label = QLabel()
+        self.dataset_stats_label.setWordWrap(True)
+        stats_layout.addWidget(self.dataset_stats_label)
+        self.suggest_size_btn = QPushButton("使用建议尺寸")
+        self.suggest_size_btn.setToolTip("不超过 95% 图片短边的尺寸，避免放大图片带来的额外计算")
+        self.suggest_size_btn.clicked.connect(
+            lambda: self.img_size_spin.setValue(suggest_img_size(self.dataset_stats)))
+        stats_layout.addWidget(self.suggest_size_btn)
+        self.stats_group.setLayout(stats_layout)
+        self.stats_group.setVisible(False)
+        layout.addWidget(self.stats_group)
+        self.img_size_spin.valueChanged.connect(self.update_dataset_stats)
+        
         # 添加进度条
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setRange(0, 100)
@@ -96,18 +165,74 @@ class TrainingPanel(QWidget):
         self.progress_bar.setVisible(False)
         layout.addWidget(self.progress_bar)
         
+        # 训练统计信息（吞吐量、损失、学习率、剩余时间、数据等待占比、峰值内存）
+        self.stats_label = QLabel()
+        self.stats_label.setWordWrap(True)
+        self.stats_label.setToolTip("数据等待占比高说明训练受数据读取/解码限制，低说明受计算限制")
+        self.stats_label.setVisible(False)
+        layout.addWidget(self.stats_label)
+        
         # 添加弹性空间
         layout.addStretch()
     
+    def update_stats(self, event: str, stats: dict):
+        """显示训练监控推送的统计信息"""
+        lines = [f"吞吐量: {stats['images_per_sec']:.1f} 张/秒",
+                 f"数据等待: {stats['data_wait_ratio']:.0%}"]
+        if stats.get('loss') is not None:
+            lines.append(f"损失: {stats['loss']:.4f}")
+        if stats.get('lr') is not None:
+            lines.append(f"学习率: {stats['lr']:.6f}")
+        if stats.get('eta') is not None:
+            minutes, seconds = divmod(int(stats['eta']), 60)
+            hours, minutes = divmod(minutes, 60)
+            lines.append(f"剩余时间: {hours:02d}:{minutes:02d}:{seconds:02d}")
+        if stats.get('peak_rss_mb') is not None:
+            lines.append(f"峰值内存: {stats['peak_rss_mb']:.0f} MB")
+        if event == 'val_end' and 'metrics/accuracy_top1' in stats.get('metrics', {}):
+            lines.append(f"验证 top1: {stats['metrics']['metrics/accuracy_top1']:.2%}")
+        self.stats_label.setText("\n".join(lines))
+        self.stats_label.setVisible(True)
+    
+    def set_dataset_stats(self, stats):
+        """显示数据集统计（见 utils.dataset_stats.compute_stats），None 时隐藏"""
+        self.dataset_stats = stats
+        self.stats_group.setVisible(stats is not None)
+        self.update_dataset_stats()
+    
+    def update_dataset_stats(self):
+        """刷新统计文字（图像尺寸变化时重新计算需要放大的比例）"""
+        stats = self.dataset_stats
+        if stats is None:
+            return
+        short = stats['sizes']['short_edge']
+        img_size = self.img_size_spin.value()
+        lines = [
+            f"训练集图片: {stats['images']}",
+            "均值 (RGB): " + ", ".join(f"{v:.3f}" for v in stats['mean']),
+            "标准差 (RGB): " + ", ".join(f"{v:.3f}" for v in stats['std']),
+            f"短边: 最小 {short['min']}，中位数 {short['median']}，最大 {short['max']} px",
+            f"当前尺寸 {img_size} px 需要放大的图片: {upscale_ratio(stats, img_size):.0%}",
+            f"建议尺寸: {suggest_img_size(stats)} px"
+        ]
+        self.dataset_stats_label.setText("\n".join(lines))
+    
+    def update_lr_enabled(self):
+        """学习率只在指定优化器时生效"""
+        self.lr_spin.setEnabled(self.optimizer_combo.currentData() != 'auto')
+    
     def get_training_params(self):
         """获取训练参数"""
         return {
             'model_size': self.size_combo.currentText(),
             'img_size': self.img_size_spin.value(),
             'batch_size': self.batch_size_spin.value(),
+            'optimizer': self.optimizer_combo.currentData(),
             'learning_rate': self.lr_spin.value(),
             'epochs': self.epochs_spin.value(),
-            'pretrained': self.pretrain_check.isChecked()
+            'pretrained': self.pretrain_check.isChecked(),
+            'workers': self.workers_spin.value(),
+            'cache': self.cache_combo.currentData()
         }
     
     def set_training_params(self, params: dict):
@@ -120,9 +245,19 @@ class TrainingPanel(QWidget):
             self.img_size_spin.setValue(params['img_size'])
         if 'batch_size' in params:
             self.batch_size_spin.setValue(params['batch_size'])
+        if 'optimizer' in params:
+            index = self.optimizer_combo.findData(params['optimizer'])
+            if index >= 0:
+                self.optimizer_combo.setCurrentIndex(index)
         if 'learning_rate' in params:
             self.lr_spin.setValue(params['learning_rate'])
         if 'epochs' in params:
             self.epochs_spin.setValue(params['epochs'])
         if 'pretrained' in params:
-            self.pretrain_check.setChecked(params['pretrained']) 
\ No newline at end of file
+            self.pretrain_check.setChecked(params['pretrained'])
+        if 'workers' in params:
+            self.workers_spin.setValue(params['workers'])
+        if 'cache' in params:
+            index = self.cache_combo.findData(params['cache'])
+            if index >= 0:
+                self.cache_combo.setCurrentIndex(index) 
\ No newline at end of file
@@ -0,0 +1,154 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from pathlib import Path
+from utils.yolo_trainer import YOLOTrainer, TrainingControl, MODEL_SIZES
+from utils.auto_tune import AutoTuner
+from utils.dataset_stats import compute_stats
+from utils.model_manager import ModelManager
+from utils.path_manager import PathManager
+from utils.shard_archive import is_archive
+
+class TrainingWorker(QThread):
+    """在后台线程中运行 YOLOTrainer，避免训练阻塞界面"""
+    # 进度值(0-100)和状态信息
+    progress = pyqtSignal(int, str)
+    # 训练监控事件名和统计信息
+    stats = pyqtSignal(str, dict)
+    # 是否成功和最终状态信息
+    training_finished = pyqtSignal(bool, str)
+
+    def __init__(self, data_path: Path, params: dict, parent=None,
+                 model_manager: ModelManager = None):
+        super().__init__(parent)
+        self.data_path = Path(data_path)
+        self.params = dict(params)
+        self.model_manager = model_manager
+        self.control = TrainingControl()
+        self._last_message = ""
+
+    def run(self):
+        trainer = YOLOTrainer(self.model_manager)
+        trainer.monitor.subscribe(self.stats.emit)
+
+        self.progress.emit(0, "初始化模型...")
+        # 继续训练时模型从检查点加载（见 YOLOTrainer.train）
+        if not self.params.get('resume') and not trainer.init_model(self.params['model_size'], self.params.get('pretrained', True)):
+            self.training_finished.emit(False, "模型初始化失败")
+            return
+
+        success = trainer.train(self.data_path, self.params,
+                                progress_callback=self._on_progress,
+                                control=self.control)
+        self.training_finished.emit(success, self._last_message)
+
+    def _on_progress(self, value: int, message: str):
+        """训练线程中的回调，通过信号转发到界面线程"""
+        self._last_message = message
+        self.progress.emit(value, message)
+
+    def pause(self):
+        """暂停训练"""
+        self.control.pause()
+
+    def resume(self):
+        """继续训练"""
+        self.control.resume()
+
+    def cancel(self):
+        """取消训练"""
+        self.control.cancel()
+
+    @property
+    def is_paused(self) -> bool:
+        return self.control.is_paused
+
+class AutoTuneWorker(QThread):
+    """在后台线程中运行 AutoTuner，试验结束后返回选出的批次大小和数据加载进程数"""
+    # 进度值(0-100)和状态信息
+    progress = pyqtSignal(int, str)
+    # 调优结果（见 AutoTuner.tune）
+    tune_finished = pyqtSignal(dict)
+
+    def __init__(self, data_path: Path, params: dict, parent=None):
+        super().__init__(parent)
+        self.data_path = Path(data_path)
+        self.params = dict(params)
+
+    def run(self):
+        model_name = f"yolo11{MODEL_SIZES.get(self.params['model_size'], self.params['model_size'])}-cls"
+        tuner = AutoTuner(self.data_path, model_name, self.params['img_size'],
+                          cache=self.params.get('cache'))
+        try:
+            result = tuner.tune(self.progress.emit)
+        except Exception as e:
+            result = {'batch_size': None, 'error': str(e)}
+        self.tune_finished.emit(result)
+
+class DatasetPrepareWorker(QThread):
+    """
+    在后台线程中导入、检查、划分和统计上传的数据，完成后返回各步骤的结果
+
+    检查图片、计算感知哈希和统计都需要读取整个数据集，放在界面线程中会让窗口失去响应。
+    """
+    # 进度值(0-100)和状态信息
+    progress = pyqtSignal(int, str)
+    # 结果: report(导入报告)、validation(检查报告或 None)、dataset_dir(划分目录)、
+    # stats(训练集统计或 None)，出错时为 error
+    prepare_finished = pyqtSignal(dict)
+
+    def __init__(self, folder_path: Path, data_settings: dict, split_ratios: tuple,
+                 path_manager: PathManager, parent=None):
+        super().__init__(parent)
+        self.folder_path = Path(folder_path)
+        self.data_settings = dict(data_settings)
+        self.split_ratios = split_ratios
+        self.path_manager = path_manager
+
+    def _step(self, message: str):
+        """返回某一步骤的进度回调 (已完成数, 总数)"""
+        def callback(done, total):
+            self.progress.emit(int(done * 100 / total) if total else 100, f"{message} {done}/{total}")
+        return callback
+
+    def run(self):
+        settings = self.data_settings
+        ingest_mode = settings.get('ingest_mode', 'auto')
+        result = {}
+        try:
+            self.progress.emit(0, "正在导入数据...")
+            report = self.path_manager.sync_training_data(self.folder_path, ingest_mode)
+            result['report'] = report
+
+            # 检查图片，损坏和格式不合格的图片移到隔离目录，不参与划分
+            result['validation'] = None
+            if settings.get('validate_images', True) and not is_archive(report['dest']):
+                result['validation'] = self.path_manager.validate_dataset(
+                    report['dest'], settings.get('full_decode', False),
+                    progress_callback=self._step("正在检查图片"),
+                    layout_check=settings.get('layout_check', 'minority'))
+
+            # 划分训练/验证/测试集（只放置链接，不修改已导入的数据）
+            self.progress.emit(0, "正在划分数据集...")
+            result['dataset_dir'] = self.path_manager.split_dataset(
+                report['dest'],
+                self.split_ratios,
+                mode=ingest_mode,
+                refresh=report['changed'],
+                seed=settings.get('split_seed', 0),
+                stratify=settings.get('stratify', True),
+                max_per_class=settings.get('max_per_class') or None,
+                dedup_threshold=(settings.get('dedup_threshold', 4)
+                                 if settings.get('dedup_split', False) else None),
+                progress_callback=self._step("正在计算感知哈希"))
+        except Exception as e:
+            result['error'] = str(e)
+            self.prepare_finished.emit(result)
+            return
+
+        # 统计训练集的通道均值/标准差和尺寸分布（按划分清单缓存），失败时不影响训练
+        try:
+            result['stats'] = compute_stats(result['dataset_dir'],
+                                            progress_callback=self._step("正在统计数据集"))
+        except Exception as e:
+            print(f"统计数据集失败: {e}")
+            result['stats'] = None
+        self.prepare_finished.emit(result)
@@ -0,0 +1,247 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+import threading
+import time
+try:
+    import psutil
+except ImportError:
+    psutil = None
+from .split_manifest import SplitManifest
+from .training_monitor import peak_rss_mb
+
+# 默认尝试的批次大小
+BATCH_SIZES = (8, 16, 32, 64, 128, 256)
+
+class _TrialFinished(Exception):
+    """试训练达到批次数后从回调中抛出，提前结束训练"""
+
+def tree_rss_mb(process) -> float:
+    """进程（psutil.Process）及其全部子进程（数据加载进程）的常驻内存之和(MB)"""
+    total = 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+def available_memory_mb() -> float:
+    """当前可用内存(MB)，无法获取时返回 inf"""
+    if psutil is not None:
+        return psutil.virtual_memory().available / (1024 * 1024)
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return float('inf')
+
+def default_worker_counts() -> List[int]:
+    """默认尝试的数据加载进程数：0、1、2、4、8... 直到 CPU 核数"""
+    cpus = os.cpu_count() or 1
+    counts = [0]
+    n = 1
+    while n < cpus:
+        counts.append(n)
+        n *= 2
+    counts.append(cpus)
+    return counts
+
+def _run_trial(data_path: str, model_name: str, img_size: int, batch_size: int,
+               workers: int, max_batches: int, warmup: int, cache, result_queue):
+    """
+    试训练进程：训练 max_batches 个批次后停止，测量吞吐量和峰值内存
+
+    在独立进程中运行，使每次试验的峰值内存互不影响；模型只用结构（.yaml）
+    构建，权重不影响速度，也不需要网络。cache 与正式训练的图片缓存方式一致
+    （见 YOLOTrainer.train），否则测得的吞吐量和内存与正式训练不符。
+
+    达到批次数后从回调中抛出 _TrialFinished 结束训练：ultralytics 在最后一轮或
+    trainer.stop 时无论 val 参数如何都会完整验证一次，在大验证集上比试训练本身还慢。
+    没有 psutil 时峰值内存只统计本进程，不含数据加载进程。
+    """
+    import torch
+    from ultralytics import YOLO
+
+    peak = {'mb': 0.0}
+    stop_sampling = threading.Event()
+
+    def sample():
+        process = psutil.Process()
+        while not stop_sampling.wait(0.2):
+            peak['mb'] = max(peak['mb'], tree_rss_mb(process))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    if psutil is not None:
+        sampler.start()
+
+    batch_ends = []
+
+    def on_train_batch_end(trainer):
+        batch_ends.append(time.perf_counter())
+        if len(batch_ends) >= max_batches:
+            raise _TrialFinished()
+
+    try:
+        torch.set_num_threads(os.cpu_count() or 1)
+        extra_args = {}
+        if SplitManifest(data_path).load().mode == 'archive':
+            # 分片归档的划分只能从打包结果训练
+            cache = 'packed'
+        if cache == 'packed':
+            # 打包结果按划分清单缓存，只有第一次试验需要打包
+            from .packed_dataset import PackedClassificationTrainer, pack_dataset
+            pack_dataset(data_path, img_size)
+            extra_args['trainer'] = PackedClassificationTrainer
+        elif cache:
+            extra_args['cache'] = cache
+        model = YOLO(f"{model_name}.yaml")
+        model.add_callback('on_train_batch_end', on_train_batch_end)
+        with tempfile.TemporaryDirectory() as project:
+            try:
+                model.train(data=data_path, imgsz=img_size, batch=batch_size, workers=workers,
+                            epochs=1, device='cpu', val=False, plots=False, save=False,
+                            project=project, exist_ok=True, verbose=False, **extra_args)
+            except _TrialFinished:
+                pass
+        stop_sampling.set()
+        if sampler.is_alive():
+            sampler.join()
+        peak['mb'] = max(peak['mb'], peak_rss_mb() or 0.0)
+
+        # 去掉预热批次后按批次结束时间计算吞吐量（包含等待数据的时间）
+        measured = batch_ends[warmup:]
+        if len(measured) < 2:
+            raise RuntimeError("训练集太小，无法完成试验")
+        seconds = measured[-1] - measured[0]
+        result_queue.put({
+            'images_per_sec': batch_size * (len(measured) - 1) / seconds if seconds > 0 else 0.0,
+            'peak_rss_mb': peak['mb']
+        })
+    except Exception as e:
+        result_queue.put({'error': str(e), 'peak_rss_mb': peak['mb']})
+
+class AutoTuner:
+    """
+    CPU 训练的批次大小和数据加载进程数自动调优
+
+    每次试验在独立进程中训练若干批次，记录吞吐量(张/秒)和峰值内存（含数据加载
+    进程）。先在默认进程数下从小到大尝试批次大小（超过内存上限或失败后不再
+    增大），再在最快的批次大小下尝试不同的进程数，最终选择不超过内存上限的
+    最快配置。
+    """
+    def __init__(self,
+                 data_path: Path,
+                 model_name: str,
+                 img_size: int,
+                 batch_sizes: Iterable[int] = BATCH_SIZES,
+                 worker_counts: Optional[Iterable[int]] = None,
+                 memory_limit_mb: Optional[float] = None,
+                 max_batches: int = 8,
+                 warmup: int = 2,
+                 timeout: float = 600,
+                 cache=None):
+        """
+        Args:
+            data_path: 划分后的数据集目录
+            model_name: 模型名称，如 yolo11n-cls
+            img_size: 训练图像尺寸
+            batch_sizes: 尝试的批次大小
+            worker_counts: 尝试的数据加载进程数，默认见 default_worker_counts
+            memory_limit_mb: 内存上限(MB)，默认为当前可用内存的 80%
+            max_batches: 每次试验训练的批次数
+            warmup: 不计入吞吐量的预热批次数
+            timeout: 单次试验的超时时间(秒)
+            cache: 图片缓存方式（'packed'、'ram'、'disk' 或 None），与训练参数 cache 相同
+        """
+        self.data_path = Path(data_path)
+        self.model_name = model_name
+        self.img_size = img_size
+        self.batch_sizes = sorted(batch_sizes)
+        self.worker_counts = list(worker_counts) if worker_counts else default_worker_counts()
+        self.memory_limit_mb = memory_limit_mb or available_memory_mb() * 0.8
+        self.max_batches = max_batches
+        self.warmup = warmup
+        self.timeout = timeout
+        self.cache = cache
+        self.trials: List[Dict] = []
+
+    def run_trial(self, batch_size: int, workers: int) -> Dict:
+        """运行一次试验，返回 batch_size、workers、images_per_sec、peak_rss_mb、fits（或 error）"""
+        ctx = mp.get_context('spawn')
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=_run_trial, daemon=False, args=(
+            str(self.data_path), self.model_name, self.img_size, batch_size, workers,
+            self.max_batches + self.warmup, self.warmup, self.cache, result_queue))
+        process.start()
+        try:
+            result = result_queue.get(timeout=self.timeout)
+        except queue.Empty:
+            # 超时或进程被系统杀掉（例如内存不足）
+            result = {'error': "试验超时或进程异常退出" if process.is_alive()
+                      else f"试验进程异常退出（退出码 {process.exitcode}）"}
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+        result.update({'batch_size': batch_size, 'workers': workers})
+        result['fits'] = 'error' not in result and result['peak_rss_mb'] <= self.memory_limit_mb
+        self.trials.append(result)
+        return result
+
+    def tune(self, progress_callback: Callable[[int, str], None] = None) -> Dict:
+        """
+        执行调优
+
+        Args:
+            progress_callback: 进度回调，接收进度值(0-100)和状态信息
+
+        Returns:
+            batch_size、workers、images_per_sec、peak_rss_mb、memory_limit_mb 和全部 trials；
+            没有满足内存上限的配置时 batch_size 为 None
+        """
+        cpus = os.cpu_count() or 1
+        default_workers = min(8, cpus)
+        total = len(self.batch_sizes) + len(self.worker_counts)
+        done = 0
+
+        def report(message):
+            if progress_callback:
+                progress_callback(int(done * 100 / total), message)
+
+        # 第一阶段：批次大小
+        best = None
+        for batch_size in self.batch_sizes:
+            report(f"试验批次大小 {batch_size}（{default_workers} 个数据加载进程）...")
+            result = self.run_trial(batch_size, default_workers)
+            done += 1
+            if not result['fits']:
+                break
+            if best is None or result['images_per_sec'] > best['images_per_sec']:
+                best = result
+
+        # 第二阶段：数据加载进程数
+        if best is not None:
+            for workers in self.worker_counts:
+                if workers == best['workers']:
+                    done += 1
+                    continue
+                report(f"试验 {workers} 个数据加载进程（批次大小 {best['batch_size']}）...")
+                result = self.run_trial(best['batch_size'], workers)
+                done += 1
+                if result['fits'] and result['images_per_sec'] > best['images_per_sec']:
+                    best = result
+
+        done = total
+        report("自动调优完成" if best else "没有满足内存上限的配置")
+        return {
+            'batch_size': best['batch_size'] if best else None,
+            'workers': best['workers'] if best else None,
+            'images_per_sec': best['images_per_sec'] if best else None,
+            'peak_rss_mb': best['peak_rss_mb'] if best else None,
+            'memory_limit_mb': self.memory_limit_mb,
+            'trials': self.trials
+        }
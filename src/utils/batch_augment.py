@@ -0,0 +1,65 @@
+from typing import Any, Dict, Optional
+import math
+import torch
+import torch.nn.functional as F
+from ultralytics.models.yolo.classify.train import ClassificationTrainer
+
+# 数据处理设置中的增强选项 -> ultralytics 训练参数
+# 翻转和缩放由 ultralytics 的分类增强（RandomResizedCrop、RandomHorizontal/VerticalFlip）完成；
+# 分类增强不使用 degrees，旋转由 BatchAugmentTrainer 在整理好的批次上完成
+FLIP_PROB = 0.5
+SCALE_GAIN = 0.5
+ROTATE_DEGREES = 180.0
+
+def augment_args(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把数据处理设置（random_rotate、random_flip、random_scale）转换为训练参数
+
+    星系图像没有固定朝向，翻转同时包括水平和竖直方向，旋转为任意角度。
+    """
+    flip = FLIP_PROB if settings.get('random_flip', True) else 0.0
+    return {
+        'fliplr': flip,
+        'flipud': flip,
+        # RandomResizedCrop 的面积范围为 (1 - scale, 1)，0 时不缩放
+        'scale': SCALE_GAIN if settings.get('random_scale', True) else 0.0,
+        'degrees': ROTATE_DEGREES if settings.get('random_rotate', False) else 0.0
+    }
+
+def rotate_batch(images: torch.Tensor, degrees: float,
+                 generator: Optional[torch.Generator] = None) -> torch.Tensor:
+    """
+    整批随机旋转
+
+    每张图片的角度在 [-degrees, degrees] 内均匀抽取，所有图片的旋转用一次
+    affine_grid + grid_sample 完成（双线性插值，超出原图的部分补 0），
+    代替逐张图片在数据加载进程中用 PIL 旋转。
+
+    Args:
+        images: (N, C, H, W) 浮点张量
+        degrees: 最大旋转角度
+        generator: 随机数生成器，None 时使用 torch 的全局随机数状态
+    """
+    n = images.shape[0]
+    angles = (torch.rand(n, generator=generator) * 2 - 1) * math.radians(degrees)
+    cos, sin = torch.cos(angles), torch.sin(angles)
+    zeros = torch.zeros_like(cos)
+    theta = torch.stack([torch.stack([cos, -sin, zeros], dim=1),
+                         torch.stack([sin, cos, zeros], dim=1)], dim=1)
+    theta = theta.to(device=images.device, dtype=images.dtype)
+    grid = F.affine_grid(theta, list(images.shape), align_corners=False)
+    return F.grid_sample(images, grid, mode='bilinear', padding_mode='zeros', align_corners=False)
+
+class BatchAugmentTrainer(ClassificationTrainer):
+    """
+    在整理好的批次上做张量级数据增强的分类训练器
+
+    ultralytics 的分类增强不支持旋转（degrees 只用于检测任务）。这里在批次移到
+    训练设备后整批旋转，只在训练时生效，验证不受影响；degrees 为 0 时与
+    ClassificationTrainer 完全相同。
+    """
+    def preprocess_batch(self, batch: dict) -> dict:
+        batch = super().preprocess_batch(batch)
+        if self.args.degrees > 0:
+            batch['img'] = rotate_batch(batch['img'], self.args.degrees)
+        return batch
@@ -0,0 +1,209 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import queue
+import random
+import re
+import shutil
+import threading
+import numpy as np
+import torch
+
+# 周期检查点的文件名: epoch<轮次>.pt，随机数状态保存在同名的 .rng 文件中
+EPOCH_PATTERN = re.compile(r'^epoch(\d+)\.pt$')
+
+def capture_rng_state() -> Dict[str, Any]:
+    """Python、NumPy 和 torch（含 CUDA）的全局随机数状态"""
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state()
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+def restore_rng_state(state: Dict[str, Any]):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+def rng_path(checkpoint: Path) -> Path:
+    return Path(checkpoint).with_suffix('.rng')
+
+def checkpoint_state(checkpoint: Path) -> Optional[Tuple[int, int, bool]]:
+    """返回 (已完成的轮次, 总轮次, 是否包含优化器状态)，无法读取时返回 None"""
+    try:
+        ckpt = torch.load(checkpoint, map_location='cpu', weights_only=False)
+    except Exception:
+        return None
+    epochs = (ckpt.get('train_args') or {}).get('epochs', 0)
+    done = ckpt.get('epoch', -1) + 1
+    if done <= 0:
+        # 训练结束后精简过的权重不再记录轮次，从训练结果中取
+        done = int(max((ckpt.get('train_results') or {}).get('epoch') or [0]))
+    return done, epochs, ckpt.get('optimizer') is not None
+
+def find_resumable(*directories: Path) -> Optional[Path]:
+    """
+    在训练输出目录（*/weights/last.pt）和检查点目录（*/epoch*.pt）中
+    查找最新的可继续训练的检查点
+
+    训练正常结束后 ultralytics 会去掉 last.pt 中的优化器状态，因此只会找到
+    中断（崩溃、被抢占或取消）的训练；已经训练完的训练的周期检查点也会跳过。
+    """
+    candidates = []
+    for directory in directories:
+        directory = Path(directory)
+        if directory.is_dir():
+            candidates += directory.glob('*/weights/last.pt')
+            candidates += (p for p in directory.glob('*/epoch*.pt') if EPOCH_PATTERN.match(p.name))
+    finished = set()
+    for checkpoint in sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True):
+        is_last = checkpoint.name == 'last.pt'
+        run_name = checkpoint.parent.parent.name if is_last else checkpoint.parent.name
+        state = checkpoint_state(checkpoint)
+        if state is None or run_name in finished:
+            continue
+        done, epochs, has_optimizer = state
+        if has_optimizer and done < epochs:
+            return checkpoint
+        if is_last and done >= epochs:
+            finished.add(run_name)
+    return None
+
+class CheckpointWriter:
+    """
+    后台线程写检查点
+
+    训练线程只负责提交任务，复制到保存目录和清理旧检查点都在后台线程中完成，
+    不占用训练时间；每个文件先写临时文件再改名，中断时不会留下损坏的检查点。
+    """
+    def __init__(self, directory: Path, keep: int = 3):
+        """
+        Args:
+            directory: 检查点目录
+            keep: 保留最近的检查点个数，0 表示全部保留
+        """
+        self.directory = Path(directory)
+        self.keep = keep
+        self.errors: List[str] = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, source: Path, epoch: int, rng_state: Dict[str, Any]):
+        """把 source（刚写好的 last.pt）复制为 epoch<epoch>.pt"""
+        # 源文件会在下一轮被覆盖，先等上一个任务写完
+        self.wait()
+        self._queue.put((Path(source), epoch, rng_state))
+
+    def wait(self):
+        """等待已提交的检查点全部写完"""
+        self._queue.join()
+
+    def close(self):
+        self.wait()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                self._write(*task)
+            except Exception as e:
+                self.errors.append(str(e))
+                print(f"保存检查点失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, source: Path, epoch: int, rng_state: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / f"epoch{epoch}.pt"
+        tmp_path = target.with_suffix('.tmp')
+        rng_tmp_path = target.with_suffix('.rngtmp')
+        shutil.copyfile(source, tmp_path)
+        torch.save(rng_state, rng_tmp_path)
+        os.replace(rng_tmp_path, rng_path(target))
+        os.replace(tmp_path, target)
+        self._prune()
+
+    def _prune(self):
+        if self.keep <= 0:
+            return
+        checkpoints = sorted((int(m.group(1)), p) for p in self.directory.iterdir()
+                             if (m := EPOCH_PATTERN.match(p.name)))
+        for _, path in checkpoints[:-self.keep]:
+            path.unlink(missing_ok=True)
+            rng_path(path).unlink(missing_ok=True)
+
+class CheckpointManager:
+    """
+    训练检查点
+
+    - 每 period 轮把 ultralytics 的 last.pt（含优化器、EMA 和轮次）异步复制到
+      检查点目录，只保留最近 keep 个
+    - 每轮在 last.pt 旁保存随机数状态，继续训练时恢复，
+      使中断后继续的训练与不中断时尽量一致
+
+    学习率调度由 ultralytics 根据恢复的轮次重新计算，不需要单独保存。
+    """
+    def __init__(self, checkpoint_dir: Path, period: int = 10, keep: int = 3, enabled: bool = True):
+        """
+        Args:
+            checkpoint_dir: 检查点目录，每次训练保存在其下与训练输出目录同名的子目录中
+            period: 保存周期（轮）
+            keep: 保留最近的检查点个数，0 表示全部保留
+            enabled: 为 False 时不保存周期检查点，只在 last.pt 旁保存随机数状态
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.period = max(1, period)
+        self.keep = keep
+        self.enabled = enabled
+        self.writer: Optional[CheckpointWriter] = None
+        # 继续训练时设为所用的检查点，第一轮开始前恢复其随机数状态
+        self.resume_from: Optional[Path] = None
+
+    def attach(self, model):
+        """把回调注册到 ultralytics 模型"""
+        model.add_callback('on_train_epoch_start', self.on_train_epoch_start)
+        model.add_callback('on_model_save', self.on_model_save)
+        model.add_callback('on_train_end', self.on_train_end)
+
+    def on_train_epoch_start(self, trainer):
+        # 只在继续训练的第一轮恢复一次
+        if self.resume_from is None:
+            return
+        path = rng_path(self.resume_from)
+        if path.exists():
+            restore_rng_state(torch.load(path, weights_only=False))
+        self.resume_from = None
+
+    def on_model_save(self, trainer):
+        rng_state = capture_rng_state()
+        torch.save(rng_state, rng_path(trainer.last))
+        if not self.enabled:
+            return
+        if self.writer is None:
+            self.writer = CheckpointWriter(self.checkpoint_dir / Path(trainer.save_dir).name, self.keep)
+        epoch = trainer.epoch + 1
+        # 提前停止（取消、早停）时也保存一次，训练结束后 last.pt 会去掉优化器状态
+        interrupted = trainer.stop and epoch < trainer.epochs
+        if epoch % self.period == 0 or interrupted:
+            self.writer.submit(trainer.last, epoch, rng_state)
+        if trainer.stop:
+            # 随后的最终验证会改写 last.pt，先等复制完成
+            self.writer.wait()
+
+    def on_train_end(self, trainer):
+        self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
@@ -10,8 +10,38 @@ class ConfigManager:
             'last_upload_path': str(Path.home()),  # 上次上传文件的路径
             'training_params': {
                 'batch_size': 16,
+                'optimizer': 'auto',  # 'auto' 时由 ultralytics 选择优化器和学习率，忽略 learning_rate
                 'learning_rate': 0.001,
                 'epochs': 100
+            },
+            'data_settings': {
+                'ingest_mode': 'auto',  # 数据导入方式，见 utils.file_ops.INGEST_MODES
+                'train_split': 70,      # 训练集比例(%)
+                'val_split': 20,        # 验证集比例(%)，测试集为剩余部分
+                'split_seed': 0,
+                'stratify': True,
+                'max_per_class': 0,     # 每类最多使用的图片数，0 表示不限制
+                'dedup_split': False,   # 近似重复的图片放在同一划分（开启后划分会改变）
+                'dedup_threshold': 4,   # 近似重复的感知哈希距离阈值（位）
+                'validate_images': True,  # 导入后检查图片并隔离损坏、不完整的文件
+                'full_decode': False,     # 检查时完整解码每张图片（较慢）
+                'layout_check': 'minority',  # 灰度、透明通道等格式的检查，见 utils.image_validator.LAYOUT_CHECKS
+                'thumbnail_cache_mb': 256,  # 缩略图缓存预算(MB)
+                # 数据增强，见 utils.batch_augment.augment_args（翻转和缩放与 ultralytics 默认一致）
+                'random_rotate': False,
+                'random_flip': True,
+                'random_scale': True
+            },
+            'model_settings': {
+                'model_cache_mb': 1024,  # 已加载模型的内存预算(MB)
+                'export_formats': [],    # 训练完成后导出的格式，见 utils.model_export.EXPORT_FORMATS
+                'export_int8': False     # 是否额外生成 INT8 量化的 ONNX 模型
+            },
+            'save_settings': {
+                'model_path': '',         # 训练结果保存目录，空表示 models/runs
+                'save_period': 10,        # 检查点保存周期（轮）
+                'save_checkpoint': True,  # 是否保存周期检查点
+                'keep_checkpoints': 3     # 保留最近的检查点个数，0 表示全部保留
             }
         }
         self._ensure_config_file()
@@ -7,18 +7,18 @@ class DatasetConfig:
         self.project_path = project_path
         self.config_path = project_path / 'data.yaml'
         self.default_config = {
-            'train': './train/images',
-            'val': './valid/images',
-            'test': './test/images',
+            'train': './train',
+            'val': './valid',
+            'test': './test',
             'nc': 0,
             'names': []
         }
     
     def create_directory_structure(self):
-        """创建数据集目录结构"""
-        (self.project_path / 'train' / 'images').mkdir(parents=True, exist_ok=True)
-        (self.project_path / 'valid' / 'images').mkdir(parents=True, exist_ok=True)
-        (self.project_path / 'test' / 'images').mkdir(parents=True, exist_ok=True)
+        """创建数据集目录结构（ultralytics 分类数据集格式: <划分>/<类别>/<图片>）"""
+        (self.project_path / 'train').mkdir(parents=True, exist_ok=True)
+        (self.project_path / 'valid').mkdir(parents=True, exist_ok=True)
+        (self.project_path / 'test').mkdir(parents=True, exist_ok=True)
     
     def save_config(self, config: Dict):
         """保存数据集配置"""
@@ -37,4 +37,15 @@ class DatasetConfig:
         config = self.load_config()
         config['nc'] = len(class_names)
         config['names'] = class_names
+        # 手动修改的类别没有对应的图片数
+        config.pop('counts', None)
+        self.save_config(config)
+    
+    def update_from_index(self, index):
+        """从数据集索引（utils.dataset_index.DatasetIndex）更新类别信息和每个类别的图片数"""
+        counts = index.class_counts()
+        config = self.load_config()
+        config['nc'] = len(counts)
+        config['names'] = list(counts)
+        config['counts'] = counts
         self.save_config(config) 
\ No newline at end of file
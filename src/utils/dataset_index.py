@@ -0,0 +1,218 @@
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import os
+import sqlite3
+from .thumbnail import read_image_size
+
+def index_path_for(dataset_dir: Path, index_dir: Path) -> Path:
+    """数据集索引文件位置: <索引目录>/<数据集名称>-<路径哈希>.sqlite"""
+    dataset_dir = Path(dataset_dir).resolve()
+    digest = hashlib.blake2b(str(dataset_dir).encode('utf-8'), digest_size=8).hexdigest()
+    return Path(index_dir) / f"{dataset_dir.name}-{digest}.sqlite"
+
+def _probe(path: str) -> Tuple[Optional[int], Optional[int], int]:
+    """读取文件头得到 (宽, 高, 是否损坏)，空文件或无法识别的文件头视为损坏"""
+    size = read_image_size(path)
+    if size is None:
+        return None, None, 1
+    return size[0], size[1], 0
+
+class DatasetIndex:
+    """
+    类别文件夹数据集的持久化索引（SQLite）
+
+    一次 os.scandir 遍历记录每个文件的类别、大小、修改时间、图片尺寸（只读文件头）
+    和损坏标记，预览、划分和数据集配置都从索引查询，不再各自遍历数据集。
+
+    增量更新：目录的修改时间没有变化时，其中没有新增、删除或改名的文件，
+    直接跳过整个目录；只有变化的目录才重新列出并比较文件的大小和修改时间。
+    原地改写文件内容不会改变目录的修改时间，需要时用 refresh(full=True) 完整检查。
+    """
+    def __init__(self, dataset_dir: Path, db_path: Path, suffixes: Tuple[str, ...] = ('.jpg', '.png')):
+        """
+        Args:
+            dataset_dir: 数据集目录（每个子目录为一个类别）
+            db_path: 索引文件路径（见 index_path_for）
+            suffixes: 记录的图片后缀（小写）
+        """
+        self.dataset_dir = Path(dataset_dir)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.suffixes = tuple(suffixes)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                rel TEXT PRIMARY KEY,
+                class TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                corrupt INTEGER NOT NULL,
+                phash INTEGER,
+                dhash INTEGER
+            )
+        """)
+        # 旧版本的索引没有感知哈希列（文件变化时整行替换，哈希随之清空）
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        for column in ('phash', 'dhash'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} INTEGER")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_class ON files(class)")
+        # 目录（根目录为 ''，其余为类别名称）及其修改时间
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                rel TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def refresh(self, full: bool = False, workers: int = 8) -> Dict[str, int]:
+        """
+        增量更新索引
+
+        Args:
+            full: 为 True 时检查所有目录，不按目录修改时间跳过
+            workers: 读取新文件头的线程数
+
+        Returns:
+            统计信息: added、changed、removed、skipped_dirs
+        """
+        known_dirs = dict(self.conn.execute("SELECT rel, mtime_ns FROM dirs"))
+        seen_dirs = {}
+        updates = []   # 需要读取文件头的 (rel, class, size, mtime_ns)
+        removed = []
+        skipped = 0
+
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            directory = self.dataset_dir / rel_dir if rel_dir else self.dataset_dir
+            try:
+                mtime_ns = directory.stat().st_mtime_ns
+            except OSError:
+                continue
+            seen_dirs[rel_dir] = mtime_ns
+            unchanged = not full and known_dirs.get(rel_dir) == mtime_ns
+            if unchanged:
+                # 目录内容没有变化：子目录列表取自索引，不再列出文件
+                skipped += 1
+                if not rel_dir:
+                    stack.extend(d for d in known_dirs if d)
+                continue
+
+            indexed = {rel: (size, mtime) for rel, size, mtime in self.conn.execute(
+                "SELECT rel, size, mtime_ns FROM files WHERE class = ?", (rel_dir,))}
+            present = set()
+            with os.scandir(directory) as it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if not rel_dir and entry.is_dir():
+                        # 只记录一层类别目录，与划分时的遍历范围一致
+                        stack.append(rel)
+                    elif rel_dir and entry.name.lower().endswith(self.suffixes) and entry.is_file():
+                        st = entry.stat()
+                        present.add(rel)
+                        if indexed.get(rel) != (st.st_size, st.st_mtime_ns):
+                            updates.append((rel, rel_dir, st.st_size, st.st_mtime_ns))
+            removed += [rel for rel in indexed if rel not in present]
+
+        # 删除的类别目录及其中的文件
+        gone_dirs = [d for d in known_dirs if d not in seen_dirs]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            probes = list(executor.map(_probe, (str(self.dataset_dir / u[0]) for u in updates)))
+
+        known_files = {rel for rel, in self.conn.execute("SELECT rel FROM files")} if updates else set()
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE rel = ?", [(rel,) for rel in removed])
+            self.conn.executemany("DELETE FROM files WHERE class = ?", [(d,) for d in gone_dirs])
+            self.conn.executemany("DELETE FROM dirs WHERE rel = ?", [(d,) for d in gone_dirs])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (rel, class, size, mtime_ns, width, height, corrupt) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*u, width, height, 1 if u[2] == 0 else corrupt)
+                 for u, (width, height, corrupt) in zip(updates, probes)])
+            self.conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?)", list(seen_dirs.items()))
+
+        changed = sum(1 for u in updates if u[0] in known_files)
+        return {
+            'added': len(updates) - changed,
+            'changed': changed,
+            'removed': len(removed),
+            'skipped_dirs': skipped
+        }
+
+    def classes(self) -> List[str]:
+        """类别名称（顶层子目录，已排序，包括空的类别目录）"""
+        return [rel for rel, in self.conn.execute(
+            "SELECT rel FROM dirs WHERE rel != '' AND instr(rel, '/') = 0 ORDER BY rel")]
+
+    def class_counts(self, include_corrupt: bool = False) -> Dict[str, int]:
+        """每个类别的图片数"""
+        counts = dict.fromkeys(self.classes(), 0)
+        sql = "SELECT class, COUNT(*) FROM files"
+        if not include_corrupt:
+            sql += " WHERE corrupt = 0"
+        counts.update(self.conn.execute(sql + " GROUP BY class"))
+        return counts
+
+    def files(self, class_name: Optional[str] = None,
+              suffixes: Optional[Iterable[str]] = None,
+              include_corrupt: bool = False) -> List[str]:
+        """图片的相对路径（类别/文件名），按路径排序"""
+        clauses, args = [], []
+        if class_name is not None:
+            clauses.append("class = ?")
+            args.append(class_name)
+        if not include_corrupt:
+            clauses.append("corrupt = 0")
+        sql = "SELECT rel FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        rels = [rel for rel, in self.conn.execute(sql + " ORDER BY rel", args)]
+        if suffixes:
+            suffixes = tuple(suffixes)
+            rels = [rel for rel in rels if rel.lower().endswith(suffixes)]
+        return rels
+
+    def paths(self, **kwargs) -> List[Path]:
+        """图片的完整路径，参数同 files"""
+        return [self.dataset_dir / rel for rel in self.files(**kwargs)]
+
+    def missing_hashes(self) -> List[str]:
+        """还没有计算感知哈希的图片（不含损坏的图片），见 utils.dedup"""
+        return [rel for rel, in self.conn.execute(
+            "SELECT rel FROM files WHERE phash IS NULL AND corrupt = 0 ORDER BY rel")]
+
+    def set_hashes(self, rows: Iterable[Tuple[str, int, int]]):
+        """保存感知哈希 (相对路径, pHash, dHash)，哈希为有符号 64 位整数"""
+        with self.conn:
+            self.conn.executemany("UPDATE files SET phash = ?, dhash = ? WHERE rel = ?",
+                                  [(phash, dhash, rel) for rel, phash, dhash in rows])
+
+    def hashes(self, method: str = 'phash') -> List[Tuple[str, int]]:
+        """已计算的感知哈希 [(相对路径, 哈希)]，method 为 phash 或 dhash"""
+        assert method in ('phash', 'dhash')
+        return list(self.conn.execute(
+            f"SELECT rel, {method} FROM files WHERE {method} IS NOT NULL AND corrupt = 0 ORDER BY rel"))
+
+    def corrupt_files(self) -> List[str]:
+        return [rel for rel, in self.conn.execute("SELECT rel FROM files WHERE corrupt = 1 ORDER BY rel")]
+
+    def summary(self) -> Dict[str, object]:
+        """总体统计: files、bytes、corrupt、min/max 宽高"""
+        row = self.conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(corrupt), 0),
+                   MIN(width), MAX(width), MIN(height), MAX(height)
+            FROM files
+        """).fetchone()
+        keys = ('files', 'bytes', 'corrupt', 'min_width', 'max_width', 'min_height', 'max_height')
+        return dict(zip(keys, row))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,151 @@
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Tuple
+import hashlib
+import json
+import os
+try:
+    import xxhash
+except ImportError:
+    # 未安装 xxhash 时使用标准库的 blake2b
+    xxhash = None
+from .file_ops import FileLinker
+
+HASH_NAME = 'xxh3_64' if xxhash is not None else 'blake2b'
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """计算文件内容哈希（优先 xxhash，否则 blake2b）"""
+    hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return f"{HASH_NAME}:{hasher.hexdigest()}"
+
+def iter_files(folder: Path) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    递归遍历目录，返回 (相对路径, stat)
+
+    相对路径统一使用 / 分隔，便于跨平台比较
+    """
+    stack = [(Path(folder), '')]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                rel = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), f"{rel}/"))
+                elif entry.is_file():
+                    yield rel, entry.stat()
+
+class DatasetManifest:
+    """
+    数据集清单，记录每个文件的路径、大小、修改时间和内容哈希
+
+    用于增量导入：只链接/复制新增或变化的文件，并删除源中已移除的文件
+    """
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = Path(manifest_path)
+        self.source = None
+        self.mode = None
+        self.entries: Dict[str, Dict] = {}
+
+    def load(self) -> 'DatasetManifest':
+        """加载清单，文件不存在时保持为空"""
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.source = data.get('source')
+            self.mode = data.get('mode')
+            self.entries = data.get('files', {})
+        return self
+
+    def save(self):
+        """保存清单（先写临时文件再替换，避免中断时损坏）"""
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'source': self.source,
+                'mode': self.mode,
+                'hash': HASH_NAME,
+                'files': self.entries
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync(self, src_dir: Path, dst_dir: Path, mode: str = 'auto', workers: int = 8) -> Dict:
+        """
+        将 src_dir 增量同步到 dst_dir
+
+        大小和修改时间都未变化的文件直接跳过；变化的文件重新计算哈希，
+        内容确实变化时才重新链接/复制。
+
+        Returns:
+            变化报告，包含 added/changed/removed 文件列表和 unchanged 数量
+        """
+        src_dir = Path(src_dir)
+        dst_dir = Path(dst_dir)
+        linker = FileLinker(mode)
+        old_entries = self.entries
+        new_entries = {}
+        report = {'added': [], 'changed': [], 'removed': [], 'unchanged': 0}
+
+        # 第一遍：根据大小和修改时间筛选需要计算哈希的文件
+        to_hash = []
+        for rel, st in iter_files(src_dir):
+            old = old_entries.get(rel)
+            entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            if (old is not None and old['size'] == st.st_size
+                    and old['mtime_ns'] == st.st_mtime_ns
+                    and (os.path.lexists(dst_dir / rel) or 'quarantined' in old)):
+                # 已隔离的文件（见 utils.image_validator）内容未变化时不再放回
+                entry['hash'] = old['hash']
+                if 'quarantined' in old:
+                    entry['quarantined'] = old['quarantined']
+                report['unchanged'] += 1
+            else:
+                to_hash.append(rel)
+            new_entries[rel] = entry
+
+        # 并行计算哈希（hashlib 在计算大块数据时会释放 GIL）
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hashes = executor.map(lambda rel: file_hash(src_dir / rel), to_hash)
+            for rel, digest in zip(to_hash, hashes):
+                new_entries[rel]['hash'] = digest
+                old = old_entries.get(rel)
+                dst = dst_dir / rel
+                if old is not None and old['hash'] == digest and os.path.lexists(dst):
+                    # 只是修改时间变了，内容相同
+                    report['unchanged'] += 1
+                    continue
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                linker.link(src_dir / rel, dst)
+                report['changed' if old is not None else 'added'].append(rel)
+
+        # 删除源中已不存在的文件
+        for rel in old_entries.keys() - new_entries.keys():
+            dst = dst_dir / rel
+            if os.path.lexists(dst):
+                os.unlink(dst)
+            report['removed'].append(rel)
+            self._remove_empty_parents(dst.parent, dst_dir)
+
+        self.source = str(src_dir)
+        self.mode = mode
+        self.entries = new_entries
+        return report
+
+    @staticmethod
+    def _remove_empty_parents(directory: Path, stop_dir: Path):
+        """向上删除因移除文件而变空的目录，直到 stop_dir"""
+        while directory != stop_dir and stop_dir in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                # 目录非空或已删除
+                break
+            directory = directory.parent
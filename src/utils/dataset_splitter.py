@@ -0,0 +1,154 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import hashlib
+import heapq
+import math
+import os
+from .shard_archive import is_archive, open_archive
+
+def hash_unit(key: str, seed: int, salt: str = '') -> float:
+    """将 (种子, 键) 映射为 [0, 1) 之间的确定性伪随机数"""
+    digest = hashlib.blake2b(f"{seed}:{salt}:{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+class DatasetSplitter:
+    """
+    基于哈希的流式数据集划分
+
+    两种方式，同样的文件集合和种子总能得到同样的划分，与遍历顺序无关：
+    - 流式（不分层，或类别超过 exact_threshold 时）：每个文件的划分只由其相对路径
+      和种子的哈希决定，与文件总数无关，调整比例时只有落在阈值附近的文件会移动
+    - 精确分层（默认，类别不超过 exact_threshold 时）：类别内按哈希排序后按比例
+      切分，比例精确，但文件的划分取决于它在类别内的排名，增删文件可能使
+      切分点附近的其他文件移动到相邻划分
+    """
+    def __init__(self,
+                 split_ratios: tuple = (0.7, 0.2, 0.1),
+                 seed: int = 0,
+                 stratify: bool = True,
+                 max_per_class: Optional[int] = None,
+                 exact_threshold: int = 10000,
+                 suffixes: tuple = ('.jpg', '.png'),
+                 index=None,
+                 groups: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            split_ratios: (训练集比例, 验证集比例, 测试集比例)
+            seed: 随机种子
+            stratify: 是否分层划分。开启时文件数不超过 exact_threshold 的类别按哈希排序后
+                      精确按比例划分（小类别的比例误差最明显）；更大的类别逐个文件按哈希
+                      流式划分，相对误差约为 1/sqrt(n)
+            max_per_class: 每个类别最多保留的文件数（按哈希确定性抽样），None 表示不限制
+            exact_threshold: 精确分层划分的类别大小上限，也是每个类别最多缓存的文件数
+            suffixes: 参与划分的图片后缀（小写）
+            index: 源目录的数据集索引（utils.dataset_index.DatasetIndex），提供时从索引
+                   读取类别和文件列表，不遍历目录，标记为损坏的图片不参与划分
+            groups: {相对路径: 组键}（见 utils.dedup.group_keys），同一组的文件按组键的
+                    哈希划分，总在同一划分中（例如同一天体的重复截图）
+        """
+        assert math.isclose(sum(split_ratios), 1.0), "划分比例总和必须为1"
+        self.split_ratios = tuple(split_ratios)
+        self.seed = seed
+        self.stratify = stratify
+        self.max_per_class = max_per_class
+        self.exact_threshold = exact_threshold
+        self.suffixes = suffixes
+        self.index = index
+        self.groups = groups or {}
+        # 累积阈值: [训练集上界, 验证集上界]
+        self.thresholds = (split_ratios[0], split_ratios[0] + split_ratios[1])
+
+    def assign(self, rel: str) -> str:
+        """根据相对路径（属于重复组时为组键）的哈希确定所属划分"""
+        u = hash_unit(self.groups.get(rel, rel), self.seed)
+        if u < self.thresholds[0]:
+            return 'train'
+        if u < self.thresholds[1]:
+            return 'valid'
+        return 'test'
+
+    def list_classes(self, source_dir: Path) -> List[str]:
+        """返回源目录下的类别名称（子目录名，已排序），分片归档和数据集索引从索引读取"""
+        if self.index is not None:
+            return self.index.classes()
+        if is_archive(source_dir):
+            return open_archive(source_dir).classes()
+        with os.scandir(source_dir) as it:
+            return sorted(entry.name for entry in it if entry.is_dir())
+
+    def iter_class_files(self, source_dir: Path, class_name: str) -> Iterator[str]:
+        """用 os.scandir 流式遍历类别目录，返回相对源目录的路径 类别/文件名"""
+        if self.index is not None:
+            yield from self.index.files(class_name, self.suffixes)
+            return
+        if is_archive(source_dir):
+            for key in open_archive(source_dir).keys(class_name):
+                if key.lower().endswith(self.suffixes):
+                    yield key
+            return
+        with os.scandir(Path(source_dir) / class_name) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(self.suffixes):
+                    yield f"{class_name}/{entry.name}"
+
+    def split(self, source_dir: Path) -> Iterator[Tuple[str, str]]:
+        """流式返回 (相对路径, 划分名称)"""
+        for class_name in self.list_classes(source_dir):
+            yield from self.split_class(source_dir, class_name)
+
+    def split_class(self, source_dir: Path, class_name: str) -> Iterator[Tuple[str, str]]:
+        """划分单个类别"""
+        files = self.iter_class_files(source_dir, class_name)
+        if self.max_per_class is not None:
+            files = iter(self._sample(files, self.max_per_class))
+
+        if not self.stratify:
+            for rel in files:
+                yield rel, self.assign(rel)
+            return
+
+        # 先缓存至多 exact_threshold 个文件，类别不大时精确分层
+        buffer = []
+        for rel in files:
+            buffer.append(rel)
+            if len(buffer) > self.exact_threshold:
+                break
+        else:
+            yield from self._split_exact(buffer)
+            return
+
+        # 类别太大，退化为逐个文件流式划分
+        for rel in buffer:
+            yield rel, self.assign(rel)
+        for rel in files:
+            yield rel, self.assign(rel)
+
+    def _split_exact(self, files: List[str]) -> Iterator[Tuple[str, str]]:
+        """按哈希排序后精确按比例划分，重复组中的文件按组键划分"""
+        if self.groups:
+            for rel in files:
+                if rel in self.groups:
+                    yield rel, self.assign(rel)
+            files = [rel for rel in files if rel not in self.groups]
+        files.sort(key=lambda rel: hash_unit(rel, self.seed))
+        total = len(files)
+        train_end = int(total * self.split_ratios[0])
+        valid_end = train_end + int(total * self.split_ratios[1])
+        for index, rel in enumerate(files):
+            if index < train_end:
+                yield rel, 'train'
+            elif index < valid_end:
+                yield rel, 'valid'
+            else:
+                yield rel, 'test'
+
+    def _sample(self, files: Iterator[str], k: int) -> List[str]:
+        """确定性抽样：保留抽样哈希最小的 k 个文件，只占用 O(k) 内存"""
+        heap = []  # 最大堆（取负），保存当前最小的 k 个
+        for rel in files:
+            key = -hash_unit(rel, self.seed, salt='sample')
+            if len(heap) < k:
+                heapq.heappush(heap, (key, rel))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, rel))
+        return [rel for _, rel in heap]
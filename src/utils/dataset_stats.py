@@ -0,0 +1,216 @@
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import numpy as np
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+from .shard_archive import make_ref, open_archive, split_ref
+from .split_manifest import SplitManifest
+from .thumbnail import decode_reduced, decode_reduced_bytes, image_size_from_bytes, read_image_size
+
+# 每个划分和缩小尺寸各一个缓存文件，统计不同划分时互不覆盖
+STATS_NAME = 'stats-{split}-{max_size}.json'
+
+# 短边直方图的分组边界（像素）
+SIZE_BINS = [0, 32, 64, 96, 128, 160, 192, 224, 256, 320, 384, 512, 640, 1024, 2048]
+
+class ChannelStats:
+    """
+    逐通道均值和方差的流式累加（Welford 算法）
+
+    每批像素先算出批内均值和平方差和，再用 Chan 等人的并行合并公式并入总量，
+    既是向量化的批量更新，也能合并不同进程的部分结果，数值上比累加和与平方和稳定。
+    """
+    def __init__(self, channels: int = 3):
+        self.count = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+
+    def update(self, pixels: np.ndarray):
+        """并入一批像素 (N, 通道数)"""
+        pixels = pixels.reshape(-1, len(self.mean)).astype(np.float64)
+        if not len(pixels):
+            return
+        batch = ChannelStats(len(self.mean))
+        batch.count = len(pixels)
+        batch.mean = pixels.mean(axis=0)
+        batch.m2 = ((pixels - batch.mean) ** 2).sum(axis=0)
+        self.merge(batch)
+
+    def merge(self, other: 'ChannelStats'):
+        """合并另一部分的统计量"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / total
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros_like(self.mean)
+
+    def to_state(self) -> Tuple[int, List[float], List[float]]:
+        return self.count, self.mean.tolist(), self.m2.tolist()
+
+    @classmethod
+    def from_state(cls, state: Tuple[int, List[float], List[float]]) -> 'ChannelStats':
+        stats = cls(len(state[1]))
+        stats.count = state[0]
+        stats.mean = np.array(state[1])
+        stats.m2 = np.array(state[2])
+        return stats
+
+def _read(ref: str, max_size: int) -> Tuple[Optional[Tuple[int, int]], Optional[np.ndarray]]:
+    """读取原图尺寸（文件头）和缩小解码后的图片（BGR），ref 为文件路径或归档引用"""
+    parts = split_ref(ref)
+    if parts is None:
+        return read_image_size(ref), decode_reduced(ref, max_size)
+    try:
+        data = open_archive(parts[0]).read(parts[1])
+    except (KeyError, OSError):
+        return None, None
+    return image_size_from_bytes(data), decode_reduced_bytes(data, parts[1], max_size)
+
+def _stats_chunk(refs: List[str], max_size: int) -> Tuple[tuple, List[Tuple[int, int]], int]:
+    """统计进程：返回 (通道统计状态, 原图尺寸列表, 解码失败数)"""
+    cv2.setNumThreads(1)
+    stats = ChannelStats()
+    sizes, failed = [], 0
+    for ref in refs:
+        size, img = _read(ref, max_size)
+        if img is None:
+            failed += 1
+            continue
+        if img.shape[0] > max_size or img.shape[1] > max_size:
+            # 缩小解码只能按 1/2、1/4、1/8 缩小，剩余部分用面积插值缩小
+            scale = max_size / max(img.shape[:2])
+            img = cv2.resize(img, (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale))),
+                             interpolation=cv2.INTER_AREA)
+        # BGR -> RGB，归一化到 [0, 1]（与训练时的输入范围一致）
+        stats.update(img[:, :, ::-1].reshape(-1, 3) / 255.0)
+        sizes.append(size or (img.shape[1], img.shape[0]))
+    return stats.to_state(), sizes, failed
+
+def _split_refs(split_dir: Path, manifest: SplitManifest, split: str) -> List[str]:
+    """划分中的图片（文件路径或归档引用）"""
+    files = manifest.splits.get(split, [])
+    if manifest.mode == 'archive':
+        return [make_ref(manifest.source, rel) for rel in open_archive(manifest.source).sort_keys(files)]
+    return [str(split_dir / split / rel) for rel in files]
+
+def summarize_sizes(sizes: np.ndarray) -> Dict:
+    """尺寸分布摘要: 宽高和短边的分位数、短边直方图"""
+    widths, heights = sizes[:, 0], sizes[:, 1]
+    short = np.minimum(widths, heights)
+    percentiles = [0, 5, 50, 95, 100]
+
+    def describe(values):
+        return dict(zip(['min', 'p5', 'median', 'p95', 'max'],
+                        np.percentile(values, percentiles).round().astype(int).tolist()))
+
+    counts, _ = np.histogram(short, bins=SIZE_BINS + [np.inf])
+    return {
+        'width': describe(widths),
+        'height': describe(heights),
+        'short_edge': describe(short),
+        'short_edge_hist': dict(zip(map(str, SIZE_BINS), counts.tolist())),
+        # 短边的百分位数（0-100），用于估计任意尺寸下需要放大的比例
+        'short_edge_quantiles': np.percentile(short, np.arange(101)).round().astype(int).tolist()
+    }
+
+def suggest_img_size(stats: Dict, low: int = 32, high: int = 512) -> int:
+    """
+    建议的训练图像尺寸：不超过 95% 图片短边的 32 的倍数
+
+    训练时短边缩放到 img_size，超过原图短边的尺寸只会放大图片，增加计算量而不增加信息。
+    """
+    p5 = stats['sizes']['short_edge']['p5']
+    return int(min(max(p5 // 32 * 32, low), high))
+
+def upscale_ratio(stats: Dict, img_size: int) -> float:
+    """短边小于 img_size、训练时需要放大的图片比例（按百分位数估计，精度 1%）"""
+    quantiles = stats['sizes']['short_edge_quantiles']
+    smaller = int(np.searchsorted(quantiles, img_size, side='left'))
+    return min(smaller, len(quantiles) - 1) / (len(quantiles) - 1)
+
+def compute_stats(split_dir: Path,
+                  split: str = 'train',
+                  max_size: int = 64,
+                  workers: Optional[int] = None,
+                  progress_callback: Callable[[int, int], None] = None) -> Optional[Dict]:
+    """
+    统计划分中图片的逐通道均值/标准差和尺寸分布
+
+    图片按 max_size 缩小解码后统计（均值和标准差对缩小不敏感），原图尺寸只读文件头。
+    各进程分别累加，最后合并。结果按划分清单（split.json）的内容缓存在
+    <划分目录>/stats-<划分>-<max_size>.json，清单不变时直接读取。
+
+    Args:
+        split_dir: 划分后的数据集目录
+        split: 统计的划分
+        max_size: 缩小解码的长边像素数
+        workers: 进程数，默认等于 CPU 核数
+        progress_callback: 进度回调 (已统计数, 总数)
+
+    Returns:
+        统计结果: images、failed、mean、std（RGB，[0, 1]）、sizes（见 summarize_sizes），
+        没有划分清单或划分为空时返回 None
+    """
+    split_dir = Path(split_dir)
+    manifest = SplitManifest(split_dir)
+    if not manifest.manifest_path.exists():
+        return None
+    hasher = hashlib.blake2b(manifest.manifest_path.read_bytes(), digest_size=16)
+    hasher.update(f"\0{split}\0{max_size}".encode('utf-8'))
+    key = hasher.hexdigest()
+    stats_path = split_dir / STATS_NAME.format(split=split, max_size=max_size)
+    if stats_path.exists():
+        with open(stats_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached
+
+    refs = _split_refs(split_dir, manifest.load(), split)
+    if not refs:
+        return None
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(256, len(refs) // (workers * 4) or 1))
+    total = ChannelStats()
+    sizes, failed, done = [], 0, 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as executor:
+        futures = [executor.submit(_stats_chunk, refs[start:start + chunk], max_size)
+                   for start in range(0, len(refs), chunk)]
+        for future in futures:
+            state, chunk_sizes, chunk_failed = future.result()
+            total.merge(ChannelStats.from_state(state))
+            sizes += chunk_sizes
+            failed += chunk_failed
+            done += len(chunk_sizes) + chunk_failed
+            if progress_callback:
+                progress_callback(done, len(refs))
+    if not sizes:
+        return None
+
+    result = {
+        'key': key,
+        'split': split,
+        'images': len(sizes),
+        'failed': failed,
+        'mean': total.mean.round(4).tolist(),
+        'std': total.std.round(4).tolist(),
+        'sizes': summarize_sizes(np.array(sizes))
+    }
+    tmp_path = stats_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, stats_path)
+    return result
@@ -0,0 +1,221 @@
+from pathlib import Path
+from multiprocessing import shared_memory
+from typing import Iterable, Iterator, List, Optional, Tuple
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import numpy as np
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+from .shard_archive import load_image
+
+def preprocess_classify(img: np.ndarray, img_size: int) -> np.ndarray:
+    """
+    分类推理预处理，近似 ultralytics 分类模型的推理变换：
+    短边缩放到 img_size，中心裁剪为 img_size x img_size，BGR 转 RGB
+
+    ultralytics 用带抗锯齿的 PIL 双线性插值缩放，这里缩小时用 INTER_AREA、
+    放大时用 INTER_LINEAR 近似，像素值与其略有差异。
+
+    Returns:
+        (img_size, img_size, 3) uint8 RGB
+    """
+    h, w = img.shape[:2]
+    scale = img_size / min(h, w)
+    new_w = max(round(w * scale), img_size)
+    new_h = max(round(h * scale), img_size)
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    img = cv2.resize(img, (new_w, new_h), interpolation=interpolation)
+    top = (new_h - img_size) // 2
+    left = (new_w - img_size) // 2
+    img = img[top:top + img_size, left:left + img_size]
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+def _decode_worker(shm_name: str, slot_shape: tuple, img_size: int,
+                   task_queue, free_slots, result_queue):
+    """解码进程：取一批路径，等待空闲槽位（背压），解码并预处理后写入共享内存"""
+    # 解码进程内 OpenCV 只用单线程，并行度由进程数决定
+    cv2.setNumThreads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        slots = np.ndarray(slot_shape, dtype=np.uint8, buffer=shm.buf)
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            index, paths = task
+            slot = free_slots.get()
+            ok = []
+            for i, path in enumerate(paths):
+                try:
+                    img = load_image(path, img_size, short_edge=True)
+                    if img is None:
+                        ok.append(False)
+                        continue
+                    slots[slot, i] = preprocess_classify(img, img_size)
+                    ok.append(True)
+                except Exception:
+                    ok.append(False)
+            result_queue.put((slot, index, paths, ok))
+    finally:
+        del slots
+        shm.close()
+
+class DecodePool:
+    """
+    多进程解码流水线
+
+    一组解码进程把预处理好的图片批次写入共享内存中的固定槽位，模型进程直接
+    读取槽位（不复制、不经过 pickle）。槽位数量有限：模型处理不过来时解码进程
+    会阻塞等待空闲槽位，从而形成背压，内存占用恒定。
+    """
+    def __init__(self, img_size: int, batch_size: int,
+                 workers: Optional[int] = None, num_slots: Optional[int] = None):
+        """
+        Args:
+            img_size: 预处理后的图像尺寸（应与训练时一致）
+            batch_size: 每个槽位容纳的图片数
+            workers: 解码进程数，默认等于 CPU 核数
+            num_slots: 共享内存槽位数，默认为解码进程数的 2 倍
+        """
+        self.img_size = img_size
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.num_slots = num_slots or 2 * self.workers
+        self.slot_shape = (self.num_slots, batch_size, img_size, img_size, 3)
+
+        ctx = mp.get_context('spawn')
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.slot_shape)))
+        self.slots = np.ndarray(self.slot_shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.task_queue = ctx.Queue(maxsize=self.num_slots)
+        self.free_slots = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        for slot in range(self.num_slots):
+            self.free_slots.put(slot)
+        # 提前停止时通知送任务的线程退出
+        self._stop = threading.Event()
+        self._feeder = None
+        self._closed = False
+
+        self.processes = [
+            ctx.Process(target=_decode_worker, daemon=True,
+                        args=(self.shm.name, self.slot_shape, img_size,
+                              self.task_queue, self.free_slots, self.result_queue))
+            for _ in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def imap(self, batches: Iterable[List[Path]]) -> Iterator[Tuple[int, List[str], np.ndarray, List[bool]]]:
+        """
+        按完成顺序（不是输入顺序）返回 (批次序号, 路径列表, 图片数组, 是否成功列表)
+
+        批次序号是批次在 batches 中的位置，需要输入顺序时由调用方按序号重排。
+
+        图片数组是共享内存槽位的视图，形状 (n, img_size, img_size, 3)，
+        只在下一次迭代前有效，迭代继续时槽位会被回收。
+        """
+        state = {'total': None, 'error': None}
+
+        def feed():
+            count = 0
+            try:
+                for paths in batches:
+                    task = (count, [str(path) for path in paths])
+                    while True:
+                        if self._stop.is_set():
+                            return
+                        try:
+                            self.task_queue.put(task, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    count += 1
+            except Exception as e:
+                state['error'] = e
+            state['total'] = count
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        self._feeder = feeder
+        feeder.start()
+
+        received = 0
+        while state['total'] is None or received < state['total']:
+            try:
+                slot, index, paths, ok = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if state['error'] is not None:
+                    raise state['error']
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError("解码进程意外退出")
+                continue
+            try:
+                yield index, paths, self.slots[slot, :len(paths)], ok
+            finally:
+                self.free_slots.put(slot)
+            received += 1
+        feeder.join()
+
+    def _recycle_results(self):
+        """取出没人读取的结果并归还槽位，让等待槽位的解码进程能继续运行到退出"""
+        while True:
+            try:
+                slot, _, _, _ = self.result_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.free_slots.put(slot)
+
+    def close(self, timeout: float = 5.0):
+        """
+        停止解码进程并释放共享内存
+
+        提前停止迭代（异常或 break）时，任务队列可能已满、解码进程可能在等待槽位，
+        因此先停止送任务的线程并丢弃未开始的任务，再归还未读取结果的槽位；
+        在 timeout 秒内没有退出的解码进程直接终止。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        try:
+            if self._feeder is not None:
+                self._feeder.join(timeout=timeout)
+            # 丢弃还没有开始的任务，为结束标记腾出空间
+            while True:
+                try:
+                    self.task_queue.get_nowait()
+                except queue.Empty:
+                    break
+            # 任务队列容量为槽位数，可能放不下全部结束标记，等待期间继续补发
+            pending = len(self.processes)
+            deadline = time.monotonic() + timeout
+            for process in self.processes:
+                while process.is_alive() and time.monotonic() < deadline:
+                    while pending:
+                        try:
+                            self.task_queue.put_nowait(None)
+                            pending -= 1
+                        except queue.Full:
+                            break
+                    self._recycle_results()
+                    process.join(timeout=0.1)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+        finally:
+            try:
+                del self.slots
+                self.shm.close()
+            finally:
+                self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
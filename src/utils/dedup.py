@@ -0,0 +1,275 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import multiprocessing as mp
+import os
+import numpy as np
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+from .thumbnail import choose_reduce_factor, read_image_size
+
+# pHash 在 32x32 灰度图上做 DCT，取左上角 8x8 低频系数
+_PHASH_SIZE = 32
+
+# 缩小解码的灰度标志
+_REDUCED_GRAY_FLAGS = {
+    2: 'IMREAD_REDUCED_GRAYSCALE_2',
+    4: 'IMREAD_REDUCED_GRAYSCALE_4',
+    8: 'IMREAD_REDUCED_GRAYSCALE_8'
+}
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """n 点正交 DCT-II 矩阵"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+_DCT = _dct_matrix(_PHASH_SIZE)
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) 布尔数组 -> (N,) 有符号 64 位整数（SQLite 只支持有符号整数）"""
+    return np.packbits(bits, axis=1).view('>i8').ravel().astype(np.int64)
+
+def phash_batch(images: np.ndarray) -> np.ndarray:
+    """
+    批量计算 pHash
+
+    Args:
+        images: (N, 32, 32) 灰度图
+
+    Returns:
+        (N,) int64，每一位表示对应的低频 DCT 系数是否大于中位数（不含直流分量）
+    """
+    coeffs = _DCT @ images.astype(np.float32) @ _DCT.T
+    low = coeffs[:, :8, :8].reshape(len(images), 64)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return _pack_bits(low > median)
+
+def dhash_batch(images: np.ndarray) -> np.ndarray:
+    """
+    批量计算 dHash
+
+    Args:
+        images: (N, 8, 9) 灰度图
+
+    Returns:
+        (N,) int64，每一位表示水平相邻像素是否变亮
+    """
+    images = images.astype(np.int16)
+    return _pack_bits((images[:, :, 1:] > images[:, :, :-1]).reshape(len(images), 64))
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """64 位整数的置位数（汉明重量）"""
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1)
+
+def _load_gray(path: str) -> Optional[np.ndarray]:
+    """以缩小比例解码为灰度图（JPEG 由 libjpeg 直接缩小解码）"""
+    flag = cv2.IMREAD_GRAYSCALE
+    if path.lower().endswith(('.jpg', '.jpeg')):
+        factor = choose_reduce_factor(read_image_size(path), _PHASH_SIZE)
+        if factor > 1:
+            flag = getattr(cv2, _REDUCED_GRAY_FLAGS[factor])
+    return cv2.imread(path, flag)
+
+def _hash_chunk(paths: List[str]) -> List[Optional[Tuple[int, int]]]:
+    """哈希进程：解码一批图片，向量化计算 pHash 和 dHash，解码失败的为 None"""
+    cv2.setNumThreads(1)
+    large, small, ok = [], [], []
+    for path in paths:
+        img = _load_gray(path)
+        ok.append(img is not None)
+        if img is not None:
+            large.append(cv2.resize(img, (_PHASH_SIZE, _PHASH_SIZE), interpolation=cv2.INTER_AREA))
+            small.append(cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA))
+    if not large:
+        return [None] * len(paths)
+    hashes = iter(zip(phash_batch(np.stack(large)).tolist(), dhash_batch(np.stack(small)).tolist()))
+    return [next(hashes) if good else None for good in ok]
+
+def update_hashes(index, workers: Optional[int] = None,
+                  progress_callback: Callable[[int, int], None] = None) -> int:
+    """
+    为数据集索引（utils.dataset_index.DatasetIndex）中还没有哈希的图片计算感知哈希
+
+    哈希保存在索引中，文件变化时随索引记录一起失效，因此重新划分只计算新增和变化的图片。
+
+    Returns:
+        新计算的图片数
+    """
+    rels = index.missing_hashes()
+    if not rels:
+        return 0
+    paths = [str(index.dataset_dir / rel) for rel in rels]
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(256, len(paths) // (workers * 4) or 1))
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as executor:
+        futures = [(start, executor.submit(_hash_chunk, paths[start:start + chunk]))
+                   for start in range(0, len(paths), chunk)]
+        for start, future in futures:
+            results = future.result()
+            index.set_hashes((rel, *result) for rel, result in zip(rels[start:start + chunk], results)
+                             if result is not None)
+            done += len(results)
+            if progress_callback:
+                progress_callback(done, len(paths))
+    return len(rels)
+
+# 候选桶超过这个大小时在剩余的位上继续分段，而不是桶内两两比较
+# （几千个哈希的分块两两比较不到一秒，递归分段的开销反而更大）
+_MAX_BUCKET = 4096
+# 两两比较时每块的行数（限制距离矩阵的内存）
+_COMPARE_BLOCK = 1024
+
+def _bit_mask(bits: List[int]) -> np.uint64:
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return np.uint64(mask)
+
+def _compare_all(members: np.ndarray, hashes: np.ndarray, threshold: int) -> np.ndarray:
+    """members 内两两比较，按块计算距离，只保留距离不超过 threshold 的对"""
+    found = []
+    values = hashes[members]
+    for start in range(0, len(members), _COMPARE_BLOCK):
+        rows = values[start:start + _COMPARE_BLOCK]
+        xor = rows[:, None] ^ values[None, start:]
+        distance = popcount(xor.ravel()).reshape(xor.shape)
+        # 只取上三角（列在行之后）
+        upper = np.arange(xor.shape[1])[None, :] > np.arange(len(rows))[:, None]
+        i, j = np.nonzero((distance <= threshold) & upper)
+        if len(i):
+            found.append(np.stack([members[start + i], members[start + j]], axis=1))
+    return np.concatenate(found) if found else np.empty((0, 2), dtype=np.int64)
+
+def _search(members: np.ndarray, hashes: np.ndarray, threshold: int, free_bits: List[int]) -> np.ndarray:
+    """
+    在 members 中查找距离不超过 threshold 的对，members 的哈希在 free_bits 以外的位上都相同
+
+    free_bits 分成 threshold + 1 段（抽屉原理），逐段按值分桶；同一对哈希可能在多段
+    落入同一个桶，只在第一个值相同的段保留，不需要合并后去重。桶内先用距离过滤，
+    只有过滤后的对才会保留；超过 _MAX_BUCKET 的桶在其余的位上递归分段。
+    分段后桶没有明显变小（超过 members 的一半，例如大量重复裁剪的同一目标）时
+    继续递归只会在每层重复处理同一批哈希，这时直接在桶内两两比较。
+    """
+    if len(members) <= _MAX_BUCKET:
+        return _compare_all(members, hashes, threshold)
+    # 所有成员都相同的位对距离没有贡献，分段时去掉，否则这些段会把整桶原样递归下去
+    values = hashes[members]
+    varying = int(np.bitwise_or.reduce(values ^ values[0]))
+    free_bits = [bit for bit in free_bits if varying >> bit & 1]
+    if len(free_bits) <= threshold:
+        # 剩余的位不足以分段时任意两个都可能满足，直接比较
+        return _compare_all(members, hashes, threshold)
+    bands = np.array_split(np.array(free_bits), threshold + 1)
+    masks = [_bit_mask(band.tolist()) for band in bands]
+    found = []
+    for k, (band, mask) in enumerate(zip(bands, masks)):
+        keys = values & mask
+        order = np.argsort(keys, kind='stable')
+        sorted_values = keys[order]
+        # 值相同的连续区间
+        starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+        lengths = np.diff(np.r_[starts, len(members)])
+        rest = [bit for bit in free_bits if bit not in set(band.tolist())]
+        for start, length in zip(starts[lengths > 1], lengths[lengths > 1]):
+            bucket = members[order[start:start + length]]
+            if length * 2 > len(members):
+                pairs = _compare_all(bucket, hashes, threshold)
+            else:
+                pairs = _search(bucket, hashes, threshold, rest)
+            if k and len(pairs):
+                # 在更早的段已经相同的对由那一段负责
+                xor = hashes[pairs[:, 0]] ^ hashes[pairs[:, 1]]
+                first = np.ones(len(pairs), dtype=bool)
+                for earlier in masks[:k]:
+                    first &= (xor & earlier) != 0
+                pairs = pairs[first]
+            if len(pairs):
+                found.append(pairs)
+    return np.concatenate(found) if found else np.empty((0, 2), dtype=np.int64)
+
+def near_duplicate_pairs(hashes: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    查找汉明距离不超过 threshold 的哈希对
+
+    把 64 位哈希分成 threshold + 1 段，由抽屉原理，距离不超过 threshold 的两个哈希
+    至少有一段完全相同。逐段按值排序，只比较同一段值相同的哈希（多索引哈希），
+    不需要两两比较全部哈希；结果是精确的。候选在各个桶内就按距离过滤，
+    过大的桶在其余的位上继续分段，内存只与结果数量和桶的大小有关。
+    threshold 越大每段越短、候选越多，适合较小的阈值（不超过 10 左右）。
+
+    Args:
+        hashes: (N,) int64
+        threshold: 最大汉明距离
+
+    Returns:
+        (M, 2) 下标对，i < j，按下标排序
+    """
+    hashes = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+    pairs = _search(np.arange(len(hashes)), hashes, threshold, list(range(64)))
+    if not len(pairs):
+        return pairs
+    pairs = np.sort(pairs, axis=1)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+def find_duplicate_groups(rels: List[str], hashes: np.ndarray, threshold: int) -> List[List[str]]:
+    """
+    近似重复的图片分组（距离不超过阈值的图片连通即为一组）
+
+    完全相同的哈希先合并，只在不同的哈希之间查找近似重复。
+
+    Returns:
+        至少包含两张图片的组，组内按路径排序
+    """
+    hashes = np.asarray(hashes, dtype=np.int64)
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    parent = list(range(len(unique)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in near_duplicate_pairs(unique, threshold).tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[str]] = {}
+    for rel, u in zip(rels, inverse.ravel().tolist()):
+        groups.setdefault(find(u), []).append(rel)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+def group_keys(groups: List[List[str]]) -> Dict[str, str]:
+    """{相对路径: 组键}，组键为组内第一个路径，供 DatasetSplitter 把整组分到同一划分"""
+    return {rel: group[0] for group in groups for rel in group}
+
+def find_leaks(groups: List[List[str]], assignments: Dict[str, str]) -> List[Dict[str, str]]:
+    """跨划分的重复组（例如同一天体同时出现在训练集和测试集），返回每组的 {相对路径: 划分}"""
+    leaks = []
+    for group in groups:
+        placed = {rel: assignments[rel] for rel in group if rel in assignments}
+        if len(set(placed.values())) > 1:
+            leaks.append(placed)
+    return leaks
+
+def dataset_duplicates(index, threshold: int, method: str = 'phash',
+                       workers: Optional[int] = None,
+                       progress_callback: Callable[[int, int], None] = None) -> List[List[str]]:
+    """更新索引中的感知哈希并返回近似重复的图片组"""
+    update_hashes(index, workers, progress_callback)
+    rows = index.hashes(method)
+    if not rows:
+        return []
+    rels, hashes = zip(*rows)
+    return find_duplicate_groups(list(rels), np.array(hashes, dtype=np.int64), threshold)
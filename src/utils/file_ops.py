@@ -0,0 +1,99 @@
+from pathlib import Path
+import errno
+import os
+import shutil
+import sys
+try:
+    import fcntl
+except ImportError:
+    # Windows 上没有 fcntl，不支持 reflink
+    fcntl = None
+
+# linux/fs.h 中的 FICLONE ioctl 编号
+FICLONE = 0x40049409
+
+# 表示整个文件系统或平台不支持某种方式的错误码（EINVAL 来自不支持 FICLONE 的文件系统），
+# 其他错误（目标已存在、权限不足、源文件不存在等）只与单个文件有关
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL}
+
+# 导入方式：auto 依次尝试 reflink、硬链接、符号链接，只有 copy 会真正复制数据
+INGEST_MODES = ('auto', 'reflink', 'hardlink', 'symlink', 'copy')
+
+def reflink_file(src: Path, dst: Path):
+    """
+    使用 FICLONE 创建写时复制副本（btrfs/xfs 等文件系统支持）
+
+    不支持时抛出 OSError
+    """
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError("当前平台不支持 reflink")
+    with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+class FileLinker:
+    """按导入方式把文件“放”到目标位置，尽量避免复制数据"""
+    def __init__(self, mode: str = 'auto'):
+        if mode not in INGEST_MODES:
+            raise ValueError(f"未知的导入方式: {mode}")
+        self.mode = mode
+        # 记录不支持的方式，避免对每个文件重复尝试
+        self._unsupported = set()
+
+    def link(self, src: Path, dst: Path) -> str:
+        """
+        将 src 放到 dst（dst 必须不存在）
+
+        Returns:
+            实际使用的方式
+
+        Raises:
+            OSError: 与单个文件有关的错误直接抛出，不会换用其他方式
+        """
+        if self.mode != 'auto':
+            self._apply(self.mode, src, dst)
+            return self.mode
+
+        for method in ('reflink', 'hardlink', 'symlink'):
+            if method in self._unsupported:
+                continue
+            try:
+                self._apply(method, src, dst)
+                return method
+            except OSError as e:
+                # errno 为 None 时是 reflink_file 报告的平台不支持
+                if e.errno is not None and e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self._unsupported.add(method)
+        raise OSError(f"无法链接文件 {src}，请改用复制方式导入")
+
+    def _apply(self, method: str, src: Path, dst: Path):
+        if method == 'reflink':
+            reflink_file(src, dst)
+        elif method == 'hardlink':
+            os.link(src, dst)
+        elif method == 'symlink':
+            os.symlink(Path(src).resolve(), dst)
+        else:
+            shutil.copy2(src, dst)
+
+    def link_tree(self, src_dir: Path, dst_dir: Path) -> dict:
+        """
+        将整个目录树放到 dst_dir
+
+        Returns:
+            各方式使用次数
+        """
+        counts = {}
+        for root, dirs, files in os.walk(src_dir):
+            target = Path(dst_dir) / Path(root).relative_to(src_dir)
+            target.mkdir(parents=True, exist_ok=True)
+            for name in files:
+                method = self.link(Path(root) / name, target / name)
+                counts[method] = counts.get(method, 0) + 1
+        return counts
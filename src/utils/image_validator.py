@@ -0,0 +1,327 @@
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import tempfile
+import numpy as np
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+from .dataset_manifest import file_hash
+from .thumbnail import read_file_header, read_image_header
+
+# 检查不通过的原因（配置值, 说明）
+REASONS = {
+    'empty': "空文件",
+    'unreadable': "无法识别的文件头",
+    'truncated': "文件不完整",
+    'decode_failed': "解码失败",
+    'grayscale': "灰度图片",
+    'alpha': "带透明通道",
+    'cmyk': "CMYK 图片"
+}
+
+# 文件本身有问题的原因，默认总是隔离
+INTEGRITY_REASONS = ('empty', 'unreadable', 'truncated', 'decode_failed')
+# 通道格式（不是 RGB）的原因，按 layout_check 决定是否隔离
+LAYOUT_REASONS = ('grayscale', 'alpha', 'cmyk')
+# 通道格式检查方式（配置值, 说明）
+LAYOUT_CHECKS = {
+    'off': "不检查",
+    'minority': "隔离与多数图片不同的格式",
+    'all': "隔离全部非 RGB 图片"
+}
+
+QUARANTINE_REPORT = 'quarantine.json'
+
+# 只检查文件头尾时读取的文件尾字节数（JPEG 的 EOI 之后可能有补零）
+_TAIL_BYTES = 4096
+
+# libjpeg 遇到数据损坏时只输出警告并补齐剩余部分，imdecode 仍会返回图片
+_JPEG_WARNINGS = (b'Corrupt JPEG data', b'Premature end of JPEG file')
+
+def check_image(path: Path, full_decode: bool = False, decode_log=None) -> str:
+    """
+    检查单张图片，通过时返回空字符串，否则返回 REASONS 中的原因
+
+    默认只读文件头和文件尾（尺寸、通道数、JPEG 的 EOI 标记、PNG 的 IEND 块），
+    full_decode 为 True 时再完整解码一次，能发现数据损坏但文件头尾完好的图片。
+    先做完整性检查，最后才按通道数区分灰度、透明通道和 CMYK，这些图片同样会被完整解码。
+
+    Args:
+        decode_log: 接收标准错误输出的文件（见 _check_chunk），提供时解码期间出现
+                    libjpeg 的数据损坏警告也视为解码失败
+    """
+    try:
+        size = os.path.getsize(path)
+        if not size:
+            return 'empty'
+        with open(path, 'rb') as f:
+            if full_decode:
+                data = f.read()
+                header = read_image_header(data)
+            else:
+                header = read_file_header(f)
+            f.seek(0)
+            jpeg = f.read(2) == b'\xff\xd8'
+            f.seek(max(size - _TAIL_BYTES, 0))
+            tail = f.read()
+    except OSError:
+        return 'unreadable'
+    if header is None or not header[0] or not header[1]:
+        return 'unreadable'
+    if jpeg:
+        # 部分设备会在 EOI 之后补零
+        if not tail.rstrip(b'\x00').endswith(b'\xff\xd9'):
+            return 'truncated'
+    elif b'IEND' not in tail[-12:]:
+        return 'truncated'
+    if full_decode and cv2 is not None:
+        if decode_log is not None:
+            decode_log.seek(0)
+            decode_log.truncate()
+        if cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED) is None:
+            return 'decode_failed'
+        if decode_log is not None:
+            decode_log.seek(0)
+            log = decode_log.read()
+            if any(warning in log for warning in _JPEG_WARNINGS):
+                return 'decode_failed'
+    channels = header[2]
+    if jpeg and channels == 4:
+        return 'cmyk'
+    if channels == 1:
+        return 'grayscale'
+    if channels in (2, 4):
+        return 'alpha'
+    return ''
+
+def _check_chunk(paths: List[str], full_decode: bool) -> List[str]:
+    """
+    检查进程：逐个检查一批文件
+
+    完整解码时把本进程的标准错误（文件描述符 2）重定向到临时文件，用来捕获 libjpeg
+    的警告；因此完整解码总是在检查进程中进行，不影响主进程的输出。
+    """
+    if cv2 is None or not full_decode:
+        return [check_image(path, full_decode) for path in paths]
+    cv2.setNumThreads(1)
+    with tempfile.TemporaryFile() as log:
+        saved = os.dup(2)
+        os.dup2(log.fileno(), 2)
+        try:
+            return [check_image(path, full_decode, log) for path in paths]
+        finally:
+            os.dup2(saved, 2)
+            os.close(saved)
+
+class ImageValidator:
+    """
+    导入后的图片完整性和格式检查
+
+    检查结果按文件内容哈希缓存在 SQLite 中，重新检查时只处理缓存中没有的文件；
+    检查在进程池中并行进行。不通过的文件可以移到隔离目录（quarantine），
+    不参与划分和训练。
+
+    灰度、带透明通道和 CMYK 图片本身可以训练（加载时会转换为 RGB），默认只隔离
+    与数据集多数图片格式不同的少数图片，整个数据集都是灰度图时不会被隔离。
+    """
+    def __init__(self,
+                 cache_path: Path,
+                 full_decode: bool = False,
+                 workers: Optional[int] = None,
+                 reject: Iterable[str] = INTEGRITY_REASONS,
+                 layout_check: str = 'minority'):
+        """
+        Args:
+            cache_path: 检查结果缓存文件
+            full_decode: 是否完整解码每张图片（较慢）
+            workers: 检查进程数，默认等于 CPU 核数
+            reject: 总是隔离的原因，见 REASONS
+            layout_check: 通道格式的检查方式，见 LAYOUT_CHECKS
+        """
+        if layout_check not in LAYOUT_CHECKS:
+            raise ValueError(f"未知的通道格式检查方式: {layout_check}")
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.full_decode = full_decode
+        self.workers = workers or os.cpu_count() or 1
+        self.reject = set(reject)
+        self.layout_check = layout_check
+        self.conn = sqlite3.connect(str(self.cache_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # full 表示结果是否经过完整解码
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                hash TEXT PRIMARY KEY,
+                reason TEXT NOT NULL,
+                full INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def validate(self,
+                 dataset_dir: Path,
+                 files: Dict[str, Optional[str]],
+                 progress_callback: Callable[[int, int], None] = None,
+                 locations: Optional[Dict[str, Path]] = None) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """
+        检查数据集中的文件
+
+        Args:
+            dataset_dir: 数据集目录
+            files: {相对路径: 内容哈希}，哈希为 None 时在这里计算（导入清单中已有哈希）
+            progress_callback: 进度回调 (已检查数, 需检查数)
+            locations: 不在数据集目录中的文件的实际位置 {相对路径: 路径}（例如已隔离的文件）
+
+        Returns:
+            (不通过的文件 {相对路径: 原因}, 统计 {checked, cached})
+        """
+        dataset_dir = Path(dataset_dir)
+        locations = locations or {}
+
+        def path_of(rel):
+            return locations.get(rel) or dataset_dir / rel
+
+        missing = [rel for rel, digest in files.items() if digest is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                files = dict(files)
+                for rel, digest in zip(missing, executor.map(lambda rel: file_hash(path_of(rel)), missing)):
+                    files[rel] = digest
+
+        # 同样内容只检查一次；只做过文件头检查的通过结果在完整解码时需要重新检查
+        results = {}
+        for digest, reason, full in self.conn.execute("SELECT hash, reason, full FROM results"):
+            if reason or full or not self.full_decode:
+                results[digest] = reason
+        todo = {}
+        for rel, digest in files.items():
+            if digest not in results:
+                todo.setdefault(digest, rel)
+
+        checked = self._check({digest: path_of(rel) for digest, rel in todo.items()}, progress_callback)
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                                  [(digest, reason, int(self.full_decode)) for digest, reason in checked.items()])
+        results.update(checked)
+
+        reasons = {rel: results[digest] for rel, digest in sorted(files.items())}
+        reject = self.reject | self.rejected_layouts(reasons.values())
+        bad = {rel: reason for rel, reason in reasons.items() if reason in reject}
+        return bad, {'checked': len(todo), 'cached': len(files) - len(todo)}
+
+    def rejected_layouts(self, reasons: Iterable[str]) -> set:
+        """
+        按 layout_check 需要隔离的通道格式
+
+        'minority' 时先找出完好图片中最多的格式（RGB 记为空字符串），其余非 RGB 格式
+        都隔离；多数图片是灰度图时只隔离带透明通道和 CMYK 的图片，RGB 图片保留。
+        """
+        if self.layout_check == 'off':
+            return set()
+        if self.layout_check == 'all':
+            return set(LAYOUT_REASONS)
+        counts = {}
+        for reason in reasons:
+            if reason == '' or reason in LAYOUT_REASONS:
+                counts[reason] = counts.get(reason, 0) + 1
+        dominant = max(counts, key=counts.get) if counts else ''
+        return set(LAYOUT_REASONS) - {dominant}
+
+    def _check(self, todo: Dict[str, Path],
+               progress_callback: Callable[[int, int], None] = None) -> Dict[str, str]:
+        """并行检查 {哈希: 文件路径}，返回 {哈希: 原因}"""
+        digests = list(todo)
+        paths = [str(todo[digest]) for digest in digests]
+        if not paths:
+            return {}
+        chunk = max(1, min(256, len(paths) // (self.workers * 4) or 1))
+        reasons = []
+        if self.workers <= 1 and not self.full_decode:
+            for start in range(0, len(paths), chunk):
+                reasons += _check_chunk(paths[start:start + chunk], self.full_decode)
+                if progress_callback:
+                    progress_callback(len(reasons), len(paths))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context('spawn')) as executor:
+                futures = [executor.submit(_check_chunk, paths[start:start + chunk], self.full_decode)
+                           for start in range(0, len(paths), chunk)]
+                for future in futures:
+                    reasons += future.result()
+                    if progress_callback:
+                        progress_callback(len(reasons), len(paths))
+        return dict(zip(digests, reasons))
+
+    @staticmethod
+    def quarantine(dataset_dir: Path, bad: Dict[str, str], quarantine_dir: Path) -> List[str]:
+        """
+        把不通过的文件移到隔离目录（保持相对路径），并把原因记录到隔离目录的 quarantine.json
+
+        链接方式导入时移动的只是链接，源文件不受影响。
+
+        Returns:
+            实际移动的文件
+        """
+        dataset_dir = Path(dataset_dir)
+        quarantine_dir = Path(quarantine_dir)
+        moved = []
+        for rel in bad:
+            src = dataset_dir / rel
+            if not os.path.lexists(src):
+                continue
+            dst = quarantine_dir / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, dst)
+            moved.append(rel)
+        if moved:
+            report_path = quarantine_dir / QUARANTINE_REPORT
+            report = {}
+            if report_path.exists():
+                with open(report_path, 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+            report.update((rel, bad[rel]) for rel in moved)
+            tmp_path = report_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, report_path)
+        return moved
+
+    @staticmethod
+    def restore(dataset_dir: Path, rels: Iterable[str], quarantine_dir: Path) -> List[str]:
+        """
+        把不再需要隔离的文件（例如放宽了检查条件）从隔离目录移回数据集，并从 quarantine.json 中删除
+
+        Returns:
+            实际移回的文件
+        """
+        dataset_dir = Path(dataset_dir)
+        quarantine_dir = Path(quarantine_dir)
+        restored = []
+        for rel in rels:
+            src = quarantine_dir / rel
+            dst = dataset_dir / rel
+            if not os.path.lexists(src) or os.path.lexists(dst):
+                continue
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, dst)
+            restored.append(rel)
+        report_path = quarantine_dir / QUARANTINE_REPORT
+        if restored and report_path.exists():
+            with open(report_path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            for rel in restored:
+                report.pop(rel, None)
+            tmp_path = report_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, report_path)
+        return restored
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,257 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import csv
+import time
+import torch
+from ultralytics import YOLO
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # 未安装 pyarrow 时只能输出 CSV
+    pa = pq = None
+from .dataset_manifest import iter_files
+from .decode_pool import DecodePool
+from .model_export import resolve_backend, trained_img_size
+from .shard_archive import is_archive, make_ref, open_archive, read_image
+
+# 可推理的图片格式
+INFERENCE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+def iter_image_paths(source: Path) -> Iterator[Path]:
+    """
+    流式返回待推理的图片路径
+
+    Args:
+        source: 图片目录（递归遍历）、分片归档目录（按存放顺序返回归档引用）
+                或文件列表（每行一个路径的文本文件）
+    """
+    source = Path(source)
+    if is_archive(source):
+        for key in open_archive(source).keys():
+            if key.lower().endswith(INFERENCE_SUFFIXES):
+                yield Path(make_ref(source, key))
+    elif source.is_dir():
+        for rel, _ in iter_files(source):
+            if rel.lower().endswith(INFERENCE_SUFFIXES):
+                yield source / rel
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield Path(line)
+
+def batched(items: Iterable, batch_size: int) -> Iterator[list]:
+    """按批次切分可迭代对象"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def in_input_order(items: Iterable) -> Iterator:
+    """
+    把按完成顺序到达的 (批次序号, 结果) 按序号重新排列后依次返回
+
+    只缓存先于前面批次完成的结果，数量不超过同时在解码的批次数。
+    """
+    pending = {}
+    expected = 0
+    for index, result in items:
+        pending[index] = result
+        while expected in pending:
+            yield pending.pop(expected)
+            expected += 1
+
+class ResultWriter:
+    """流式写出推理结果（CSV 或 Parquet）"""
+    def __init__(self, output: Path, top_k: int, fmt: Optional[str] = None):
+        self.output = Path(output)
+        self.fmt = fmt or ('parquet' if self.output.suffix.lower() == '.parquet' else 'csv')
+        self.columns = ['path']
+        for k in range(1, top_k + 1):
+            self.columns += [f'label_{k}', f'prob_{k}']
+        self.columns.append('error')
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.fmt == 'parquet':
+            if pq is None:
+                raise RuntimeError("输出 Parquet 需要安装 pyarrow")
+            fields = []
+            for name in self.columns:
+                dtype = pa.float32() if name.startswith('prob_') else pa.string()
+                fields.append(pa.field(name, dtype))
+            self.schema = pa.schema(fields)
+            self._writer = pq.ParquetWriter(str(self.output), self.schema)
+        else:
+            self._file = open(self.output, 'w', encoding='utf-8', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+            self._writer.writeheader()
+
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        if self.fmt == 'parquet':
+            table = pa.Table.from_pylist(
+                [{name: row.get(name) for name in self.columns} for row in rows], schema=self.schema)
+            self._writer.write_table(table)
+        else:
+            self._writer.writerows(rows)
+
+    def close(self):
+        if self.fmt == 'parquet':
+            self._writer.close()
+        else:
+            self._file.close()
+
+class InferenceEngine:
+    """
+    批量分类推理
+
+    只加载一次 -cls 模型，按批次读取图片并预测，输出 top-k 类别和概率
+    """
+    def __init__(self,
+                 weights: Path,
+                 batch_size: int = 64,
+                 top_k: int = 5,
+                 img_size: Optional[int] = None,
+                 device: Optional[str] = None,
+                 workers: int = 0,
+                 backend: str = 'torch',
+                 int8: bool = False):
+        """
+        Args:
+            weights: 训练好的分类模型权重
+            batch_size: 每批推理的图片数
+            top_k: 输出前 k 个类别
+            img_size: 推理图像尺寸，None 表示使用模型训练时的尺寸
+            device: 推理设备，None 时自动选择
+            workers: 解码进程数，0 表示在当前进程中解码
+            backend: 推理后端 torch、torchscript、onnxruntime、openvino 或 auto，
+                     使用与 weights 同目录的导出文件（见 utils.model_export），不可用时回退
+            int8: onnxruntime 后端使用 INT8 量化模型
+        """
+        self.backend, model_path = resolve_backend(weights, backend, int8)
+        self.model = YOLO(str(model_path), task='classify')
+        # 导出模型的输入尺寸固定为训练尺寸
+        self.trained_img_size = (self.model.overrides.get('imgsz') if self.backend == 'torch'
+                                 else trained_img_size(weights))
+        self.names = self.model.names
+        self.batch_size = batch_size
+        self.top_k = min(top_k, len(self.names))
+        self.img_size = img_size
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.workers = workers
+
+    def predict_batch(self, paths: List[Path]) -> List[Dict]:
+        """预测一批图片，返回每张图片一行结果"""
+        rows = []
+        images = []
+        valid_rows = []
+        for path in paths:
+            row = {'path': str(path)}
+            rows.append(row)
+            img = read_image(str(path))
+            if img is None:
+                row['error'] = "无法读取图片"
+                continue
+            images.append(img)
+            valid_rows.append(row)
+
+        if images:
+            predict_args = {'device': self.device, 'verbose': False, 'batch': len(images)}
+            if self.img_size:
+                predict_args['imgsz'] = self.img_size
+            results = self.model.predict(images, **predict_args)
+            for row, result in zip(valid_rows, results):
+                self._fill_topk(row, result.probs.data)
+        return rows
+
+    def predict_decoded(self, paths: List[str], images, ok: List[bool]) -> List[Dict]:
+        """
+        预测一批已由解码进程预处理好的图片
+
+        Args:
+            paths: 图片路径
+            images: (n, img_size, img_size, 3) uint8 RGB 数组（共享内存视图）
+            ok: 每张图片是否解码成功
+        """
+        rows = [{'path': path} for path in paths]
+        valid = [i for i, success in enumerate(ok) if success]
+        for i, success in enumerate(ok):
+            if not success:
+                rows[i]['error'] = "无法读取图片"
+        if valid:
+            # 张量输入会跳过 ultralytics 的预处理，直接送入模型
+            batch = torch.from_numpy(images[valid]).permute(0, 3, 1, 2).float().div_(255)
+            results = self.model.predict(batch, device=self.device, verbose=False, batch=len(valid))
+            for i, result in zip(valid, results):
+                self._fill_topk(rows[i], result.probs.data)
+        return rows
+
+    def _fill_topk(self, row: Dict, probs: torch.Tensor):
+        values, indices = torch.topk(probs.float().cpu(), self.top_k)
+        for k, (value, index) in enumerate(zip(values.tolist(), indices.tolist()), start=1):
+            row[f'label_{k}'] = self.names[index]
+            row[f'prob_{k}'] = round(value, 6)
+
+    def run(self,
+            source: Path,
+            output: Path,
+            fmt: Optional[str] = None,
+            progress_callback: Callable[[int, float], None] = None) -> Dict:
+        """
+        对 source 中的所有图片推理并写出结果
+
+        Args:
+            source: 图片目录或文件列表
+            output: 输出文件（.csv 或 .parquet）
+            fmt: 输出格式，None 时根据扩展名判断
+            progress_callback: 进度回调，接收已处理图片数和当前吞吐量(张/秒)
+
+        Returns:
+            统计信息: images、failed、seconds、images_per_sec
+        """
+        writer = ResultWriter(output, self.top_k, fmt)
+        pool = None
+        total = failed = 0
+        start = time.perf_counter()
+        try:
+            batches = batched(iter_image_paths(source), self.batch_size)
+            if self.workers > 0:
+                img_size = self.img_size or self.trained_img_size or 224
+                pool = DecodePool(img_size, self.batch_size, self.workers)
+                # 解码进程按完成顺序返回批次，写出前恢复输入顺序
+                predictions = in_input_order(
+                    (index, self.predict_decoded(paths, images, ok))
+                    for index, paths, images, ok in pool.imap(batches))
+            else:
+                predictions = (self.predict_batch(paths) for paths in batches)
+            for rows in predictions:
+                writer.write(rows)
+                total += len(rows)
+                failed += sum(1 for row in rows if row.get('error'))
+                if progress_callback:
+                    elapsed = time.perf_counter() - start
+                    progress_callback(total, total / elapsed if elapsed > 0 else 0.0)
+        finally:
+            writer.close()
+            if pool is not None:
+                pool.close()
+
+        seconds = time.perf_counter() - start
+        return {
+            'images': total,
+            'failed': failed,
+            'seconds': seconds,
+            'images_per_sec': total / seconds if seconds > 0 else 0.0
+        }
@@ -0,0 +1,184 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import importlib.util
+import statistics
+import time
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+# 支持的导出格式
+EXPORT_FORMATS = ('torchscript', 'onnx', 'openvino')
+
+# 导出格式 -> 导出所需的模块（未安装时跳过，不让 ultralytics 在训练过程中自动安装依赖）
+EXPORT_MODULES = {
+    'torchscript': 'torch',
+    'onnx': 'onnx',
+    'openvino': 'openvino'
+}
+
+# 推理后端 -> 所需的模块
+BACKEND_MODULES = {
+    'torch': 'torch',
+    'torchscript': 'torch',
+    'onnxruntime': 'onnxruntime',
+    'openvino': 'openvino'
+}
+
+# 自动选择后端时的优先顺序（CPU 上由快到慢）
+BACKEND_PRIORITY = ('openvino', 'onnxruntime', 'torchscript', 'torch')
+
+def backend_available(backend: str) -> bool:
+    """后端所需的模块是否已安装"""
+    module = BACKEND_MODULES.get(backend)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+def artifact_path(weights: Path, backend: str, int8: bool = False) -> Path:
+    """
+    返回某个后端对应的导出文件路径（与 ultralytics 的导出命名一致）
+
+    best.pt -> best.torchscript / best.onnx / best-int8.onnx / best_openvino_model
+    """
+    weights = Path(weights)
+    if backend == 'torch':
+        return weights
+    if backend == 'torchscript':
+        return weights.with_suffix('.torchscript')
+    if backend == 'onnxruntime':
+        stem = f"{weights.stem}-int8" if int8 else weights.stem
+        return weights.with_name(f"{stem}.onnx")
+    if backend == 'openvino':
+        return weights.with_name(f"{weights.stem}_openvino_model")
+    raise ValueError(f"未知的推理后端: {backend}")
+
+def resolve_backend(weights: Path, backend: str = 'auto', int8: bool = False) -> tuple:
+    """
+    选择推理后端和对应的模型文件
+
+    指定的后端未安装或没有导出文件时，按 BACKEND_PRIORITY 依次回退，
+    最终回退到 PyTorch（原始权重）。
+
+    Returns:
+        (后端名称, 模型文件路径)
+    """
+    candidates = list(BACKEND_PRIORITY) if backend == 'auto' else [backend]
+    candidates += [name for name in BACKEND_PRIORITY if name not in candidates]
+    for name in candidates:
+        path = artifact_path(weights, name, int8 and name == 'onnxruntime')
+        if backend_available(name) and path.exists():
+            if backend not in ('auto', name):
+                print(f"警告：后端 {backend} 不可用，改用 {name}")
+            return name, path
+    return 'torch', Path(weights)
+
+def trained_img_size(weights: Path) -> Optional[int]:
+    """读取 .pt 权重中记录的训练图像尺寸（导出模型的输入尺寸与其一致）"""
+    try:
+        ckpt = torch.load(str(weights), map_location='cpu', weights_only=False)
+        return (ckpt.get('train_args') or {}).get('imgsz')
+    except Exception:
+        return None
+
+def quantize_onnx_int8(onnx_path: Path) -> Path:
+    """对 ONNX 模型做动态 INT8 量化（权重量化，激活在运行时量化，无需校准数据）"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    output = onnx_path.with_name(f"{onnx_path.stem}-int8.onnx")
+    quantize_dynamic(str(onnx_path), str(output), weight_type=QuantType.QInt8)
+    return output
+
+def export_model(weights: Path,
+                 formats: Iterable[str] = ('torchscript', 'onnx'),
+                 img_size: Optional[int] = None,
+                 int8: bool = False) -> Dict[str, Path]:
+    """
+    导出训练好的分类模型
+
+    Args:
+        weights: 训练得到的 .pt 权重
+        formats: 导出格式，见 EXPORT_FORMATS
+        img_size: 导出尺寸，默认使用训练时的尺寸
+        int8: 是否额外生成动态 INT8 量化的 ONNX 模型（需要 onnxruntime）
+
+    Returns:
+        {格式: 导出文件路径}，导出失败的格式不包含在内
+    """
+    model = YOLO(str(weights), task='classify')
+    img_size = img_size or model.overrides.get('imgsz') or 224
+    artifacts = {}
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            print(f"不支持的导出格式: {fmt}")
+            continue
+        if importlib.util.find_spec(EXPORT_MODULES[fmt]) is None:
+            print(f"跳过 {fmt} 导出：未安装 {EXPORT_MODULES[fmt]}")
+            continue
+        try:
+            # ONNX 使用动态批次，推理时可以按任意批次大小输入
+            path = model.export(format=fmt, imgsz=img_size, dynamic=(fmt == 'onnx'), verbose=False)
+            artifacts[fmt] = Path(path)
+        except Exception as e:
+            print(f"导出 {fmt} 失败: {e}")
+    if int8 and 'onnx' in artifacts:
+        try:
+            artifacts['onnx-int8'] = quantize_onnx_int8(artifacts['onnx'])
+        except Exception as e:
+            print(f"INT8 量化失败: {e}")
+    return artifacts
+
+def _predict_probs(model: YOLO, batch: torch.Tensor) -> torch.Tensor:
+    results = model.predict(batch, device='cpu', verbose=False, batch=len(batch))
+    return torch.stack([result.probs.data.float().cpu() for result in results])
+
+def compare_backends(weights: Path,
+                     images: np.ndarray,
+                     backends: Iterable[str] = BACKEND_PRIORITY,
+                     int8: bool = False,
+                     repeats: int = 10) -> List[Dict]:
+    """
+    对比各后端与 PyTorch eager 的输出一致性和速度（CPU）
+
+    Args:
+        weights: 原始 .pt 权重，其他后端使用 artifact_path 对应的导出文件
+        images: (n, img_size, img_size, 3) uint8 RGB，已按分类推理预处理
+        backends: 参与对比的后端
+        int8: onnxruntime 使用 INT8 量化模型
+        repeats: 计时重复次数（取中位数）
+
+    Returns:
+        每个后端一条记录: backend、path、max_abs_diff、top1_agreement、
+        latency_ms（每批）、images_per_sec；不可用的后端带 error
+    """
+    batch = torch.from_numpy(np.ascontiguousarray(images)).permute(0, 3, 1, 2).float().div_(255)
+    reference = None
+    report = []
+    for backend in ['torch'] + [name for name in backends if name != 'torch']:
+        path = artifact_path(weights, backend, int8 and backend == 'onnxruntime')
+        row = {'backend': backend, 'path': str(path)}
+        report.append(row)
+        if not backend_available(backend):
+            row['error'] = f"未安装 {BACKEND_MODULES[backend]}"
+            continue
+        if not path.exists():
+            row['error'] = "没有导出文件"
+            continue
+        try:
+            model = YOLO(str(path), task='classify')
+            probs = _predict_probs(model, batch)  # 预热
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                _predict_probs(model, batch)
+                times.append(time.perf_counter() - start)
+        except Exception as e:
+            row['error'] = str(e)
+            continue
+        if reference is None:
+            reference = probs
+        latency = statistics.median(times)
+        row.update({
+            'max_abs_diff': float((probs - reference).abs().max()),
+            'top1_agreement': float((probs.argmax(1) == reference.argmax(1)).float().mean()),
+            'latency_ms': latency * 1000,
+            'images_per_sec': len(batch) / latency if latency > 0 else 0.0
+        })
+    return report
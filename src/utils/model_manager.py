@@ -0,0 +1,210 @@
+from pathlib import Path
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import copy
+import hashlib
+import json
+import os
+import threading
+from ultralytics import YOLO
+from .dataset_manifest import DatasetManifest
+from .split_manifest import SplitManifest
+
+def dataset_hash(split_dir: Path) -> Optional[str]:
+    """
+    计算训练数据的哈希
+
+    由划分清单（每个文件属于哪个划分）和源数据清单中的文件内容哈希得出，
+    不需要重新读取图片；数据或划分变化时哈希随之变化。没有划分清单时返回 None。
+    """
+    split = SplitManifest(split_dir).load()
+    if not split.source:
+        return None
+    source = Path(split.source)
+    # 源数据清单与 PathManager.get_manifest_path 的位置一致
+    entries = DatasetManifest(source.with_name(f"{source.name}.manifest.json")).load().entries
+    hasher = hashlib.blake2b(digest_size=16)
+    for name in sorted(split.splits):
+        for rel in sorted(split.splits[name]):
+            entry = entries.get(rel, {})
+            hasher.update(f"{name}\0{rel}\0{entry.get('hash', '')}\n".encode('utf-8'))
+    return f"blake2b:{hasher.hexdigest()}"
+
+def model_memory_mb(model: YOLO) -> float:
+    """估算模型参数和缓冲区占用的内存(MB)"""
+    module = model.model
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors) / (1 << 20)
+
+class ModelCache:
+    """
+    进程内已加载模型的 LRU 缓存
+
+    按模型参数占用的内存计算预算，超出时淘汰最久未使用的模型。
+    """
+    def __init__(self, max_mb: float = 1024):
+        self.max_mb = max_mb
+        self._models: OrderedDict = OrderedDict()  # key -> (model, size_mb)
+        self._lock = threading.Lock()
+
+    @property
+    def size_mb(self) -> float:
+        return sum(size for _, size in self._models.values())
+
+    def get(self, key: str) -> Optional[YOLO]:
+        with self._lock:
+            item = self._models.get(key)
+            if item is None:
+                return None
+            self._models.move_to_end(key)
+            return item[0]
+
+    def put(self, key: str, model: YOLO):
+        with self._lock:
+            self._models[key] = (model, model_memory_mb(model))
+            self._models.move_to_end(key)
+            self._evict()
+
+    def load(self, key: str, loader: Callable[[], YOLO]) -> YOLO:
+        """返回缓存中的模型，未命中时调用 loader 加载并放入缓存"""
+        model = self.get(key)
+        if model is None:
+            model = loader()
+            self.put(key, model)
+        return model
+
+    def set_max_mb(self, max_mb: float):
+        with self._lock:
+            self.max_mb = max_mb
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def _evict(self):
+        # 至少保留最近使用的一个模型
+        while len(self._models) > 1 and self.size_mb > self.max_mb:
+            self._models.popitem(last=False)
+
+class ModelManager:
+    """
+    模型管理
+
+    - 训练记录：每次训练的参数、指标、权重路径和训练数据哈希保存在
+      models/registry.json，便于比较不同模型
+    - 模型缓存：已加载的权重保留在内存中（LRU，有内存预算），
+      在不同模型之间切换时不必重复从磁盘加载
+    """
+    def __init__(self, model_dir: Path, cache_mb: float = 1024):
+        """
+        Args:
+            model_dir: 模型目录（一般为 PathManager.get_model_dir()）
+            cache_mb: 模型缓存的内存预算(MB)
+        """
+        self.model_dir = Path(model_dir)
+        self.registry_path = self.model_dir / 'registry.json'
+        self.cache = ModelCache(cache_mb)
+        self._lock = threading.Lock()
+        self.runs: List[Dict[str, Any]] = self._load_registry()
+
+    def _load_registry(self) -> List[Dict[str, Any]]:
+        if not self.registry_path.exists():
+            return []
+        try:
+            with open(self.registry_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('runs', [])
+        except Exception as e:
+            print(f"加载模型记录失败: {e}")
+            return []
+
+    def _save_registry(self):
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.registry_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'runs': self.runs}, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.registry_path)
+
+    @staticmethod
+    def cache_key(weights: str | Path) -> str:
+        """
+        模型缓存键
+
+        本地文件包含修改时间，权重被覆盖后会重新加载；
+        ultralytics 内置名称（如 yolo11n-cls.pt）直接使用名称。
+        """
+        path = Path(weights)
+        if path.exists():
+            return f"{path.resolve()}:{path.stat().st_mtime_ns}"
+        return str(weights)
+
+    def load_model(self, weights: str | Path, copy_model: bool = False) -> YOLO:
+        """
+        加载模型（优先使用缓存）
+
+        Args:
+            weights: 权重文件路径或 ultralytics 模型名称
+            copy_model: 为 True 时返回独立副本。训练会修改模型对象（回调、权重），
+                        必须使用副本，缓存中的模型只用于推理。
+        """
+        model = self.cache.load(self.cache_key(weights), lambda: YOLO(str(weights)))
+        return copy.deepcopy(model) if copy_model else model
+
+    def register_run(self,
+                     weights: Path,
+                     params: Dict[str, Any],
+                     metrics: Dict[str, float],
+                     data_path: Path,
+                     save_dir: Optional[Path] = None,
+                     exports: Optional[Dict[str, Path]] = None) -> Dict[str, Any]:
+        """
+        记录一次训练
+
+        Args:
+            weights: 最佳权重路径
+            params: 训练参数（TrainingPanel.get_training_params 的结果）
+            metrics: 最终验证指标
+            data_path: 划分后的数据集目录
+            save_dir: ultralytics 训练输出目录
+            exports: 导出文件 {格式: 路径}
+
+        Returns:
+            训练记录
+        """
+        run = {
+            'id': datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'model_size': params.get('model_size'),
+            'weights': str(weights),
+            'save_dir': str(save_dir) if save_dir else None,
+            'data_path': str(data_path),
+            'data_hash': dataset_hash(data_path),
+            'params': dict(params),
+            'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+            'exports': {fmt: str(path) for fmt, path in (exports or {}).items()}
+        }
+        with self._lock:
+            self.runs.append(run)
+            self._save_registry()
+        return run
+
+    def list_runs(self, data_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出训练记录，可只列出使用同一份训练数据的记录"""
+        return [run for run in self.runs if data_hash is None or run.get('data_hash') == data_hash]
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return next((run for run in self.runs if run['id'] == run_id), None)
+
+    def best_run(self,
+                 metric: str = 'metrics/accuracy_top1',
+                 data_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """返回指定指标最高的训练记录"""
+        runs = [run for run in self.list_runs(data_hash) if metric in run['metrics']]
+        return max(runs, key=lambda run: run['metrics'][metric], default=None)
+
+    def remove_run(self, run_id: str):
+        """删除训练记录（不删除权重文件）"""
+        with self._lock:
+            self.runs = [run for run in self.runs if run['id'] != run_id]
+            self._save_registry()
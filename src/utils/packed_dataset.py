@@ -0,0 +1,317 @@
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import shutil
+import numpy as np
+from PIL import Image
+from ultralytics.data.dataset import ClassificationDataset
+from ultralytics.utils.torch_utils import strip_optimizer
+from .batch_augment import BatchAugmentTrainer
+from .dataset_manifest import iter_files
+from .decode_pool import preprocess_classify
+from .shard_archive import INDEX_NAME, load_image, make_ref, open_archive
+from .split_manifest import SplitManifest
+
+# 打包结果保存在划分目录下: <划分目录>/.packed/<图像尺寸>/<划分名称>/，
+# 不同图像尺寸的打包结果可以同时存在（例如超参数搜索中并行的试验），
+# 不再使用的尺寸由 remove_stale_packs 删除
+PACKED_DIR = '.packed'
+
+# ultralytics 分类训练只读取训练集和验证集，测试集不打包
+PACKED_SPLITS = ('train', 'valid')
+
+# 打包后磁盘上至少保留的空闲空间比例
+DISK_RESERVE = 0.05
+
+def packed_dir(split_dir: Path, split: str, img_size: int) -> Path:
+    return Path(split_dir) / PACKED_DIR / str(img_size) / split
+
+def archive_split(split_path: Path) -> Optional[SplitManifest]:
+    """划分来自分片归档时返回划分清单，否则返回 None"""
+    manifest = SplitManifest(split_path.parent).load()
+    return manifest if manifest.mode == 'archive' else None
+
+def split_key(split_path: Path, img_size: int) -> str:
+    """划分内容的键：文件列表、大小、修改时间和图像尺寸，任一变化都需要重新打包"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"img_size={img_size}\n".encode('utf-8'))
+    manifest = archive_split(split_path)
+    if manifest is not None:
+        # 归档划分：归档索引和该划分的文件列表
+        st = (Path(manifest.source) / INDEX_NAME).stat()
+        hasher.update(f"{manifest.source}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+        for rel in sorted(manifest.splits.get(split_path.name, [])):
+            hasher.update(f"{rel}\n".encode('utf-8'))
+        return hasher.hexdigest()
+    for rel, st in sorted(iter_files(split_path)):
+        hasher.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return hasher.hexdigest()
+
+def _pack_chunk(images_path: str, shape: tuple, start: int, paths: List[str], img_size: int) -> List[int]:
+    """打包进程：解码一段图片（文件路径或归档引用）写入内存映射文件，返回解码失败的序号"""
+    images = np.memmap(images_path, dtype=np.uint8, mode='r+', shape=shape)
+    failed = []
+    for offset, path in enumerate(paths):
+        img = load_image(path, img_size, short_edge=True)
+        if img is None:
+            failed.append(start + offset)
+            continue
+        images[start + offset] = preprocess_classify(img, img_size)
+    images.flush()
+    del images
+    return failed
+
+class PackedSplit:
+    """
+    预解码的划分：所有图片缩放、中心裁剪到 img_size 后存放在一个
+    (N, img_size, img_size, 3) 的 uint8 RGB 内存映射文件中，meta.json 记录
+    文件列表（相对划分目录的 类别/文件名）、标签和划分内容的键。
+
+    内存映射文件按需打开，数据加载进程之间共享页缓存，不在进程间复制图片数据。
+    文件不压缩，大小为 N x img_size² x 3 字节（见 packed_size）。
+    """
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.meta_path = self.directory / 'meta.json'
+        self.images_path = self.directory / 'images.u8'
+        self.meta: Dict = {}
+        self.index: Dict[str, int] = {}
+        self._images = None
+
+    def load(self) -> 'PackedSplit':
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+            self.index = {rel: i for i, rel in enumerate(self.meta['files'])}
+        return self
+
+    def is_valid(self, key: str) -> bool:
+        return self.meta.get('key') == key and self.images_path.exists()
+
+    @property
+    def img_size(self) -> Optional[int]:
+        return self.meta.get('img_size')
+
+    @property
+    def images(self) -> np.ndarray:
+        """(N, img_size, img_size, 3) 只读内存映射"""
+        if self._images is None:
+            shape = (len(self.meta['files']), self.img_size, self.img_size, 3)
+            self._images = np.memmap(self.images_path, dtype=np.uint8, mode='r', shape=shape)
+        return self._images
+
+    def __getstate__(self):
+        # 传给数据加载进程时不序列化内存映射，进程内重新打开
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
+def packed_size(count: int, img_size: int) -> int:
+    """count 张图片的打包文件大小（字节）"""
+    return count * img_size * img_size * 3
+
+def remove_stale_packs(split_dir: Path, keep_sizes) -> List[int]:
+    """删除 keep_sizes 以外的图像尺寸的打包结果，返回删除的尺寸"""
+    root = Path(split_dir) / PACKED_DIR
+    if not root.is_dir():
+        return []
+    keep = {str(size) for size in keep_sizes}
+    removed = []
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.name not in keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(int(entry.name) if entry.name.isdigit() else entry.name)
+    return removed
+
+def pack_split(split_dir: Path,
+               split: str,
+               img_size: int,
+               workers: Optional[int] = None,
+               progress_callback: Callable[[int, int], None] = None) -> Optional[PackedSplit]:
+    """
+    打包一个划分，划分内容和图像尺寸都未变化时直接返回已有结果
+
+    Args:
+        split_dir: 划分后的数据集目录
+        split: 划分名称（train/valid/test）
+        img_size: 训练图像尺寸
+        workers: 并行解码的进程数，默认等于 CPU 核数
+        progress_callback: 进度回调，接收已完成和总共的图片数
+
+    Returns:
+        打包结果，划分目录不存在时返回 None
+
+    Raises:
+        OSError: 磁盘空间不足以存放打包结果
+    """
+    split_path = Path(split_dir) / split
+    if not split_path.is_dir():
+        return None
+    packed = PackedSplit(packed_dir(split_dir, split, img_size)).load()
+    key = split_key(split_path, img_size)
+    if packed.is_valid(key):
+        return packed
+
+    # 与 torchvision ImageFolder 一致：类别为排序后的子目录
+    classes = sorted(entry.name for entry in os.scandir(split_path) if entry.is_dir())
+    manifest = archive_split(split_path)
+    if manifest is not None:
+        # 按归档中的存放顺序读取，接近顺序读
+        files = open_archive(manifest.source).sort_keys(manifest.splits.get(split, []))
+        sources = [make_ref(manifest.source, rel) for rel in files]
+    else:
+        files = sorted(rel for rel, _ in iter_files(split_path) if '/' in rel)
+        sources = [str(split_path / rel) for rel in files]
+    labels = [classes.index(rel.split('/', 1)[0]) for rel in files]
+
+    shutil.rmtree(packed.directory, ignore_errors=True)
+    packed.directory.mkdir(parents=True)
+    shape = (len(files), img_size, img_size, 3)
+    # 预先分配的文件是稀疏的，写满前不会报错，先确认磁盘空间足够
+    usage = shutil.disk_usage(packed.directory)
+    needed = packed_size(len(files), img_size)
+    if needed > usage.free - usage.total * DISK_RESERVE:
+        shutil.rmtree(packed.directory, ignore_errors=True)
+        raise OSError(f"磁盘空间不足：打包 {split}（{len(files)} 张，{img_size}px）需要 "
+                      f"{needed / 1024 ** 3:.1f} GB，可用 {usage.free / 1024 ** 3:.1f} GB")
+    # 预先分配文件大小，各进程直接写入自己负责的区间
+    with open(packed.images_path, 'wb') as f:
+        f.truncate(int(np.prod(shape)))
+
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(256, len(files) // (workers * 4) or 1))
+    failed = []
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as executor:
+        futures = [
+            (len(files[start:start + chunk]), executor.submit(
+                _pack_chunk, str(packed.images_path), shape, start,
+                sources[start:start + chunk], img_size))
+            for start in range(0, len(files), chunk)
+        ]
+        for count, future in futures:
+            failed += future.result()
+            done += count
+            if progress_callback:
+                progress_callback(done, len(files))
+
+    # 最后写 meta.json，打包中断时不会被当作有效结果
+    packed.meta = {
+        'key': key,
+        'img_size': img_size,
+        'classes': classes,
+        'files': files,
+        'labels': labels,
+        'failed': [files[i] for i in failed],
+        'archive': manifest.source if manifest is not None else None
+    }
+    tmp_path = packed.meta_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(packed.meta, f, ensure_ascii=False)
+    os.replace(tmp_path, packed.meta_path)
+    packed.load()
+    return packed
+
+def pack_dataset(split_dir: Path,
+                 img_size: int,
+                 workers: Optional[int] = None,
+                 progress_callback: Callable[[str, int, int], None] = None) -> Dict[str, PackedSplit]:
+    """打包训练集和验证集（见 PACKED_SPLITS），返回 {划分名称: PackedSplit}"""
+    result = {}
+    for split in PACKED_SPLITS:
+        callback = (lambda done, total, split=split: progress_callback(split, done, total)
+                    if progress_callback else None)
+        packed = pack_split(split_dir, split, img_size, workers, callback)
+        if packed is not None:
+            result[split] = packed
+    return result
+
+class PackedClassificationDataset(ClassificationDataset):
+    """
+    从打包结果读取图片的分类数据集
+
+    样本列表、类别顺序和数据增强的流程与 ClassificationDataset 一致，
+    只是把读取和解码 JPEG 换成了内存映射上的切片。两点不同：
+    - 切片仍会转换为 PIL 图片再做 torch 变换，省掉的是解码，不是零拷贝；
+    - 打包时图片已缩放并中心裁剪为 img_size 的正方形，训练时的 RandomResizedCrop
+      只能在这个正方形内取样，看不到原图中心以外的部分，也不能从更高的分辨率缩小。
+    """
+    def __init__(self, root: str, args, packed: PackedSplit, **kwargs):
+        super().__init__(root, args, **kwargs)
+        self.packed = packed
+        root_path = Path(self.root)
+        failed = set(packed.meta.get('failed', []))
+        if packed.meta.get('archive'):
+            # 归档划分的目录中没有图片，样本列表取自打包结果
+            self._archive_samples(root_path, failed, kwargs.get('names'))
+            return
+        self.packed_index = []
+        for sample in self.samples:
+            rel = Path(sample[0]).relative_to(root_path).as_posix()
+            self.packed_index.append(None if rel in failed else packed.index.get(rel))
+
+    def _archive_samples(self, root_path: Path, failed: set, names: Optional[Dict[int, str]]):
+        classes = self.packed.meta['classes']
+        if names:
+            index = {name: i for i, name in names.items()}
+        else:
+            index = {name: i for i, name in enumerate(classes)}
+        self.samples = []
+        self.packed_index = []
+        for i, (rel, label) in enumerate(zip(self.packed.meta['files'], self.packed.meta['labels'])):
+            if rel in failed or classes[label] not in index:
+                continue
+            path = root_path / rel
+            self.samples.append([str(path), index[classes[label]], path.with_suffix('.npy'), None])
+            self.packed_index.append(i)
+
+    def __getitem__(self, i: int) -> dict:
+        index = self.packed_index[i]
+        if index is None:
+            # 不在打包结果中的图片按原方式读取
+            return super().__getitem__(i)
+        im = Image.fromarray(self.packed.images[index])
+        return {'img': self.torch_transforms(im), 'cls': self.samples[i][1]}
+
+class PackedClassificationTrainer(BatchAugmentTrainer):
+    """
+    优先使用打包结果的分类训练器，划分没有有效打包结果时回退到原始图片
+    （批次级旋转增强见 BatchAugmentTrainer）
+
+    来自分片归档的划分没有原始图片可以回退，必须先打包（见 pack_dataset）。
+    """
+    def get_dataset(self) -> dict:
+        data_dir = Path(self.args.data)
+        if archive_split(data_dir / 'train') is None:
+            return super().get_dataset()
+        # 归档划分的目录中只有空的类别目录，ultralytics 的数据集检查会认为没有图片
+        names = dict(enumerate(sorted(entry.name for entry in os.scandir(data_dir / 'train')
+                                      if entry.is_dir())))
+        val_set = data_dir / 'valid'
+        test_set = data_dir / 'test' if (data_dir / 'test').is_dir() else val_set
+        return {'train': data_dir / 'train', 'val': val_set, 'test': test_set,
+                'nc': len(names), 'names': names, 'channels': 3}
+
+    def final_eval(self):
+        if archive_split(Path(self.args.data) / 'train') is None:
+            return super().final_eval()
+        # 最终验证会重新检查数据集目录，归档划分无法通过；
+        # 只精简权重文件，指标沿用训练过程中最后一次验证的结果
+        ckpt = strip_optimizer(self.last) if self.last.exists() else {}
+        if self.best.exists():
+            strip_optimizer(self.best, updates={'train_results': ckpt.get('train_results')})
+
+    def build_dataset(self, img_path: str, mode: str = 'train', batch=None):
+        img_path = Path(img_path)
+        packed = PackedSplit(packed_dir(img_path.parent, img_path.name, self.args.imgsz)).load()
+        if not packed.is_valid(split_key(img_path, self.args.imgsz)):
+            return super().build_dataset(str(img_path), mode, batch)
+        return PackedClassificationDataset(
+            str(img_path), self.args, packed,
+            augment=mode == 'train',
+            prefix='train' if mode == 'train' else self.args.split,
+            names=self.data['names'])
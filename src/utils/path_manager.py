@@ -1,6 +1,19 @@
 from pathlib import Path
+from typing import Iterable, Optional
+import os
 import shutil
-import random
+from .dataset_config import DatasetConfig
+from .dataset_index import DatasetIndex, index_path_for
+from .dataset_manifest import DatasetManifest
+from .dataset_splitter import DatasetSplitter
+from .dedup import dataset_duplicates, group_keys
+from .file_ops import FileLinker
+from .image_validator import ImageValidator
+from .shard_archive import INDEX_NAME, is_archive, open_archive
+from .split_manifest import SplitManifest
+
+# 参与划分和预览的图片格式
+IMAGE_SUFFIXES = ('.jpg', '.png')
 
 class PathManager:
     def __init__(self):
@@ -11,6 +24,22 @@ class PathManager:
         model_dir.mkdir(exist_ok=True)
         return model_dir
     
+    def get_weight_dir(self) -> Path:
+        """本地预训练权重仓库: models/pretrained"""
+        weight_dir = self.get_model_dir() / 'pretrained'
+        weight_dir.mkdir(exist_ok=True)
+        return weight_dir
+    
+    def get_run_dir(self, model_path: str | Path = '') -> Path:
+        """训练结果保存目录：设置中的模型保存路径，未设置时为 models/runs"""
+        run_dir = Path(model_path) if model_path else self.get_model_dir() / 'runs'
+        run_dir.mkdir(parents=True, exist_ok=True)
+        return run_dir
+    
+    def get_checkpoint_dir(self, model_path: str | Path = '') -> Path:
+        """周期检查点保存在训练结果目录下: <训练结果目录>/checkpoints/<训练名称>"""
+        return self.get_run_dir(model_path) / 'checkpoints'
+    
     def get_data_dir(self) -> Path:
         data_dir = self.root_dir / 'data' / 'raw'
         data_dir.mkdir(parents=True, exist_ok=True)
@@ -21,74 +50,229 @@ class PathManager:
         processed_dir.mkdir(parents=True, exist_ok=True)
         return processed_dir
     
-    def save_training_data(self, folder_path: str | Path) -> Path:
+    def get_cache_dir(self) -> Path:
+        cache_dir = self.root_dir / 'cache'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return cache_dir
+    
+    def get_index_path(self, dataset_dir: Path) -> Path:
+        """数据集索引保存在缓存目录: cache/index/<名称>-<路径哈希>.sqlite"""
+        return index_path_for(dataset_dir, self.get_cache_dir() / 'index')
+    
+    def get_dataset_index(self, dataset_dir: Path, full: bool = False) -> DatasetIndex:
+        """打开数据集索引并增量更新，full 为 True 时检查所有文件"""
+        index = DatasetIndex(dataset_dir, self.get_index_path(dataset_dir), IMAGE_SUFFIXES)
+        index.refresh(full=full)
+        return index
+    
+    def get_manifest_path(self, dataset_dir: Path) -> Path:
+        """数据集清单保存在数据集目录旁边: data/raw/<名称>.manifest.json"""
+        return dataset_dir.with_name(f"{dataset_dir.name}.manifest.json")
+    
+    def save_training_data(self, folder_path: str | Path, mode: str = 'auto') -> Path:
         """
         保存训练数据文件夹到数据目录
         
         Args:
             folder_path: 源训练数据文件夹路径
+            mode: 导入方式，auto/reflink/hardlink/symlink/copy，
+                  auto 依次尝试 reflink、硬链接和符号链接，只有 copy 会复制数据
             
         Returns:
             保存后的目标文件夹路径
         """
+        return self.sync_training_data(folder_path, mode)['dest']
+    
+    def sync_training_data(self, folder_path: str | Path, mode: str = 'auto') -> dict:
+        """
+        增量导入训练数据文件夹，只处理新增、变化和删除的文件
+        
+        Args:
+            folder_path: 源训练数据文件夹路径，或分片归档目录（见 utils.shard_archive）
+            mode: 导入方式，同 save_training_data
+            
+        Returns:
+            变化报告: dest(目标路径)、added/changed/removed(相对路径列表)、unchanged(数量)
+        """
         folder_path = Path(folder_path)
         dest_dir = self.get_data_dir() / folder_path.name
+        if is_archive(folder_path):
+            return self._sync_archive(folder_path, dest_dir, mode)
+        manifest = DatasetManifest(self.get_manifest_path(dest_dir)).load()
         
-        # 如果目标文件夹已存在，先删除
+        # 没有清单（旧版本导入）或来源、导入方式变化时，重新完整导入
+        # 链接方式下删除目标只删除链接，不影响源文件
+        if manifest.source != str(folder_path) or manifest.mode != mode:
+            if dest_dir.exists():
+                shutil.rmtree(dest_dir)
+            manifest.entries = {}
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        
+        report = manifest.sync(folder_path, dest_dir, mode)
+        manifest.save()
+        
+        report['dest'] = dest_dir
+        return report
+    
+    def _sync_archive(self, archive_dir: Path, dest_dir: Path, mode: str) -> dict:
+        """
+        导入分片归档：只链接（或复制）分片和索引文件，不展开为单个图片文件
+
+        索引文件未变化时视为没有变化，否则把归档中的全部文件报告为新增。
+        """
+        src_index = archive_dir / INDEX_NAME
+        dst_index = dest_dir / INDEX_NAME
+        src_stat = src_index.stat()
+        if dst_index.exists():
+            dst_stat = dst_index.stat()
+            if (dst_stat.st_ino == src_stat.st_ino
+                    or (dst_stat.st_size == src_stat.st_size
+                        and dst_stat.st_mtime_ns >= src_stat.st_mtime_ns)):
+                return {'dest': dest_dir, 'added': [], 'changed': [], 'removed': [],
+                        'unchanged': len(open_archive(dest_dir))}
+
         if dest_dir.exists():
             shutil.rmtree(dest_dir)
+        dest_dir.mkdir(parents=True)
+        linker = FileLinker(mode)
+        for shard in sorted(archive_dir.glob('shard-*.tar')):
+            linker.link(shard, dest_dir / shard.name)
+        # 索引最后放置，中断的导入不会被识别为归档
+        linker.link(src_index, dst_index)
+        return {'dest': dest_dir, 'added': open_archive(dest_dir).keys(), 'changed': [],
+                'removed': [], 'unchanged': 0}
+    
+    def get_quarantine_dir(self, dataset_dir: Path) -> Path:
+        """检查不通过的图片移到 data/quarantine/<名称>"""
+        return self.root_dir / 'data' / 'quarantine' / Path(dataset_dir).name
+    
+    def validate_dataset(self,
+                         dataset_dir: Path,
+                         full_decode: bool = False,
+                         workers: Optional[int] = None,
+                         progress_callback=None,
+                         layout_check: str = 'minority') -> dict:
+        """
+        检查导入的数据集并隔离不通过的图片（见 utils.image_validator）
+        
+        检查结果按导入清单中的内容哈希缓存，重新导入后只检查新增和变化的文件。
+        已隔离的图片按当前的检查条件重新判断，不再需要隔离的移回数据集。
+        
+        Args:
+            dataset_dir: 导入后的数据集目录（sync_training_data 的 dest）
+            full_decode: 是否完整解码每张图片
+            workers: 检查进程数
+            progress_callback: 进度回调 (已检查数, 需检查数)
+            layout_check: 灰度、透明通道等通道格式的检查方式，见 utils.image_validator.LAYOUT_CHECKS
+            
+        Returns:
+            检查报告: quarantined({相对路径: 原因})、restored(移回的文件)、checked、cached
+        """
+        dataset_dir = Path(dataset_dir)
+        quarantine_dir = self.get_quarantine_dir(dataset_dir)
+        manifest = DatasetManifest(self.get_manifest_path(dataset_dir)).load()
+        entries = manifest.entries
+        previous = {rel for rel, entry in entries.items() if 'quarantined' in entry}
+        files = {rel: entry.get('hash') for rel, entry in entries.items()
+                 if '/' in rel and rel.lower().endswith(IMAGE_SUFFIXES)
+                 and (rel in previous or os.path.lexists(dataset_dir / rel))}
+        validator = ImageValidator(self.get_cache_dir() / 'validation.sqlite', full_decode, workers,
+                                   layout_check=layout_check)
+        try:
+            bad, stats = validator.validate(dataset_dir, files, progress_callback,
+                                            {rel: quarantine_dir / rel for rel in previous})
+        finally:
+            validator.close()
         
-        # 复制整个文件夹
-        shutil.copytree(folder_path, dest_dir)
+        # 检查条件放宽后不再需要隔离的文件：移回数据集，隔离目录中没有时从源目录重新导入
+        released = sorted(previous - bad.keys())
+        restored = ImageValidator.restore(dataset_dir, released, quarantine_dir)
+        if len(restored) < len(released) and manifest.source:
+            linker = FileLinker(manifest.mode or 'auto')
+            for rel in sorted(set(released) - set(restored)):
+                src = Path(manifest.source) / rel
+                if src.exists() and not os.path.lexists(dataset_dir / rel):
+                    (dataset_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+                    linker.link(src, dataset_dir / rel)
+        for rel in released:
+            del entries[rel]['quarantined']
         
-        return dest_dir
+        moved = ImageValidator.quarantine(dataset_dir, bad, quarantine_dir)
+        # 记录到导入清单，重新导入时内容未变化的文件不会被放回
+        for rel in set(moved) | (previous & bad.keys()):
+            entries[rel]['quarantined'] = bad[rel]
+        if previous or moved:
+            manifest.save()
+        return {'quarantined': bad, 'restored': released, **stats}
+    
+    def get_split_dir(self, source_dir: Path) -> Path:
+        """数据集划分结果保存在 data/processed/<名称>"""
+        return self.get_processed_dir() / Path(source_dir).name
     
-    def split_dataset(self, source_dir: Path, split_ratios: tuple = (0.7, 0.2, 0.1)):
+    def split_dataset(self,
+                      source_dir: Path,
+                      split_ratios: tuple = (0.7, 0.2, 0.1),
+                      mode: str = 'auto',
+                      refresh: Iterable[str] = (),
+                      seed: int = 0,
+                      stratify: bool = True,
+                      max_per_class: Optional[int] = None,
+                      dedup_threshold: Optional[int] = None,
+                      progress_callback=None) -> Path:
         """
         自动划分数据集到 train/valid/test 目录
+        
+        每个文件按相对路径和种子的哈希确定所属划分（见 DatasetSplitter），同样的种子
+        总能得到同样的划分。划分结果写入 data/processed/<名称>/split.json，划分目录中
+        只放置指向源文件的链接（mode 为 copy 时并行复制），重新划分只处理所属划分
+        变化的文件，不会修改源目录。
+        
         Args:
-            source_dir: 原始数据目录
+            source_dir: 原始数据目录（每个子目录为一个类别）或分片归档目录
             split_ratios: (训练集比例, 验证集比例, 测试集比例)
+            mode: 放置文件的方式，见 utils.file_ops.INGEST_MODES
+            refresh: 内容已变化、需要重新链接的文件（相对源目录的路径）
+            seed: 划分种子
+            stratify: 是否分层划分
+            max_per_class: 每个类别最多使用的图片数，None 表示不限制
+            dedup_threshold: 近似重复的感知哈希距离阈值（见 utils.dedup），提供时
+                             每组近似重复的图片放在同一划分，避免训练集和测试集
+                             出现同一目标；分片归档不支持。重复组整组分配，
+                             开启或修改阈值会改变已有的划分
+            progress_callback: 计算感知哈希的进度回调 (已计算数, 需计算数)
+            
+        Returns:
+            划分后的数据集目录
         """
-        # 确保比例总和为1
-        assert sum(split_ratios) == 1.0, "划分比例总和必须为1"
-        
-        # 目标目录
-        data_dir = self.get_data_dir()
-        train_dir = data_dir / 'train' / 'images'
-        valid_dir = data_dir / 'valid' / 'images'
-        test_dir = data_dir / 'test' / 'images'
-        
-        # 清空现有数据
-        shutil.rmtree(data_dir, ignore_errors=True)
-        train_dir.mkdir(parents=True, exist_ok=True)
-        valid_dir.mkdir(parents=True, exist_ok=True)
-        test_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 遍历每个类别
-        for class_dir in source_dir.iterdir():
-            if class_dir.is_dir():
-                # 获取所有图片文件
-                images = list(class_dir.glob("*.jpg")) + list(class_dir.glob("*.png"))
-                random.shuffle(images)
-                
-                # 计算划分点
-                total = len(images)
-                train_end = int(total * split_ratios[0])
-                valid_end = train_end + int(total * split_ratios[1])
-                
-                # 复制文件
-                for img in images[:train_end]:
-                    dest = train_dir / class_dir.name / img.name
-                    dest.parent.mkdir(exist_ok=True)
-                    shutil.copy(img, dest)
-                
-                for img in images[train_end:valid_end]:
-                    dest = valid_dir / class_dir.name / img.name
-                    dest.parent.mkdir(exist_ok=True)
-                    shutil.copy(img, dest)
-                
-                for img in images[valid_end:]:
-                    dest = test_dir / class_dir.name / img.name
-                    dest.parent.mkdir(exist_ok=True)
-                    shutil.copy(img, dest)
\ No newline at end of file
+        source_dir = Path(source_dir)
+        split_dir = self.get_split_dir(source_dir)
+        manifest = SplitManifest(split_dir).load()
+        
+        # 类别文件夹从数据集索引读取文件列表，不再遍历目录；损坏的图片不参与划分
+        index = None if is_archive(source_dir) else self.get_dataset_index(source_dir)
+        groups = None
+        if index is not None and dedup_threshold is not None:
+            groups = group_keys(dataset_duplicates(index, dedup_threshold,
+                                                   progress_callback=progress_callback))
+        splitter = DatasetSplitter(split_ratios, seed=seed, stratify=stratify,
+                                   max_per_class=max_per_class, suffixes=IMAGE_SUFFIXES,
+                                   index=index, groups=groups)
+        assignments = dict(splitter.split(source_dir))
+        
+        if index is None:
+            # 分片归档不展开，划分目录只记录清单，训练时从归档读取
+            manifest.register_archive(source_dir, assignments, splitter.list_classes(source_dir))
+        else:
+            manifest.materialize(source_dir, assignments, mode, refresh)
+        manifest.ratios = list(split_ratios)
+        manifest.save()
+        
+        # 更新数据集配置
+        dataset_config = DatasetConfig(split_dir)
+        if index is None:
+            dataset_config.update_class_info(splitter.list_classes(source_dir))
+        else:
+            dataset_config.update_from_index(index)
+            index.close()
+        
+        return split_dir
@@ -0,0 +1,282 @@
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import sqlite3
+import tarfile
+import threading
+import time
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+import numpy as np
+from .dataset_manifest import iter_files
+from .thumbnail import decode_reduced, decode_reduced_bytes
+
+# 分片归档目录中的索引文件和分片文件名
+INDEX_NAME = 'index.sqlite'
+SHARD_PATTERN = 'shard-{:06d}.tar'
+
+# 归档内文件的引用: <归档目录>::<类别/文件名>
+REF_SEPARATOR = '::'
+
+def is_archive(path: Path) -> bool:
+    """path 是否为分片归档目录"""
+    return (Path(path) / INDEX_NAME).is_file()
+
+def make_ref(archive_dir: Path, key: str) -> str:
+    return f"{archive_dir}{REF_SEPARATOR}{key}"
+
+def split_ref(ref: str) -> Optional[Tuple[str, str]]:
+    """拆分归档引用，普通路径返回 None"""
+    if REF_SEPARATOR not in ref:
+        return None
+    archive_dir, key = ref.split(REF_SEPARATOR, 1)
+    return archive_dir, key
+
+def _write_shard(shard_path: Path, source_dir: Path, files: List[str]) -> List[tuple]:
+    """
+    写一个分片（未压缩 tar），返回索引行 (key, label, offset, size)
+
+    成员名即 类别/文件名；offset 为文件内容在分片中的起始位置，供随机读取。
+    """
+    rows = []
+    tmp_path = shard_path.with_suffix('.part')
+    with tarfile.open(tmp_path, 'w', format=tarfile.PAX_FORMAT) as tar:
+        for rel in files:
+            path = source_dir / rel
+            st = path.stat()
+            info = tarfile.TarInfo(rel)
+            info.size = st.st_size
+            info.mtime = int(st.st_mtime)
+            info.mode = 0o644
+            header = info.tobuf(tar.format, tar.encoding, tar.errors)
+            offset = tar.offset + len(header)
+            with open(path, 'rb') as f:
+                tar.addfile(info, f)
+            label = rel.split('/', 1)[0] if '/' in rel else ''
+            rows.append((rel, label, offset, st.st_size))
+    os.replace(tmp_path, shard_path)
+    return rows
+
+def write_archive(source_dir: Path,
+                  archive_dir: Path,
+                  shard_size_mb: float = 512,
+                  workers: int = 8,
+                  suffixes: Optional[Iterable[str]] = None,
+                  progress_callback: Callable[[int, int], None] = None) -> Dict:
+    """
+    把类别文件夹形式的数据集写成分片归档
+
+    文件按相对路径排序后切分为约 shard_size_mb 大小的分片，多个分片并行写入；
+    全部分片写完后再写索引，中断的归档不会被识别为有效归档。
+
+    Args:
+        source_dir: 数据集目录（每个子目录为一个类别）
+        archive_dir: 归档目录
+        shard_size_mb: 每个分片的目标大小(MB)
+        workers: 并行写分片的线程数
+        suffixes: 只打包这些扩展名的文件，None 表示全部
+        progress_callback: 进度回调，接收已完成和总共的分片数
+
+    Returns:
+        统计信息: files、shards、bytes、seconds
+    """
+    start = time.perf_counter()
+    source_dir = Path(source_dir)
+    archive_dir = Path(archive_dir)
+    suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+
+    files = sorted((rel, st.st_size) for rel, st in iter_files(source_dir)
+                   if suffixes is None or rel.lower().endswith(suffixes))
+    shards: List[List[str]] = [[]]
+    limit = shard_size_mb * 1024 * 1024
+    current = 0
+    for rel, size in files:
+        if shards[-1] and current + size > limit:
+            shards.append([])
+            current = 0
+        shards[-1].append(rel)
+        current += size
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    index_path = archive_dir / INDEX_NAME
+    if index_path.exists():
+        index_path.unlink()
+    for old in archive_dir.glob('shard-*.tar'):
+        old.unlink()
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_write_shard, archive_dir / SHARD_PATTERN.format(i), source_dir, names): i
+                   for i, names in enumerate(shards) if names}
+        for done, future in enumerate(futures, start=1):
+            results[futures[future]] = future.result()
+            if progress_callback:
+                progress_callback(done, len(futures))
+
+    tmp_path = index_path.with_suffix('.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+    conn = sqlite3.connect(tmp_path)
+    with conn:
+        conn.execute("CREATE TABLE files (key TEXT PRIMARY KEY, label TEXT, "
+                     "shard INTEGER, offset INTEGER, size INTEGER)")
+        conn.execute("CREATE INDEX files_label ON files (label)")
+        conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+        for shard, rows in results.items():
+            conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+                             [(key, label, shard, offset, size) for key, label, offset, size in rows])
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [('source', str(source_dir)), ('shards', str(len(results)))])
+    conn.close()
+    os.replace(tmp_path, index_path)
+
+    return {
+        'files': len(files),
+        'shards': len(results),
+        'bytes': sum(size for _, size in files),
+        'seconds': time.perf_counter() - start
+    }
+
+class ShardArchive:
+    """
+    分片归档的读取
+
+    - 顺序读取: iter_items 按分片和偏移顺序读取，适合打包、推理等整体扫描
+    - 随机读取: read 通过索引定位到分片中的偏移直接读取
+    """
+    def __init__(self, archive_dir: Path):
+        self.archive_dir = Path(archive_dir)
+        self.index_path = self.archive_dir / INDEX_NAME
+        if not self.index_path.is_file():
+            raise FileNotFoundError(f"不是分片归档: {self.archive_dir}")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._fds: Dict[int, int] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        return self._conn
+
+    def _query(self, sql: str, args: tuple = ()) -> list:
+        with self._lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM files")[0][0]
+
+    def classes(self) -> List[str]:
+        """类别列表（排序）"""
+        return [row[0] for row in self._query("SELECT DISTINCT label FROM files WHERE label != '' ORDER BY label")]
+
+    def class_counts(self) -> Dict[str, int]:
+        return dict(self._query("SELECT label, COUNT(*) FROM files GROUP BY label ORDER BY label"))
+
+    def keys(self, label: Optional[str] = None) -> List[str]:
+        """文件列表，按在归档中的存放顺序"""
+        if label is None:
+            rows = self._query("SELECT key FROM files ORDER BY shard, offset")
+        else:
+            rows = self._query("SELECT key FROM files WHERE label = ? ORDER BY shard, offset", (label,))
+        return [row[0] for row in rows]
+
+    def locate(self, key: str) -> Optional[Tuple[int, int, int]]:
+        """返回 (分片序号, 偏移, 大小)，不存在时返回 None"""
+        rows = self._query("SELECT shard, offset, size FROM files WHERE key = ?", (key,))
+        return rows[0] if rows else None
+
+    def sort_keys(self, keys: Iterable[str]) -> List[str]:
+        """按存放顺序排列，使随后的读取接近顺序读取"""
+        order = {key: i for i, key in enumerate(self.keys())}
+        return sorted(keys, key=lambda key: order.get(key, len(order)))
+
+    def _fd(self, shard: int) -> int:
+        fd = self._fds.get(shard)
+        if fd is None:
+            with self._lock:
+                fd = self._fds.get(shard)
+                if fd is None:
+                    fd = os.open(self.archive_dir / SHARD_PATTERN.format(shard),
+                                 os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+                    self._fds[shard] = fd
+        return fd
+
+    def read(self, key: str) -> bytes:
+        """随机读取一个文件的内容"""
+        location = self.locate(key)
+        if location is None:
+            raise KeyError(key)
+        shard, offset, size = location
+        fd = self._fd(shard)
+        if hasattr(os, 'pread'):
+            return os.pread(fd, size, offset)
+        with self._lock:
+            # Windows 没有 pread
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, size)
+
+    def iter_items(self) -> Iterator[Tuple[str, bytes]]:
+        """顺序读取所有文件，返回 (key, 内容)"""
+        shards = [row[0] for row in self._query("SELECT DISTINCT shard FROM files ORDER BY shard")]
+        for shard in shards:
+            with tarfile.open(self.archive_dir / SHARD_PATTERN.format(shard), 'r|') as tar:
+                for member in tar:
+                    if member.isfile():
+                        yield member.name, tar.extractfile(member).read()
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # 传给其他进程时重新打开索引和分片
+        return {'archive_dir': self.archive_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state['archive_dir'])
+
+# 每个进程只打开一次同一个归档
+_archives: Dict[str, ShardArchive] = {}
+_archives_lock = threading.Lock()
+
+def open_archive(archive_dir: Path) -> ShardArchive:
+    # 归档被重新写入（索引文件变化）后重新打开
+    index_stat = (Path(archive_dir) / INDEX_NAME).stat()
+    key = f"{archive_dir}:{index_stat.st_size}:{index_stat.st_mtime_ns}"
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None:
+            archive = _archives[key] = ShardArchive(archive_dir)
+        return archive
+
+def read_image(ref: str) -> Optional[np.ndarray]:
+    """读取图片（BGR），ref 为文件路径或归档引用"""
+    parts = split_ref(str(ref))
+    if parts is None:
+        return cv2.imread(str(ref))
+    try:
+        data = open_archive(parts[0]).read(parts[1])
+    except (KeyError, OSError):
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def load_image(ref: str, max_size: int, short_edge: bool = False) -> Optional[np.ndarray]:
+    """以缩小比例解码图片（BGR），ref 为文件路径或归档引用，见 decode_reduced"""
+    parts = split_ref(str(ref))
+    if parts is None:
+        return decode_reduced(ref, max_size, short_edge)
+    try:
+        data = open_archive(parts[0]).read(parts[1])
+    except (KeyError, OSError):
+        return None
+    return decode_reduced_bytes(data, parts[1], max_size, short_edge)
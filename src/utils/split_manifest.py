@@ -0,0 +1,151 @@
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+import json
+import os
+import shutil
+from .file_ops import FileLinker
+
+# 划分名称，与 ultralytics 分类数据集目录结构一致
+SPLITS = ('train', 'valid', 'test')
+
+class SplitManifest:
+    """
+    数据集划分清单，记录每个划分包含的文件列表（相对源目录的 类别/文件名）
+
+    划分目录中的文件只是指向源文件的链接（或复制件），重新划分时
+    只处理所属划分发生变化的文件，源目录始终不会被修改。
+    """
+    def __init__(self, split_dir: Path):
+        self.split_dir = Path(split_dir)
+        self.manifest_path = self.split_dir / 'split.json'
+        self.source = None
+        self.mode = None
+        self.ratios = None
+        self.splits: Dict[str, list] = {split: [] for split in SPLITS}
+
+    def load(self) -> 'SplitManifest':
+        """加载清单，文件不存在时保持为空"""
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.source = data.get('source')
+            self.mode = data.get('mode')
+            self.ratios = data.get('ratios')
+            self.splits.update(data.get('splits', {}))
+        return self
+
+    def save(self):
+        """保存清单"""
+        self.split_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'source': self.source,
+                'mode': self.mode,
+                'ratios': self.ratios,
+                'splits': self.splits
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def assignments(self) -> Dict[str, str]:
+        """返回 {相对路径: 划分名称}"""
+        return {rel: split for split, files in self.splits.items() for rel in files}
+
+    def materialize(self,
+                    source_dir: Path,
+                    assignments: Dict[str, str],
+                    mode: str = 'auto',
+                    refresh: Iterable[str] = (),
+                    workers: int = 8) -> Dict[str, int]:
+        """
+        按新的划分结果更新划分目录
+
+        Args:
+            source_dir: 源数据目录
+            assignments: 新的划分结果 {相对路径: 划分名称}
+            mode: 放置文件的方式，见 utils.file_ops.INGEST_MODES
+            refresh: 源文件内容已变化、需要重新链接的相对路径
+            workers: 并行链接/复制的线程数
+
+        Returns:
+            统计信息: added(新放置)、removed(删除)、kept(保持不变)
+        """
+        source_dir = Path(source_dir)
+        if self.source != str(source_dir) or self.mode != mode:
+            # 来源或放置方式变化，清空旧的划分目录
+            for split in SPLITS:
+                shutil.rmtree(self.split_dir / split, ignore_errors=True)
+            old = {}
+        else:
+            old = self.assignments()
+
+        refresh = set(refresh)
+        removes = [(rel, split) for rel, split in old.items()
+                   if assignments.get(rel) != split or rel in refresh]
+        adds = [(rel, split) for rel, split in assignments.items()
+                if old.get(rel) != split or rel in refresh]
+
+        # 先建好所有目标目录，避免线程间竞争
+        for directory in {(self.split_dir / split / rel).parent for rel, split in adds}:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        linker = FileLinker(mode)
+
+        def remove(item):
+            rel, split = item
+            dst = self.split_dir / split / rel
+            if os.path.lexists(dst):
+                os.unlink(dst)
+
+        def add(item):
+            rel, split = item
+            linker.link(source_dir / rel, self.split_dir / split / rel)
+
+        # 链接/复制都是 I/O 操作，线程池即可并行
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(remove, removes))
+            list(executor.map(add, adds))
+
+        self.source = str(source_dir)
+        self.mode = mode
+        self.splits = {split: [] for split in SPLITS}
+        for rel, split in assignments.items():
+            self.splits[split].append(rel)
+
+        return {
+            'added': len(adds),
+            'removed': len(removes),
+            'kept': len(assignments) - len(adds)
+        }
+
+    def register_archive(self, source_dir: Path, assignments: Dict[str, str],
+                         classes: Iterable[str]) -> Dict[str, int]:
+        """
+        记录分片归档的划分结果
+
+        归档中的图片不展开到划分目录，划分目录下只建立空的类别目录（保持
+        ultralytics 分类数据集的目录结构），训练时由 packed_dataset 按清单从
+        归档中读取图片。
+
+        Returns:
+            统计信息，同 materialize
+        """
+        old = self.assignments() if self.source == str(source_dir) and self.mode == 'archive' else {}
+        for split in SPLITS:
+            shutil.rmtree(self.split_dir / split, ignore_errors=True)
+            for class_name in classes:
+                (self.split_dir / split / class_name).mkdir(parents=True, exist_ok=True)
+
+        self.source = str(source_dir)
+        self.mode = 'archive'
+        self.splits = {split: [] for split in SPLITS}
+        for rel, split in assignments.items():
+            self.splits[split].append(rel)
+
+        changed = sum(1 for rel, split in assignments.items() if old.get(rel) != split)
+        return {
+            'added': changed,
+            'removed': sum(1 for rel, split in old.items() if assignments.get(rel) != split),
+            'kept': len(assignments) - changed
+        }
@@ -0,0 +1,321 @@
+from pathlib import Path
+from datetime import datetime
+from itertools import product
+from typing import Any, Callable, Dict, List, Optional
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import random
+import statistics
+import time
+from .model_manager import ModelManager
+from .packed_dataset import pack_dataset, remove_stale_packs
+from .split_manifest import SplitManifest
+
+# 可以搜索的参数，与 TrainingPanel.get_training_params 的键一致
+SWEEP_KEYS = ('model_size', 'img_size', 'batch_size', 'optimizer', 'learning_rate', 'epochs',
+              'pretrained', 'workers', 'cache')
+
+# 搜索学习率但没有指定优化器时使用的优化器（'auto' 会忽略学习率）
+DEFAULT_LR_OPTIMIZER = 'SGD'
+
+def _sample(space: Any, rng: random.Random) -> Any:
+    """从一个参数的搜索空间中随机取值：列表中随机选一个，或 {min, max, log} 范围内均匀取值"""
+    if isinstance(space, list):
+        return rng.choice(space)
+    low, high = space['min'], space['max']
+    if space.get('log'):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    if isinstance(low, int) and isinstance(high, int):
+        return int(round(value))
+    return value
+
+def generate_trials(spec: Dict[str, Any], base_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    按搜索配置生成试验参数
+
+    Args:
+        spec: 搜索配置
+              - method: 'grid'（网格，各参数必须是取值列表）或 'random'（随机）
+              - params: {参数名: 取值列表 或 {"min": .., "max": .., "log": true}}
+              - trials: 随机搜索的试验次数
+              - seed: 随机搜索的种子
+        base_params: 未搜索参数的取值（一般为 user_settings.json 中的 training_params）
+
+    Returns:
+        每次试验的完整训练参数；搜索学习率而优化器为 'auto' 时改用 DEFAULT_LR_OPTIMIZER，
+        否则学习率不会生效
+    """
+    space = spec.get('params', {})
+    unknown = set(space) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"不支持搜索的参数: {sorted(unknown)}，可选: {list(SWEEP_KEYS)}")
+
+    method = spec.get('method', 'grid')
+    if method == 'grid':
+        for key, values in space.items():
+            if not isinstance(values, list):
+                raise ValueError(f"网格搜索的参数 {key} 必须是取值列表")
+        keys = list(space)
+        combos = [dict(zip(keys, values)) for values in product(*(space[k] for k in keys))]
+    elif method == 'random':
+        rng = random.Random(spec.get('seed', 0))
+        combos = [{key: _sample(values, rng) for key, values in space.items()}
+                  for _ in range(spec.get('trials', 10))]
+    else:
+        raise ValueError(f"未知的搜索方式: {method}")
+    trials = [{**base_params, **combo} for combo in combos]
+    if 'learning_rate' in space:
+        for params in trials:
+            if params.get('optimizer', 'auto') == 'auto':
+                params['optimizer'] = DEFAULT_LR_OPTIMIZER
+    return trials
+
+def _run_trial(trial_id: str, data_path: str, params: Dict[str, Any], threads: int,
+               result_queue, stop_event):
+    """
+    试验进程：完整训练一次，每轮验证后报告指标，stop_event 置位时在本轮结束后停止
+
+    训练在独立进程中运行，各试验的 torch 线程数互不影响。
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        from .yolo_trainer import YOLOTrainer
+
+        trainer = YOLOTrainer()
+        if not trainer.init_model(params['model_size'], params.get('pretrained', True)):
+            result_queue.put(('done', trial_id, {'ok': False, 'message': "模型初始化失败"}))
+            return
+
+        def on_fit_epoch_end(t):
+            metrics = {k: float(v) for k, v in (t.metrics or {}).items()}
+            result_queue.put(('epoch', trial_id, t.epoch + 1, metrics))
+            if stop_event.is_set():
+                t.stop = True
+
+        trainer.model.add_callback('on_fit_epoch_end', on_fit_epoch_end)
+        messages = []
+        ok = trainer.train(Path(data_path), params, lambda value, message: messages.append(message))
+        t = trainer.model.trainer
+        result_queue.put(('done', trial_id, {
+            'ok': ok,
+            'message': messages[-1] if messages else "",
+            'metrics': {k: float(v) for k, v in (t.metrics or {}).items()} if ok else {},
+            'weights': str(t.best) if ok else None,
+            'save_dir': str(t.save_dir) if ok else None
+        }))
+    except Exception as e:
+        result_queue.put(('done', trial_id, {'ok': False, 'message': str(e)}))
+
+class SweepRunner:
+    """
+    超参数搜索
+
+    多个试验在独立进程中并行训练，总 CPU 核数不超过 cpu_budget：每个试验使用
+    threads_per_trial 个 torch 线程，数据加载进程数也限制在该预算内。
+
+    提前停止采用中位数规则：试验训练满 grace_epochs 轮后，若其到目前为止的
+    最好指标低于其他试验在同一轮次的最好指标的中位数（至少有 min_peers 个
+    试验已到达该轮次），则在本轮结束后停止。被停止的试验仍然保留结果。
+    """
+    def __init__(self,
+                 data_path: Path,
+                 trials: List[Dict[str, Any]],
+                 output_dir: Path,
+                 cpu_budget: Optional[int] = None,
+                 threads_per_trial: Optional[int] = None,
+                 metric: str = 'metrics/accuracy_top1',
+                 mode: str = 'max',
+                 grace_epochs: int = 2,
+                 min_peers: int = 2,
+                 model_manager: Optional[ModelManager] = None):
+        """
+        Args:
+            data_path: 划分后的数据集目录
+            trials: 每次试验的训练参数（见 generate_trials）
+            output_dir: 搜索结果目录，每个试验的训练输出和 leaderboard.json 保存在其中
+            cpu_budget: 可使用的 CPU 核数，默认为全部
+            threads_per_trial: 每个试验的线程数，默认使并行试验数尽量多且每个试验至少 2 个线程
+            metric: 比较试验的验证指标
+            mode: 'max' 表示指标越大越好，'min' 表示越小越好
+            grace_epochs: 训练满多少轮后才允许提前停止
+            min_peers: 提前停止至少需要的对比试验数
+            model_manager: 提供时把完成的试验登记到训练记录中
+        """
+        self.data_path = Path(data_path)
+        self.trials = [dict(params) for params in trials]
+        self.output_dir = Path(output_dir)
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.threads_per_trial = min(threads_per_trial or max(2, self.cpu_budget // max(1, len(trials))),
+                                     self.cpu_budget)
+        self.concurrency = max(1, self.cpu_budget // self.threads_per_trial)
+        self.metric = metric
+        self.mode = mode
+        self.grace_epochs = grace_epochs
+        self.min_peers = min_peers
+        self.model_manager = model_manager
+        # 试验 id -> {epoch: 到该轮为止的最好指标}
+        self.history: Dict[str, Dict[int, float]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def _better(self, a: float, b: float) -> bool:
+        return a > b if self.mode == 'max' else a < b
+
+    def should_stop(self, trial_id: str, epoch: int) -> bool:
+        """中位数规则，见类说明"""
+        if epoch < self.grace_epochs or epoch not in self.history.get(trial_id, {}):
+            return False
+        peers = [h[epoch] for tid, h in self.history.items() if tid != trial_id and epoch in h]
+        if len(peers) < self.min_peers:
+            return False
+        return self._better(statistics.median(peers), self.history[trial_id][epoch])
+
+    def _record(self, trial_id: str, epoch: int, metrics: Dict[str, float]):
+        if self.metric not in metrics:
+            return
+        history = self.history.setdefault(trial_id, {})
+        value = metrics[self.metric]
+        best = history.get(max(history)) if history else None
+        history[epoch] = value if best is None or self._better(value, best) else best
+
+    def _prepare(self, report: Callable[[str], None]):
+        """使用预解码缓存的试验共用打包结果，先在本进程中打包，避免多个试验同时写"""
+        archive = SplitManifest(self.data_path).load().mode == 'archive'
+        sizes = sorted({params['img_size'] for params in self.trials
+                        if archive or params.get('cache') == 'packed'})
+        remove_stale_packs(self.data_path, sizes)
+        for img_size in sizes:
+            report(f"预解码数据集（{img_size}px）...")
+            pack_dataset(self.data_path, img_size, workers=self.cpu_budget)
+
+    def _trial_params(self, trial_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        params = dict(params)
+        trial_dir = self.output_dir / trial_id
+        params['project'] = str(trial_dir)
+        params['checkpoint_dir'] = str(trial_dir / 'checkpoints')
+        params['save_checkpoint'] = False
+        # 打包结果由 _prepare 统一准备，试验之间互不删除
+        params['prune_packs'] = False
+        # 数据加载进程也计入 CPU 预算
+        params['workers'] = min(params.get('workers') or 0, self.threads_per_trial // 2)
+        return params
+
+    def leaderboard(self) -> List[Dict[str, Any]]:
+        """按指标排序的试验结果，失败的试验排在最后"""
+        sign = -1 if self.mode == 'max' else 1
+        return sorted(self.results.values(),
+                      key=lambda r: (r['score'] is None, sign * (r['score'] or 0)))
+
+    def save_leaderboard(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output_dir / 'leaderboard.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'data_path': str(self.data_path),
+                'metric': self.metric,
+                'mode': self.mode,
+                'cpu_budget': self.cpu_budget,
+                'threads_per_trial': self.threads_per_trial,
+                'trials': self.leaderboard()
+            }, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.output_dir / 'leaderboard.json')
+
+    def run(self, progress_callback: Callable[[int, str], None] = None) -> List[Dict[str, Any]]:
+        """
+        执行搜索
+
+        Args:
+            progress_callback: 进度回调，接收进度值(0-100)和状态信息
+
+        Returns:
+            排行榜（见 leaderboard），同时写入 output_dir/leaderboard.json
+        """
+        total = len(self.trials)
+
+        def report(message):
+            if progress_callback:
+                progress_callback(int(len(self.results) * 100 / max(1, total)), message)
+
+        self._prepare(report)
+        ctx = mp.get_context('spawn')
+        result_queue = ctx.Queue()
+        pending = [(f"trial{i:03d}", params) for i, params in enumerate(self.trials)]
+        running: Dict[str, Dict[str, Any]] = {}
+
+        while pending or running:
+            while pending and len(running) < self.concurrency:
+                trial_id, params = pending.pop(0)
+                params = self._trial_params(trial_id, params)
+                stop_event = ctx.Event()
+                process = ctx.Process(target=_run_trial, daemon=False, args=(
+                    trial_id, str(self.data_path), params, self.threads_per_trial,
+                    result_queue, stop_event))
+                process.start()
+                running[trial_id] = {'process': process, 'stop': stop_event, 'params': params,
+                                     'start': time.perf_counter(), 'epochs': 0, 'pruned': False}
+                report(f"开始试验 {trial_id}（并行 {len(running)}/{self.concurrency}）")
+
+            try:
+                message = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                message = None
+
+            if message and message[0] == 'epoch':
+                _, trial_id, epoch, metrics = message
+                state = running.get(trial_id)
+                if state is None:
+                    continue
+                state['epochs'] = epoch
+                self._record(trial_id, epoch, metrics)
+                if not state['pruned'] and self.should_stop(trial_id, epoch):
+                    state['pruned'] = True
+                    state['stop'].set()
+                    report(f"提前停止 {trial_id}（第 {epoch} 轮低于中位数）")
+            elif message and message[0] == 'done':
+                _, trial_id, result = message
+                self._finish(trial_id, running.pop(trial_id), result)
+                report(f"试验 {trial_id} 结束")
+
+            if message is not None:
+                continue
+            # 没有报告结果就退出的试验进程（例如内存不足被系统杀掉）
+            for trial_id, state in list(running.items()):
+                if not state['process'].is_alive() and state['process'].exitcode not in (0, None):
+                    self._finish(trial_id, running.pop(trial_id), {
+                        'ok': False, 'message': f"试验进程异常退出（退出码 {state['process'].exitcode}）"})
+
+        report("超参数搜索完成")
+        return self.leaderboard()
+
+    def _finish(self, trial_id: str, state: Dict[str, Any], result: Dict[str, Any]):
+        state['process'].join(timeout=10)
+        params = state['params']
+        metrics = result.get('metrics') or {}
+        if not result.get('ok'):
+            status = 'failed'
+        else:
+            status = 'pruned' if state['pruned'] else 'completed'
+        self.results[trial_id] = {
+            'trial': trial_id,
+            'status': status,
+            'score': metrics.get(self.metric) if result.get('ok') else None,
+            'epochs': state['epochs'],
+            'seconds': round(time.perf_counter() - state['start'], 1),
+            'params': {key: params.get(key) for key in SWEEP_KEYS},
+            'metrics': metrics,
+            'weights': result.get('weights'),
+            'message': result.get('message', "")
+        }
+        if self.model_manager is not None and result.get('ok'):
+            self.model_manager.register_run(result['weights'], params, metrics,
+                                            self.data_path, result.get('save_dir'))
+        self.save_leaderboard()
+
+def default_sweep_dir(model_dir: Path) -> Path:
+    """搜索结果目录: models/sweeps/<时间>"""
+    return Path(model_dir) / 'sweeps' / datetime.now().strftime('%Y%m%d-%H%M%S')
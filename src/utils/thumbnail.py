@@ -0,0 +1,174 @@
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+import io
+import struct
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+import numpy as np
+
+# JPEG 的 SOF 标记（不含 DHT/JPG/DAC），其中记录了图片尺寸
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                     0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# PNG 颜色类型对应的通道数（调色板图片解码后为 3 通道）
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+# libjpeg 支持的缩小解码比例
+_REDUCED_FLAGS = {
+    2: 'IMREAD_REDUCED_COLOR_2',
+    4: 'IMREAD_REDUCED_COLOR_4',
+    8: 'IMREAD_REDUCED_COLOR_8'
+}
+
+def _read_header(f: BinaryIO) -> Optional[Tuple[int, int, int]]:
+    """从文件对象的开头读取图片尺寸和通道数 (宽, 高, 通道数)"""
+    head = f.read(26)
+    if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+        width, height = struct.unpack('>II', head[16:24])
+        return width, height, _PNG_CHANNELS.get(head[25], 0)
+    if head[:2] != b'\xff\xd8':
+        return None
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # 填充字节
+            f.seek(-1, 1)
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            # 无长度字段的标记
+            continue
+        length = struct.unpack('>H', f.read(2))[0]
+        if code in _JPEG_SOF_MARKERS:
+            height, width, channels = struct.unpack('>xHHB', f.read(6))
+            return width, height, channels
+        f.seek(length - 2, 1)
+
+def _read_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """从文件对象的开头读取图片尺寸 (宽, 高)"""
+    header = _read_header(f)
+    return header[:2] if header is not None else None
+
+def read_image_header(data: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    从内存中的文件内容读取 (宽, 高, 通道数)，不解码像素
+
+    通道数: JPEG 为分量数（1 灰度、3 彩色、4 CMYK），PNG 由颜色类型得出
+    （调色板按 3 通道计），无法识别时返回 None
+    """
+    try:
+        return _read_header(io.BytesIO(data))
+    except (OSError, struct.error, ValueError):
+        return None
+
+def read_file_header(f: BinaryIO) -> Optional[Tuple[int, int, int]]:
+    """与 read_image_header 相同，但从已打开的文件开头只读取需要的字节"""
+    try:
+        f.seek(0)
+        return _read_header(f)
+    except (OSError, struct.error, ValueError):
+        return None
+
+def read_image_size(path: Path) -> Optional[Tuple[int, int]]:
+    """
+    只读取文件头获取图片尺寸 (宽, 高)，不解码像素
+
+    支持 JPEG 和 PNG，其他格式或文件损坏时返回 None
+    """
+    try:
+        with open(path, 'rb') as f:
+            return _read_size(f)
+    except (OSError, struct.error):
+        return None
+
+def image_size_from_bytes(data: bytes) -> Optional[Tuple[int, int]]:
+    """与 read_image_size 相同，但从内存中的文件内容读取"""
+    try:
+        return _read_size(io.BytesIO(data))
+    except (OSError, struct.error, ValueError):
+        return None
+
+def choose_reduce_factor(size: Optional[Tuple[int, int]], max_size: int,
+                         short_edge: bool = False) -> int:
+    """
+    选择最大的缩小解码比例，使解码后的边长仍不小于目标尺寸
+
+    Args:
+        size: 原图尺寸 (宽, 高)
+        max_size: 目标尺寸
+        short_edge: 为 True 时按短边计算（先缩放短边再中心裁剪的预处理需要）
+    """
+    if size is None:
+        return 1
+    edge = min(size) if short_edge else max(size)
+    for factor in (8, 4, 2):
+        if edge // factor >= max_size:
+            return factor
+    return 1
+
+def decode_reduced(path: Path, max_size: int, short_edge: bool = False) -> Optional[np.ndarray]:
+    """
+    以缩小比例解码图片（BGR）
+
+    JPEG 由 libjpeg 直接按 1/2、1/4、1/8 解码 DCT 系数，省去绝大部分解码工作；
+    其他格式正常解码。
+    """
+    flag = cv2.IMREAD_COLOR
+    if str(path).lower().endswith(('.jpg', '.jpeg')):
+        factor = choose_reduce_factor(read_image_size(path), max_size, short_edge)
+        if factor > 1:
+            flag = getattr(cv2, _REDUCED_FLAGS[factor])
+    return cv2.imread(str(path), flag)
+
+def decode_reduced_bytes(data: bytes, name: str, max_size: int,
+                         short_edge: bool = False) -> Optional[np.ndarray]:
+    """与 decode_reduced 相同，但解码内存中的文件内容（name 用于判断格式）"""
+    flag = cv2.IMREAD_COLOR
+    if name.lower().endswith(('.jpg', '.jpeg')):
+        factor = choose_reduce_factor(image_size_from_bytes(data), max_size, short_edge)
+        if factor > 1:
+            flag = getattr(cv2, _REDUCED_FLAGS[factor])
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+
+def resize_to_thumbnail(image: np.ndarray, max_size: int) -> np.ndarray:
+    """按比例缩放图片，使长边等于 max_size"""
+    h, w = image.shape[:2]
+    aspect = w / h
+    if aspect > 1:
+        new_w = max_size
+        new_h = max(int(new_w / aspect), 1)
+    else:
+        new_h = max_size
+        new_w = max(int(new_h * aspect), 1)
+    return cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+def load_thumbnail(path: Path, max_size: int, cache=None) -> Optional[np.ndarray]:
+    """
+    读取图片并生成缩略图
+
+    Args:
+        path: 图片路径
+        max_size: 缩略图长边像素数
+        cache: 可选的 ThumbnailCache，命中时不再解码原图
+
+    Returns:
+        RGB 格式的缩略图，读取失败时返回 None
+    """
+    if cache is not None:
+        thumb = cache.get(path, max_size)
+        if thumb is not None:
+            return thumb
+    img = decode_reduced(path, max_size)
+    if img is None:
+        return None
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    thumb = np.ascontiguousarray(resize_to_thumbnail(img, max_size))
+    if cache is not None:
+        cache.put(path, max_size, thumb)
+    return thumb
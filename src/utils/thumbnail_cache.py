@@ -0,0 +1,145 @@
+from pathlib import Path
+from typing import Optional
+import os
+import sqlite3
+import threading
+import time
+try:
+    import cv2
+except ImportError:
+    print("警告：无法导入cv2，尝试安装 opencv-python")
+    cv2 = None
+import numpy as np
+
+class ThumbnailCache:
+    """
+    持久化缩略图缓存
+
+    所有缩略图以 JPEG 形式存放在同一个 SQLite 文件中（避免大量小文件），
+    以 (路径, 修改时间, 文件大小, 缩略图尺寸) 为键，源文件变化后自动失效。
+    总大小超过预算时按最近访问时间淘汰（LRU）。可在多个线程中同时使用。
+    """
+    # 累积多少次访问后批量写回访问时间
+    TOUCH_BATCH = 256
+
+    def __init__(self, db_path: Path, max_mb: int = 256, quality: int = 90):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._touched = {}
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                key TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_thumbnails_access ON thumbnails(last_access)")
+        self.conn.commit()
+        row = self.conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM thumbnails").fetchone()
+        self.total_bytes = row[0]
+
+    @staticmethod
+    def make_key(path: Path, max_size: int) -> Optional[str]:
+        """根据路径、修改时间、文件大小和缩略图尺寸生成缓存键，文件不存在时返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return f"{Path(path).resolve()}|{st.st_mtime_ns}|{st.st_size}|{max_size}"
+
+    def get(self, path: Path, max_size: int) -> Optional[np.ndarray]:
+        """读取缓存的缩略图（RGB），未命中时返回 None"""
+        key = self.make_key(path, max_size)
+        if key is None:
+            return None
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+        img = cv2.imdecode(np.frombuffer(row[0], dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    def put(self, path: Path, max_size: int, image: np.ndarray):
+        """写入缩略图（RGB）"""
+        key = self.make_key(path, max_size)
+        if key is None:
+            return
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(image, cv2.COLOR_RGB2BGR),
+                                   [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        data = encoded.tobytes()
+        with self._lock:
+            old = self.conn.execute(
+                "SELECT nbytes FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (key, data, nbytes, last_access) "
+                "VALUES (?, ?, ?, ?)", (key, data, len(data), time.time()))
+            self.total_bytes += len(data) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def set_max_mb(self, max_mb: int):
+        """修改缓存预算，超出时立即淘汰"""
+        with self._lock:
+            self.max_bytes = max_mb * 1024 * 1024
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+                self.conn.commit()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self.conn.execute("DELETE FROM thumbnails")
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+            self._touched.clear()
+            self.total_bytes = 0
+
+    def close(self):
+        """写回访问时间并关闭数据库"""
+        with self._lock:
+            self._flush_touched()
+            self.conn.commit()
+            self.conn.close()
+
+    def _flush_touched(self):
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE thumbnails SET last_access = ? WHERE key = ?",
+                [(t, key) for key, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到低于预算的 90%（留出余量，避免频繁淘汰）"""
+        self._flush_touched()
+        target = int(self.max_bytes * 0.9)
+        while self.total_bytes > target:
+            rows = self.conn.execute(
+                "SELECT key, nbytes FROM thumbnails ORDER BY last_access LIMIT 500").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            removed = []
+            for key, nbytes in rows:
+                if self.total_bytes <= target:
+                    break
+                removed.append((key,))
+                self.total_bytes -= nbytes
+            self.conn.executemany("DELETE FROM thumbnails WHERE key = ?", removed)
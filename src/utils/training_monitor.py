@@ -0,0 +1,197 @@
+import sys
+import time
+import weakref
+from typing import Callable, Dict, Any, List, Optional
+try:
+    import resource
+except ImportError:
+    # Windows 上没有 resource 模块
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def peak_rss_mb() -> Optional[float]:
+    """返回当前进程的峰值常驻内存(MB)，无法获取时返回 None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        if sys.platform == 'darwin':
+            return peak / (1024 * 1024)
+        return peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # Windows 下 peak_wset 即峰值工作集
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return None
+
+def _loss_value(tloss) -> Optional[float]:
+    """将训练器的平均损失（张量或字典）转换为浮点数"""
+    if tloss is None:
+        return None
+    values = tloss.values() if isinstance(tloss, dict) else [tloss]
+    total = 0.0
+    for value in values:
+        total += float(value.sum()) if hasattr(value, 'sum') else float(value)
+    return total
+
+class TrainingMonitor:
+    """
+    训练监控，挂接 ultralytics 的回调事件并向订阅者推送训练统计信息
+
+    订阅者接收 (事件名, 统计字典)，事件名为 EVENTS 之一。统计字典包含：
+    epoch/epochs/batch/num_batches/progress、images_per_sec(吞吐量)、loss、lr、
+    eta(剩余秒数)、data_wait_ratio(等待数据加载的时间占比)和 peak_rss_mb。
+    data_wait_ratio 较高说明训练受 I/O/解码限制，较低说明受计算限制。
+    """
+    EVENTS = ('batch_end', 'epoch_end', 'val_end', 'model_save')
+
+    def __init__(self):
+        self._subscribers: List[Callable[[str, Dict[str, Any]], None]] = []
+        # 弱引用集合：模型被回收后自动移除，不会因 id 被新模型复用而漏注册
+        self._attached_models = weakref.WeakSet()
+        self._reset()
+
+    def _reset(self):
+        self.train_start = None
+        self.epoch_start = None
+        self.batch_start = None
+        self.last_batch_end = None
+        self.batch_index = 0
+        self.batches_done = 0
+        self.epoch_images = 0
+        self.data_time = 0.0
+        self.compute_time = 0.0
+        self.last_stats: Dict[str, Any] = {}
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """订阅训练统计"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """取消订阅"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def attach(self, model):
+        """将监控回调注册到 YOLO 模型上（同一模型只注册一次）"""
+        if model in self._attached_models:
+            return
+        self._attached_models.add(model)
+        model.add_callback('on_train_start', self._on_train_start)
+        model.add_callback('on_train_epoch_start', self._on_train_epoch_start)
+        model.add_callback('on_train_batch_start', self._on_train_batch_start)
+        model.add_callback('on_train_batch_end', self._on_train_batch_end)
+        model.add_callback('on_train_epoch_end', self._on_train_epoch_end)
+        # on_fit_epoch_end 在验证完成后触发，此时 trainer.metrics 已是本轮验证结果
+        model.add_callback('on_fit_epoch_end', self._on_fit_epoch_end)
+        model.add_callback('on_model_save', self._on_model_save)
+
+    def _emit(self, event: str, stats: Dict[str, Any]):
+        self.last_stats = stats
+        for callback in list(self._subscribers):
+            try:
+                callback(event, stats)
+            except Exception as e:
+                print(f"训练监控回调出错: {e}")
+
+    def _on_train_start(self, trainer):
+        self._reset()
+        self.train_start = time.perf_counter()
+
+    def exclude_pause(self, seconds: float):
+        """
+        从统计中扣除暂停的时长
+
+        暂停发生在批次结束之后，若不扣除，暂停的时间会在下一批次开始时被计为
+        等待数据加载，并拉低吞吐量、拉长剩余时间的估计。
+        """
+        for name in ('train_start', 'epoch_start', 'last_batch_end'):
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, value + seconds)
+
+    def _on_train_epoch_start(self, trainer):
+        now = time.perf_counter()
+        self.epoch_start = now
+        self.last_batch_end = now
+        self.batch_index = 0
+        self.epoch_images = 0
+        self.data_time = 0.0
+        self.compute_time = 0.0
+
+    def _on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        # 上一批次结束到本批次开始之间的时间都花在了等待数据加载上
+        if self.last_batch_end is not None:
+            self.data_time += now - self.last_batch_end
+        self.batch_start = now
+
+    def _on_train_batch_end(self, trainer):
+        now = time.perf_counter()
+        if self.batch_start is not None:
+            self.compute_time += now - self.batch_start
+        self.last_batch_end = now
+        self.batch_index += 1
+        self.batches_done += 1
+
+        # 最后一个批次可能不满
+        dataset_size = len(trainer.train_loader.dataset)
+        seen = (self.batch_index - 1) * trainer.batch_size
+        self.epoch_images += max(min(trainer.batch_size, dataset_size - seen), 0)
+
+        self._emit('batch_end', self._collect(trainer, now))
+
+    def _on_train_epoch_end(self, trainer):
+        self._emit('epoch_end', self._collect(trainer, time.perf_counter()))
+
+    def _on_fit_epoch_end(self, trainer):
+        stats = self._collect(trainer, time.perf_counter())
+        stats['metrics'] = {k: float(v) for k, v in (trainer.metrics or {}).items()}
+        self._emit('val_end', stats)
+
+    def _on_model_save(self, trainer):
+        stats = self._collect(trainer, time.perf_counter())
+        stats['save_path'] = str(trainer.last)
+        self._emit('model_save', stats)
+
+    def _collect(self, trainer, now: float) -> Dict[str, Any]:
+        """根据当前训练器状态计算统计信息"""
+        num_batches = max(len(trainer.train_loader), 1)
+        epochs = trainer.epochs
+        batch = min(self.batch_index, num_batches)
+
+        # 吞吐量只统计训练批次耗时，不含验证和保存
+        epoch_elapsed = self.last_batch_end - self.epoch_start if self.epoch_start else 0.0
+        images_per_sec = self.epoch_images / epoch_elapsed if epoch_elapsed > 0 else 0.0
+
+        busy = self.data_time + self.compute_time
+        data_wait_ratio = self.data_time / busy if busy > 0 else 0.0
+
+        # 用本次训练的平均批次耗时（含验证）估算剩余时间
+        done = trainer.epoch + batch / num_batches
+        total_batches = (epochs - trainer.start_epoch) * num_batches
+        remaining = max(total_batches - self.batches_done, 0)
+        eta = None
+        if self.train_start is not None and self.batches_done > 0:
+            eta = (now - self.train_start) / self.batches_done * remaining
+
+        lr = None
+        if getattr(trainer, 'optimizer', None) is not None and trainer.optimizer.param_groups:
+            lr = float(trainer.optimizer.param_groups[0]['lr'])
+
+        return {
+            'epoch': min(trainer.epoch + 1, epochs),
+            'epochs': epochs,
+            'batch': batch,
+            'num_batches': num_batches,
+            'progress': min(done / epochs * 100, 100.0),
+            'images_per_sec': images_per_sec,
+            'loss': _loss_value(trainer.tloss),
+            'lr': lr,
+            'eta': eta,
+            'data_wait_ratio': data_wait_ratio,
+            'peak_rss_mb': peak_rss_mb()
+        }
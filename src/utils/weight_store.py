@@ -0,0 +1,201 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import threading
+
+# 权重包中可选的校验清单，格式与 WeightStore 的索引相同 {名称: {'sha256': ...}}
+BUNDLE_INDEX = 'weights.json'
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """计算文件的 SHA-256（与发布的权重校验值一致）"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+class WeightStore:
+    """
+    本地预训练权重仓库
+
+    权重按文件名（如 yolo11n-cls.pt）存放在同一目录下，index.json 记录每个文件的
+    SHA-256、大小和修改时间。文件大小和修改时间未变化时不重复计算哈希；变化后
+    重新校验，与记录不一致时报错，避免加载损坏或被替换的权重。
+
+    离线节点可以从权重包（tar / tar.gz）批量导入，有网络的节点可以先下载再打包。
+    """
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self.index_path = self.store_dir / 'index.json'
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"加载权重索引失败: {e}")
+            return {}
+
+    def _save_index(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        """只使用文件名，并补全 .pt 后缀"""
+        name = Path(name).name
+        return name if name.endswith('.pt') else f"{name}.pt"
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """
+        按名称查找本地权重
+
+        Returns:
+            本地权重路径，不存在时返回 None
+
+        Raises:
+            ValueError: 权重内容与记录的校验值不一致
+        """
+        name = self._normalize(name)
+        path = self.store_dir / name
+        if not path.is_file():
+            return None
+        st = path.stat()
+        with self._lock:
+            entry = self.entries.get(name)
+            if (entry is not None and entry.get('size') == st.st_size
+                    and entry.get('mtime_ns') == st.st_mtime_ns):
+                return path
+            digest = sha256_file(path)
+            if entry is not None and entry.get('sha256') and entry['sha256'] != digest:
+                raise ValueError(f"权重校验失败: {path}")
+            # 首次发现或文件被重新写入但内容一致，更新记录
+            self.entries[name] = {'sha256': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            self._save_index()
+        return path
+
+    def add(self, src: Path, name: Optional[str] = None, sha256: Optional[str] = None) -> Path:
+        """
+        把权重文件加入仓库
+
+        Args:
+            src: 权重文件
+            name: 仓库中的名称，默认使用文件名
+            sha256: 期望的校验值，提供时不一致会报错且不写入仓库
+        """
+        src = Path(src)
+        name = self._normalize(name or src.name)
+        digest = sha256_file(src)
+        if sha256 and sha256.lower() != digest:
+            raise ValueError(f"权重校验失败: {src}")
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        dst = self.store_dir / name
+        if src.resolve() != dst.resolve():
+            tmp_path = dst.with_suffix('.part')
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dst)
+        st = dst.stat()
+        with self._lock:
+            self.entries[name] = {'sha256': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            self._save_index()
+        return dst
+
+    def import_bundle(self, bundle: Path) -> List[str]:
+        """
+        从权重包批量导入
+
+        包中所有 .pt 文件（忽略目录层级）都会导入；包含 weights.json 时
+        按其中的 sha256 校验。
+
+        Returns:
+            导入的权重名称
+        """
+        imported = []
+        tmp_dir = self.store_dir / '.import'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        try:
+            with tarfile.open(bundle, 'r:*') as tar:
+                expected = {}
+                members = []
+                for member in tar.getmembers():
+                    if not member.isfile():
+                        continue
+                    base = Path(member.name).name
+                    if base == BUNDLE_INDEX:
+                        expected = json.load(tar.extractfile(member))
+                    elif base.endswith('.pt'):
+                        members.append((base, member))
+                for base, member in members:
+                    # 只按文件名写入临时目录，不使用包内路径
+                    tmp_path = tmp_dir / base
+                    with tar.extractfile(member) as src, open(tmp_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+                    self.add(tmp_path, base, expected.get(base, {}).get('sha256'))
+                    imported.append(base)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return imported
+
+    def export_bundle(self, bundle: Path, names: Optional[List[str]] = None) -> List[str]:
+        """把仓库中的权重（默认全部）连同校验清单打包，供离线节点导入"""
+        names = [self._normalize(name) for name in names] if names else sorted(self.entries)
+        for name in names:
+            if self.resolve(name) is None:
+                raise FileNotFoundError(f"仓库中没有权重: {name}")
+        bundle = Path(bundle)
+        mode = 'w:gz' if bundle.name.endswith(('.tar.gz', '.tgz')) else 'w'
+        index = {name: {'sha256': self.entries[name]['sha256']} for name in names}
+        index_path = self.store_dir / f".{BUNDLE_INDEX}"
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4)
+        try:
+            with tarfile.open(bundle, mode) as tar:
+                tar.add(index_path, arcname=BUNDLE_INDEX)
+                for name in names:
+                    tar.add(self.store_dir / name, arcname=name)
+        finally:
+            index_path.unlink()
+        return names
+
+    def fetch(self, name: str) -> Path:
+        """
+        返回本地权重，本地没有时下载（需要网络）并加入仓库
+        """
+        path = self.resolve(name)
+        if path is not None:
+            return path
+        from ultralytics.utils.downloads import attempt_download_asset
+        try:
+            downloaded = Path(attempt_download_asset(self._normalize(name)))
+        except Exception as e:
+            raise FileNotFoundError(
+                f"本地仓库 {self.store_dir} 中没有 {name}，下载失败（离线节点请先导入权重包）: {e}")
+        if not downloaded.is_file():
+            raise FileNotFoundError(f"无法下载权重: {name}")
+        path = self.add(downloaded)
+        if downloaded.resolve() != path.resolve():
+            downloaded.unlink()
+        return path
+
+    def verify(self) -> Dict[str, bool]:
+        """重新计算所有权重的哈希并与记录比对"""
+        results = {}
+        for name, entry in list(self.entries.items()):
+            path = self.store_dir / name
+            results[name] = path.is_file() and sha256_file(path) == entry.get('sha256')
+        return results
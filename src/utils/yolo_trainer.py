@@ -1,20 +1,88 @@
 from pathlib import Path
+import threading
+import time
 import torch
 from ultralytics import YOLO
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional
+from .checkpoint import CheckpointManager
+from .training_monitor import TrainingMonitor
+from .model_manager import ModelManager
+from .path_manager import PathManager
+from .weight_store import WeightStore
+from .model_export import export_model
+from .batch_augment import BatchAugmentTrainer, augment_args
+from .packed_dataset import PackedClassificationTrainer, pack_dataset, remove_stale_packs
+from .split_manifest import SplitManifest
 
-class YOLOTrainer:
+# 界面上的模型大小与 YOLO11 权重后缀的对应关系
+MODEL_SIZES = {
+    'nano': 'n',
+    'small': 's',
+    'medium': 'm',
+    'large': 'l',
+    'xlarge': 'x'
+}
+
+class TrainingControl:
+    """训练控制，用于在界面线程和训练线程之间传递取消/暂停/继续请求"""
     def __init__(self):
+        self._cancel_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+    
+    def cancel(self):
+        """请求取消训练"""
+        self._cancel_event.set()
+        # 唤醒处于暂停状态的训练线程，使其能够退出
+        self._resume_event.set()
+    
+    def pause(self):
+        """请求暂停训练（在当前批次结束后生效）"""
+        if not self._cancel_event.is_set():
+            self._resume_event.clear()
+    
+    def resume(self):
+        """继续训练"""
+        self._resume_event.set()
+    
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    
+    @property
+    def is_paused(self) -> bool:
+        return not self._resume_event.is_set()
+    
+    def wait_if_paused(self):
+        """暂停时阻塞训练线程，直到继续或取消"""
+        self._resume_event.wait()
+
+class YOLOTrainer:
+    def __init__(self,
+                 model_manager: Optional[ModelManager] = None,
+                 weight_store: Optional[WeightStore] = None):
         self.model = None
+        # 提供 model_manager 时复用已加载的预训练权重，并在训练完成后登记训练记录
+        self.model_manager = model_manager
+        # 预训练权重优先从本地仓库加载，本地没有时才下载
+        self.weight_store = weight_store or WeightStore(PathManager().get_weight_dir())
+        self.last_run = None
+        # 训练统计（吞吐量、损失、学习率、剩余时间、峰值内存等）通过 monitor 订阅
+        self.monitor = TrainingMonitor()
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
     
     def init_model(self, model_size: str, pretrained: bool = True):
         """初始化YOLO模型"""
         try:
-            model_name = f"yolo11{model_size}-cls"  # 修改为yolo11格式
+            model_name = f"yolo11{MODEL_SIZES.get(model_size, model_size)}-cls"  # 修改为yolo11格式
             if pretrained:
-                # 加载预训练模型
-                self.model = YOLO(f"{model_name}.pt")
+                # 加载预训练模型（本地仓库中已有时不会访问网络）
+                weights = self.weight_store.fetch(f"{model_name}.pt")
+                if self.model_manager is not None:
+                    # 从模型缓存中取副本，避免每次训练都从磁盘重新加载权重
+                    self.model = self.model_manager.load_model(weights, copy_model=True)
+                else:
+                    self.model = YOLO(str(weights))
             else:
                 # 从YAML构建新模型
                 self.model = YOLO(f"{model_name}.yaml")
@@ -26,7 +94,8 @@ class YOLOTrainer:
     def train(self, 
              data_path: Path,
              params: Dict[str, Any],
-             progress_callback: Callable[[int, str], None] = None):
+             progress_callback: Callable[[int, str], None] = None,
+             control: TrainingControl = None):
         """
         训练模型
         
@@ -34,30 +103,112 @@ class YOLOTrainer:
             data_path: 数据集路径
             params: 训练参数字典
             progress_callback: 进度回调函数，接收进度值(0-100)和状态信息
+            control: 训练控制对象，用于取消/暂停/继续训练
         """
+        # 通过训练监控更新进度
+        def on_stats(event, stats):
+            if event == 'batch_end':
+                progress_callback(int(stats['progress']),
+                                  f"训练轮次 {stats['epoch']}/{stats['epochs']} "
+                                  f"批次 {stats['batch']}/{stats['num_batches']}")
+            elif event == 'epoch_end':
+                progress_callback(int(stats['progress']),
+                                  f"训练轮次 {stats['epoch']}/{stats['epochs']}")
+        
+        checkpoints = None
         try:
-            # 确保使用正确的 data.yaml 路径
+            # 确保数据集已经划分并生成 data.yaml
             data_yaml = data_path / 'data.yaml'
             if not data_yaml.exists():
                 raise FileNotFoundError(f"找不到数据集配置文件: {data_yaml}")
             
+            # 可选：从中断训练的检查点继续，恢复模型、优化器、EMA 和轮次
+            resume = params.get('resume')
+            if resume:
+                self.model = YOLO(str(resume))
+            
             if self.model is None:
                 raise RuntimeError("模型未初始化")
             
             # 准备训练参数（简化为与YOLO11一致的参数）
             train_args = {
-                'data': str(data_yaml),  # 使用完整的 data.yaml 路径
+                'data': str(data_path),  # 分类任务使用数据集目录（包含 train/valid/test）
                 'imgsz': params['img_size'],
                 'batch': params['batch_size'],
-                'epochs': params['epochs'],
                 'device': self.device
             }
+            if resume:
+                # 轮次、学习率等沿用检查点中的训练参数，训练结果写回原来的目录
+                train_args['resume'] = str(resume)
+            else:
+                train_args['epochs'] = params['epochs']
+                # 只有明确指定优化器时才传入学习率：'auto' 会自行选择优化器和学习率，忽略 lr0
+                optimizer = params.get('optimizer') or 'auto'
+                if optimizer != 'auto':
+                    train_args['optimizer'] = optimizer
+                    if params.get('learning_rate'):
+                        train_args['lr0'] = params['learning_rate']
+                    if optimizer.startswith('Adam'):
+                        # 预热阶段偏置的学习率默认 0.1，只适合 SGD，对 Adam 类优化器过大
+                        train_args['warmup_bias_lr'] = 0.0
+                # 可选：训练结果保存目录（默认由 ultralytics 决定）
+                if params.get('project'):
+                    train_args['project'] = params['project']
+                # 数据增强（翻转、缩放、旋转），见 utils.batch_augment.augment_args
+                if params.get('augment') is not None:
+                    train_args.update(augment_args(params['augment']))
+            # ultralytics 自身的 epoch<N>.pt 同步保存关闭，由 CheckpointManager 异步保存
+            train_args['save_period'] = -1
+            # 可选：数据加载进程数，可由自动调优得出
+            if params.get('workers') is not None:
+                train_args['workers'] = params['workers']
+            # 可选：图片缓存。'packed' 为预解码的内存映射数据集，其余（'ram'、'disk'）交给 ultralytics
+            # 来自分片归档的划分目录中没有图片文件，只能使用 'packed'
+            cache = params.get('cache')
+            if SplitManifest(data_path).load().mode == 'archive':
+                cache = 'packed'
+            if cache == 'packed':
+                def on_pack(split, done, total):
+                    if progress_callback:
+                        progress_callback(0, f"预解码数据集 {split} {done}/{total}")
+                # 其他图像尺寸的打包结果不再使用，先删除以腾出磁盘空间
+                # （超参数搜索中并行的试验共用打包结果，由 SweepRunner 统一管理）
+                if params.get('prune_packs', True):
+                    remove_stale_packs(data_path, [params['img_size']])
+                pack_dataset(data_path, params['img_size'], progress_callback=on_pack)
+                train_args['trainer'] = PackedClassificationTrainer
+            else:
+                # 旋转增强在批次上完成（PackedClassificationTrainer 同样支持）
+                train_args['trainer'] = BatchAugmentTrainer
+                if cache:
+                    train_args['cache'] = cache
             
-            # 注册回调函数来更新进度
-            def on_train_epoch_end(trainer):
-                progress = int((trainer.epoch + 1) / params['epochs'] * 100)
-                if progress_callback:
-                    progress_callback(progress, f"训练轮次 {trainer.epoch + 1}/{params['epochs']}")
+            # 周期检查点（异步复制、保留最近几个）和随机数状态
+            checkpoints = CheckpointManager(
+                params.get('checkpoint_dir') or PathManager().get_checkpoint_dir(),
+                params.get('save_period', 10),
+                params.get('keep_checkpoints', 3),
+                params.get('save_checkpoint', True))
+            checkpoints.resume_from = Path(resume) if resume else None
+            checkpoints.attach(self.model)
+            
+            self.monitor.attach(self.model)
+            if progress_callback:
+                self.monitor.subscribe(on_stats)
+            
+            # 在批次之间响应暂停/取消请求
+            def on_train_batch_end(trainer):
+                if control.is_paused and progress_callback:
+                    progress_callback(int(self.monitor.last_stats.get('progress', 0)), "训练已暂停")
+                paused_at = time.perf_counter()
+                control.wait_if_paused()
+                self.monitor.exclude_pause(time.perf_counter() - paused_at)
+                if control.is_cancelled:
+                    # 由训练器在当前批次结束后停止训练
+                    trainer.stop = True
+            
+            if control:
+                self.model.add_callback('on_train_batch_end', on_train_batch_end)
             
             # 开始训练
             if progress_callback:
@@ -66,6 +217,24 @@ class YOLOTrainer:
             # 使用YOLO11的训练方式
             results = self.model.train(**train_args)
             
+            if control and control.is_cancelled:
+                if progress_callback:
+                    progress_callback(0, "训练已取消")
+                return False
+            
+            trainer = self.model.trainer
+            exports = {}
+            if params.get('export_formats'):
+                # 导出 TorchScript / ONNX 等格式，供 CPU 推理使用
+                if progress_callback:
+                    progress_callback(100, "导出模型...")
+                exports = export_model(trainer.best, params['export_formats'],
+                                       params['img_size'], params.get('export_int8', False))
+            
+            if self.model_manager is not None:
+                self.last_run = self.model_manager.register_run(
+                    trainer.best, params, trainer.metrics, data_path, trainer.save_dir, exports)
+            
             if progress_callback:
                 progress_callback(100, "训练完成")
             
@@ -74,4 +243,8 @@ class YOLOTrainer:
         except Exception as e:
             if progress_callback:
                 progress_callback(0, f"训练失败: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+        finally:
+            self.monitor.unsubscribe(on_stats)
+            if checkpoints is not None:
+                checkpoints.close() 
\ No newline at end of file
@@ -0,0 +1,45 @@
+import argparse
+import sys
+from pathlib import Path
+from utils.dataset_manifest import iter_files
+from utils.image_validator import INTEGRITY_REASONS, LAYOUT_CHECKS, REASONS, ImageValidator
+from utils.path_manager import IMAGE_SUFFIXES, PathManager
+
+def main():
+    parser = argparse.ArgumentParser(description="检查数据集中的图片（损坏、不完整、空文件、灰度、透明通道），可隔离不合格的图片")
+    parser.add_argument('dataset', type=Path, help="数据集目录（每个子目录为一个类别）")
+    parser.add_argument('--full-decode', action='store_true', help="完整解码每张图片（较慢）")
+    parser.add_argument('--workers', type=int, help="检查进程数，默认为 CPU 核数")
+    parser.add_argument('--allow', nargs='+', default=[], choices=list(INTEGRITY_REASONS),
+                        help="不隔离的原因，例如 decode_failed")
+    parser.add_argument('--layout-check', choices=list(LAYOUT_CHECKS), default='minority',
+                        help="灰度、透明通道和 CMYK 图片: off 不检查，minority 只列出与多数图片格式不同的，"
+                             "all 列出全部非 RGB 图片")
+    parser.add_argument('--quarantine', type=Path, help="把不合格的图片移到该目录，默认只列出")
+    args = parser.parse_args()
+
+    if not args.dataset.is_dir():
+        sys.exit(f"{args.dataset} 不是目录")
+    files = {rel: None for rel, _ in iter_files(args.dataset)
+             if '/' in rel and rel.lower().endswith(IMAGE_SUFFIXES)}
+    cache_path = PathManager().get_cache_dir() / 'validation.sqlite'
+    validator = ImageValidator(cache_path, args.full_decode, args.workers,
+                               reject=set(INTEGRITY_REASONS) - set(args.allow),
+                               layout_check=args.layout_check)
+    try:
+        bad, stats = validator.validate(
+            args.dataset, files,
+            lambda done, total: print(f"已检查 {done}/{total}", file=sys.stderr))
+    finally:
+        validator.close()
+
+    for rel, reason in bad.items():
+        print(f"{rel}\t{REASONS[reason]}")
+    print(f"共 {len(files)} 张图片，检查 {stats['checked']}，缓存命中 {stats['cached']}，"
+          f"不合格 {len(bad)}", file=sys.stderr)
+    if args.quarantine and bad:
+        moved = ImageValidator.quarantine(args.dataset, bad, args.quarantine)
+        print(f"已移动 {len(moved)} 张图片到 {args.quarantine}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import sys
+from pathlib import Path
+from utils.path_manager import PathManager
+from utils.weight_store import WeightStore
+from utils.yolo_trainer import MODEL_SIZES
+
+def main():
+    parser = argparse.ArgumentParser(description="管理本地预训练权重仓库（models/pretrained）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fetch_parser = subparsers.add_parser('fetch', help="下载权重到本地仓库（需要网络）")
+    fetch_parser.add_argument('names', nargs='*',
+                              help="权重名称，如 yolo11n-cls.pt，默认下载所有大小的分类模型")
+
+    import_parser = subparsers.add_parser('import', help="从权重包（tar/tar.gz）批量导入")
+    import_parser.add_argument('bundle', type=Path)
+
+    export_parser = subparsers.add_parser('export', help="打包本地权重，供离线节点导入")
+    export_parser.add_argument('bundle', type=Path)
+    export_parser.add_argument('names', nargs='*', help="要打包的权重，默认全部")
+
+    subparsers.add_parser('list', help="列出本地权重")
+    subparsers.add_parser('verify', help="重新校验所有本地权重")
+    args = parser.parse_args()
+
+    store = WeightStore(PathManager().get_weight_dir())
+    if args.command == 'fetch':
+        names = args.names or [f"yolo11{suffix}-cls.pt" for suffix in MODEL_SIZES.values()]
+        for name in names:
+            print(f"{name}: {store.fetch(name)}")
+    elif args.command == 'import':
+        for name in store.import_bundle(args.bundle):
+            print(f"已导入 {name}")
+    elif args.command == 'export':
+        names = store.export_bundle(args.bundle, args.names)
+        print(f"已打包 {len(names)} 个权重到 {args.bundle}")
+    elif args.command == 'list':
+        for name, entry in sorted(store.entries.items()):
+            print(f"{name}\t{entry['size'] / (1 << 20):.1f} MB\tsha256:{entry['sha256']}")
+    elif args.command == 'verify':
+        results = store.verify()
+        for name, ok in sorted(results.items()):
+            print(f"{name}\t{'正常' if ok else '校验失败'}")
+        if not all(results.values()):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()